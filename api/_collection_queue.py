@@ -0,0 +1,140 @@
+"""
+참가업체 수집 작업 큐 (sql/005_participant_collection_queue.sql)
+
+    enqueue_new(cursor)                  # 최근 낙찰건 중 미등록 건 등록
+    bids = claim(cursor, limit)          # 배치 임대 (FOR UPDATE SKIP LOCKED)
+    ...수집...
+    complete(cursor, outcomes)           # done / empty / failed 기록
+
+여러 작업자가 동시에 claim 해도 같은 입찰건을 가져가지 않는다.
+"""
+import psycopg2
+from psycopg2.extras import execute_values
+
+
+# 임대 시간: 이 시간 안에 complete 하지 않으면 다른 작업자가 다시 가져간다
+LEASE_SECONDS = 600
+# 실패 재시도: RETRY_BASE_SECONDS * 2^(시도-1), 최대 RETRY_MAX_SECONDS
+RETRY_BASE_SECONDS = 600
+RETRY_MAX_SECONDS = 86400
+MAX_ATTEMPTS = 6
+# 요청마다 다시 훑는 최근 등록일 구간 (일), 더 늦게 적재된 행은 야간 작업(30일)이 등록
+ENQUEUE_LOOKBACK_DAYS = 2
+
+
+class QueueUnavailable(Exception):
+    """큐 테이블/함수가 아직 없음 (마이그레이션 미적용)"""
+
+
+def enqueue_new(cursor, lookback_days=ENQUEUE_LOOKBACK_DAYS):
+    """최근 lookback_days 일 낙찰건 중 미등록 건을 pending 으로 등록, 등록 건수 반환"""
+    try:
+        cursor.execute(
+            "SELECT enqueued FROM pps_bid.enqueue_participant_collection(false, %s)", [lookback_days]
+        )
+    except (psycopg2.errors.UndefinedTable, psycopg2.errors.UndefinedFunction):
+        cursor.connection.rollback()
+        raise QueueUnavailable()
+    enqueued = cursor.fetchone()[0]
+    cursor.connection.commit()
+    return enqueued
+
+
+def claim(cursor, limit, lease_seconds=LEASE_SECONDS):
+    """
+    재시도 시각이 지난 pending/failed 입찰건을 최근 순으로 최대 limit 건 임대
+
+    반환: [(bid_ntce_no, bid_ntce_ord, bid_clsfc_no, bid_ntce_nm, bid_type, attempts)]
+    """
+    cursor.execute("""
+        WITH candidates AS (
+            SELECT bid_ntce_no, bid_ntce_ord
+            FROM pps_bid.participant_collection_queue
+            WHERE status IN ('pending', 'failed')
+                AND next_retry_at <= now()
+            ORDER BY rgst_dt DESC NULLS LAST
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ),
+        claimed AS (
+            UPDATE pps_bid.participant_collection_queue q
+            SET attempts = q.attempts + 1,
+                next_retry_at = now() + make_interval(secs => %s),
+                updated_at = now()
+            FROM candidates c
+            WHERE q.bid_ntce_no = c.bid_ntce_no
+                AND q.bid_ntce_ord = c.bid_ntce_ord
+            RETURNING q.bid_ntce_no, q.bid_ntce_ord, q.bid_clsfc_no, q.attempts, q.rgst_dt
+        )
+        SELECT c.bid_ntce_no, c.bid_ntce_ord, c.bid_clsfc_no, b.bid_ntce_nm, b.bid_type, c.attempts
+        FROM claimed c
+        LEFT JOIN LATERAL (
+            SELECT bid_ntce_nm, bid_type
+            FROM bid_results
+            WHERE bid_ntce_no = c.bid_ntce_no
+            LIMIT 1
+        ) b ON true
+        ORDER BY c.rgst_dt DESC NULLS LAST
+    """, [limit, lease_seconds])
+    bids = cursor.fetchall()
+    cursor.connection.commit()
+    return bids
+
+
+def retry_delay(attempts):
+    """attempts 번째 실패 후 재시도까지 대기 (초), 최대 시도 초과 시 None"""
+    if attempts >= MAX_ATTEMPTS:
+        return None
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def complete(cursor, outcomes):
+    """
+    수집 결과 기록 후 etl_checkpoint 갱신
+
+    outcomes: [(bid_ntce_no, bid_ntce_ord, status, attempts, collected_count, error)]
+              status 는 done / empty / failed
+    """
+    if not outcomes:
+        return
+
+    rows = []
+    for bid_ntce_no, bid_ntce_ord, status, attempts, collected_count, error in outcomes:
+        delay = retry_delay(attempts) if status == "failed" else 0
+        rows.append((
+            bid_ntce_no, bid_ntce_ord, status, collected_count,
+            error[:500] if error else None,
+            delay if delay is not None else -1,
+        ))
+
+    execute_values(cursor, """
+        UPDATE pps_bid.participant_collection_queue q
+        SET status = v.status,
+            collected_count = v.collected_count,
+            last_error = v.last_error,
+            next_retry_at = CASE
+                WHEN v.delay < 0 THEN 'infinity'::timestamptz
+                ELSE now() + make_interval(secs => v.delay)
+            END,
+            updated_at = now()
+        FROM (VALUES %s) AS v(bid_ntce_no, bid_ntce_ord, status, collected_count, last_error, delay)
+        WHERE q.bid_ntce_no = v.bid_ntce_no
+            AND q.bid_ntce_ord = v.bid_ntce_ord
+    """, rows, template="(%s, %s, %s, %s::integer, %s, %s::integer)")
+
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome[2]] = counts.get(outcome[2], 0) + 1
+
+    cursor.execute("""
+        INSERT INTO pps_bid.etl_checkpoint (job_name, last_run_at, last_status, last_message)
+        VALUES ('collect_participants', now(), %s, %s)
+        ON CONFLICT (job_name) DO UPDATE
+            SET last_run_at = EXCLUDED.last_run_at,
+                last_status = EXCLUDED.last_status,
+                last_message = EXCLUDED.last_message
+    """, [
+        "success" if not counts.get("failed") else "partial",
+        " ".join(f"{status}={count}" for status, count in sorted(counts.items())),
+    ])
+    cursor.connection.commit()
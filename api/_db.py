@@ -0,0 +1,267 @@
+"""
+공용 DB 커넥션 풀
+
+모든 api/*.py 핸들러가 요청마다 psycopg2.connect() 하던 것을 프로세스 단위 풀로 대체한다.
+- 대여 시 헬스 체크 (유휴 시간이 길었던 연결은 SELECT 1 로 확인 후 재사용)
+- 최대 크기(DB_POOL_MAX) + 초과 허용(DB_POOL_OVERFLOW) 정책
+- 엔드포인트별 statement_timeout
+
+서버리스 warm 인스턴스와 상시 구동 배포 모두에서 TLS/인증 핸드셰이크를 재사용한다.
+모든 커넥션의 기본 커서는 api/_timing.TimedCursor (요청별 쿼리 시간 기록)이다.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+from api import _metrics
+from api._timing import TimedCursor
+
+
+# 엔드포인트별 기본 statement_timeout (ms)
+# 환경변수 DB_STATEMENT_TIMEOUT_<ENDPOINT> 로 개별 조정 가능 (예: DB_STATEMENT_TIMEOUT_SEARCH=3000)
+STATEMENT_TIMEOUTS = {
+    "health": 2000,
+    "tables": 10000,
+    "search": 8000,
+    "search-export": 300000,
+    "dashboard": 8000,
+    "predict": 8000,
+    "probability": 8000,
+    "institution": 8000,
+    "competitors": 8000,
+    "collect-participants": 30000,
+    "rate-index": 120000,   # api/_rate_index.py 백그라운드 구축 (요청 경로 밖)
+}
+DEFAULT_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "10000"))
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def statement_timeout_for(endpoint):
+    """엔드포인트 이름으로 statement_timeout(ms) 조회"""
+    env_name = "DB_STATEMENT_TIMEOUT_" + endpoint.upper().replace("-", "_")
+    return _env_int(env_name, STATEMENT_TIMEOUTS.get(endpoint, DEFAULT_STATEMENT_TIMEOUT))
+
+
+class ConnectionPool:
+    """
+    스레드 안전 커넥션 풀
+
+    - maxconn 개까지는 반납 시 유휴 목록에 보관
+    - max_overflow 개까지는 추가로 열 수 있지만 반납 시 즉시 닫음
+    - 그 이상은 checkout_timeout 초 동안 대기 후 PoolError
+    """
+
+    def __init__(self, dsn, minconn=0, maxconn=5, max_overflow=5,
+                 checkout_timeout=10.0, health_check_interval=30.0, connect_timeout=10):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_overflow = max_overflow
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+
+        self._cond = threading.Condition()
+        self._idle = []          # [(conn, last_used)]
+        self._in_use = set()     # id(conn)
+        self._timeouts = {}      # id(conn) -> 현재 적용된 statement_timeout
+        self._size = 0           # 열려 있는 전체 연결 수 (유휴 + 대여중 + 생성중)
+        self._closed = False
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        started = time.perf_counter()
+        try:
+            conn = psycopg2.connect(self.dsn, connect_timeout=self.connect_timeout, cursor_factory=TimedCursor)
+        except Exception:
+            _metrics.DB_CONNECT_ERRORS.inc()
+            raise
+        _metrics.DB_CONNECT_SECONDS.observe(time.perf_counter() - started)
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        """대여 직전 연결 상태 확인"""
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _close_quietly(self, conn):
+        self._timeouts.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self, statement_timeout=None):
+        """커넥션 대여 (필요 시 statement_timeout 적용)"""
+        deadline = time.monotonic() + self.checkout_timeout
+
+        while True:
+            conn = None
+            last_used = None
+            with self._cond:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+
+                while not self._idle and self._size >= self.maxconn + self.max_overflow:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolError("connection pool exhausted")
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    # 새 연결 자리 예약 후 락 밖에서 연결
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, last_used):
+                self._close_quietly(conn)
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                continue
+
+            try:
+                self._apply_statement_timeout(conn, statement_timeout)
+            except psycopg2.Error:
+                self._close_quietly(conn)
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                self._in_use.add(id(conn))
+            return conn
+
+    def _apply_statement_timeout(self, conn, statement_timeout):
+        if statement_timeout is None or self._timeouts.get(id(conn)) == statement_timeout:
+            return
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
+            cursor.execute("SET statement_timeout = %s", [int(statement_timeout)])
+        conn.commit()
+        self._timeouts[id(conn)] = statement_timeout
+
+    def putconn(self, conn, discard=False):
+        """커넥션 반납 (트랜잭션 정리 후 유휴 목록 또는 닫기)"""
+        if not conn.closed and not discard:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            self._in_use.discard(id(conn))
+            keep = (
+                not discard
+                and not conn.closed
+                and not self._closed
+                and len(self._idle) + len(self._in_use) < self.maxconn
+            )
+            if keep:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+        if not keep:
+            self._close_quietly(conn)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "maxconn": self.maxconn,
+                "max_overflow": self.max_overflow,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """프로세스 전역 풀 (최초 호출 시 생성)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    os.getenv("DATABASE_URL"),
+                    minconn=_env_int("DB_POOL_MIN", 0),
+                    maxconn=_env_int("DB_POOL_MAX", 5),
+                    max_overflow=_env_int("DB_POOL_OVERFLOW", 5),
+                    checkout_timeout=float(_env_int("DB_POOL_CHECKOUT_TIMEOUT", 10)),
+                    health_check_interval=float(_env_int("DB_POOL_HEALTH_CHECK_INTERVAL", 30)),
+                )
+    return _pool
+
+
+@contextmanager
+def get_connection(endpoint):
+    """
+    풀에서 커넥션을 빌려 endpoint 의 statement_timeout 을 적용한 뒤 반납까지 처리
+
+        with get_connection("search") as conn:
+            cursor = conn.cursor()
+            ...
+    """
+    pool = get_pool()
+    started = time.perf_counter()
+    conn = pool.getconn(statement_timeout_for(endpoint))
+    _metrics.DB_CHECKOUT_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    discard = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        # 연결 자체가 깨졌을 가능성 → 풀에 되돌리지 않음
+        discard = True
+        raise
+    finally:
+        pool.putconn(conn, discard=discard)
@@ -0,0 +1,339 @@
+"""
+나라장터(data.go.kr) API 공용 클라이언트
+
+- 프로세스 단위 토큰 버킷으로 호출 속도 제한 (data.go.kr 트래픽 한도)
+- 동시 수집 스레드가 같은 버킷을 공유한다
+- 목록 응답은 items 배열을 스트리밍 파싱하고 totalCount 까지 전체 페이지를 조회한다
+- G2B_ARCHIVE_DIR 가 있으면 원문을 보관하고 보관본에서 다시 읽을 수 있다 (api/_g2b_archive.py)
+
+환경변수
+- G2B_RATE_PER_SEC: 초당 호출 수 (기본 10)
+- G2B_RATE_BURST: 순간 최대 호출 수 (기본 10)
+- G2B_CONCURRENCY: 기본 동시 호출 수 (기본 8)
+- G2B_PAGE_SIZE: 페이지당 행 수 numOfRows (기본 500)
+- G2B_BASE_URL: ScsbidInfoService 주소 (로컬 모의 서버 bench/g2b_mock_server.py 사용 시)
+"""
+import codecs
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import json
+import math
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from api import _metrics
+from api._g2b_archive import get_archive
+
+
+SCSBID_INFO_SERVICE = os.getenv("G2B_BASE_URL", "https://apis.data.go.kr/1230000/as/ScsbidInfoService").rstrip("/")
+
+DEFAULT_CONCURRENCY = int(os.getenv("G2B_CONCURRENCY", "8"))
+MAX_CONCURRENCY = 16
+REQUEST_TIMEOUT = 30
+PAGE_SIZE = int(os.getenv("G2B_PAGE_SIZE", "500"))
+# 한 입찰건 안에서 동시에 조회하는 페이지 수
+PAGE_CONCURRENCY = 4
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class TokenBucket:
+    """
+    스레드 안전 토큰 버킷
+
+    rate 초당 토큰을 채우고 최대 burst 개까지 쌓는다.
+    acquire() 는 토큰이 생길 때까지 대기한다.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """프로세스 전역 토큰 버킷"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = TokenBucket(
+                    float(os.getenv("G2B_RATE_PER_SEC", "10")),
+                    float(os.getenv("G2B_RATE_BURST", "10")),
+                )
+    return _rate_limiter
+
+
+def clamp_concurrency(value):
+    return max(1, min(int(value), MAX_CONCURRENCY))
+
+
+def _open(operation, api_key, params, timeout):
+    """ScsbidInfoService 오퍼레이션 호출 (속도 제한 적용)"""
+    url = f"{SCSBID_INFO_SERVICE}/{operation}?serviceKey={api_key}&{urllib.parse.urlencode(params)}"
+
+    get_rate_limiter().acquire()
+
+    req = urllib.request.Request(url)
+    req.add_header("User-Agent", "Mozilla/5.0")
+    return urllib.request.urlopen(req, timeout=timeout)
+
+
+_ITEMS_KEY = re.compile(r'"items"\s*:\s*')
+_ITEM_KEY = re.compile(r'"item"\s*:\s*')
+_SPACE = re.compile(r'[\s,]*')
+
+
+class ItemStreamParser:
+    """
+    목록 응답 스트리밍 파서
+
+    feed(text) 로 받은 만큼 items 배열 원소를 하나씩 디코딩해 돌려주고,
+    나머지 응답 골격(header, totalCount 등 - items 는 빈 배열로 대체)은
+    close() 에서 한 번에 파싱한다. 원문 전체와 파싱 결과를 동시에 들고 있지 않는다.
+
+    지원 형식: "items": [..] / "items": {"item": [..]} / "items": {"item": {..}} / "items": ""
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._envelope = []
+        self._state = "items"    # items → item → array → rest
+
+    def feed(self, text):
+        self._buffer += text
+        items = []
+
+        while True:
+            buffer = self._buffer
+
+            if self._state in ("items", "item"):
+                pattern = _ITEMS_KEY if self._state == "items" else _ITEM_KEY
+                match = pattern.search(buffer)
+                if not match or match.end() >= len(buffer):
+                    # 키가 청크 경계에 걸칠 수 있으므로 끝부분은 남겨 둔다
+                    keep = max(0, len(buffer) - 32)
+                    self._envelope.append(buffer[:keep])
+                    self._buffer = buffer[keep:]
+                    return items
+                head = buffer[match.end()]
+                self._envelope.append(buffer[:match.end()])
+                if head == "[":
+                    self._envelope.append("[")
+                    self._buffer = buffer[match.end() + 1:]
+                    self._state = "array"
+                elif head == "{" and self._state == "items":
+                    self._envelope.append("{")
+                    self._buffer = buffer[match.end() + 1:]
+                    self._state = "item"
+                elif head == "{":
+                    # 단건 item 객체
+                    try:
+                        item, end = self._decoder.raw_decode(buffer, match.end())
+                    except ValueError:
+                        self._envelope.pop()
+                        return items
+                    items.append(item)
+                    self._envelope.append("null")
+                    self._buffer = buffer[end:]
+                    self._state = "rest"
+                else:
+                    self._buffer = buffer[match.end():]
+                    self._state = "rest"
+                continue
+
+            if self._state == "array":
+                position = _SPACE.match(buffer).end()
+                if position >= len(buffer):
+                    self._buffer = ""
+                    return items
+                if buffer[position] == "]":
+                    self._buffer = buffer[position:]
+                    self._state = "rest"
+                    continue
+                try:
+                    item, end = self._decoder.raw_decode(buffer, position)
+                except ValueError:
+                    self._buffer = buffer[position:]
+                    return items
+                items.append(item)
+                self._buffer = buffer[end:]
+                continue
+
+            # rest: 나머지 골격은 close() 에서 파싱
+            return items
+
+    def close(self):
+        """응답 골격 반환 (JSON 이 아니면 ValueError)"""
+        text = "".join(self._envelope) + self._buffer
+        try:
+            return json.loads(text)
+        except ValueError:
+            raise ValueError(f"JSON 응답이 아닙니다: {text[:300]}")
+
+
+def _parse_stream(read, tee=None):
+    """read(n) 으로 읽으며 스트리밍 파싱 (tee 가 있으면 원문 바이트도 전달)"""
+    parser = ItemStreamParser()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    items = []
+    while True:
+        chunk = read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        if tee is not None:
+            tee.write(chunk)
+        items.extend(parser.feed(decoder.decode(chunk)))
+    items.extend(parser.feed(decoder.decode(b"", final=True)))
+    return items, parser.close()
+
+
+def fetch_page(operation, api_key, params, timeout=REQUEST_TIMEOUT, staged=None):
+    """
+    목록 한 페이지 조회
+
+    staged: 원문을 함께 기록할 보관 대기 페이지 (api/_g2b_archive.py)
+    반환: (items, envelope) - envelope 은 items 를 뺀 응답 골격
+    """
+    started = time.perf_counter()
+    status = "error"
+    result_code = None
+    try:
+        with _open(operation, api_key, params, timeout) as response:
+            status = str(response.status)
+            result_code = "invalid"
+            items, envelope = _parse_stream(response.read, staged)
+        header = (envelope.get("response") or {}).get("header") or {}
+        result_code = header.get("resultCode") or "none"
+        return items, envelope
+    except urllib.error.HTTPError as e:
+        status = str(e.code)
+        raise
+    finally:
+        _metrics.G2B_REQUESTS.inc(operation=operation, status=status)
+        _metrics.G2B_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation)
+        if result_code is not None:
+            _metrics.G2B_RESULT_CODES.inc(operation=operation, result_code=result_code)
+
+
+def replay_page(archive, operation, params):
+    """보관본에서 한 페이지 읽기 (없으면 FileNotFoundError)"""
+    with archive.open(operation, params["bidNtceNo"], params.get("bidNtceOrd", "00"), params["pageNo"]) as f:
+        return _parse_stream(f.read)
+
+
+def iter_all_pages(operation, api_key, params, meta, page_size=PAGE_SIZE,
+                   concurrency=PAGE_CONCURRENCY, timeout=REQUEST_TIMEOUT, mode="auto"):
+    """
+    totalCount 까지 모든 페이지를 조회해 페이지마다 (start_index, items) 를 yield
+
+    1 페이지로 totalCount 를 확인한 뒤 나머지 페이지는 최대 concurrency 개씩 동시에 조회하고
+    끝나는 순서대로 넘긴다 (페이지 순서는 보장하지 않음, start_index 로 위치 확인).
+    meta 에 result_code, result_msg, total_count, pages, fetched_pages, source 를 채운다.
+
+    mode (원본 보관소 G2B_ARCHIVE_DIR 기준, api/_g2b_archive.py)
+    - auto: 최근에 보관된 입찰건은 보관본, 아니면 API 조회 후 보관
+    - live: 항상 API 조회 후 보관
+    - replay: 보관본만 사용 (없으면 FileNotFoundError)
+    """
+    archive = get_archive()
+    bid_ntce_no = params["bidNtceNo"]
+    bid_ntce_ord = params.get("bidNtceOrd", "00")
+
+    if mode == "replay":
+        if archive is None:
+            raise FileNotFoundError("G2B_ARCHIVE_DIR 가 설정되지 않았습니다")
+        replay = True
+    else:
+        replay = mode == "auto" and archive is not None and archive.is_fresh(operation, bid_ntce_no, bid_ntce_ord)
+        if mode == "auto" and archive is not None:
+            _metrics.record_cache("g2b_archive", replay)
+
+    staged_pages = []
+    staged_lock = threading.Lock()
+
+    def page(page_no, rows):
+        page_params = dict(params, numOfRows=str(rows), pageNo=str(page_no))
+        if replay:
+            return replay_page(archive, operation, page_params)
+        staged = None
+        if archive is not None:
+            staged = archive.stage(operation, bid_ntce_no, bid_ntce_ord, page_no)
+            with staged_lock:
+                staged_pages.append(staged)
+        return fetch_page(operation, api_key, page_params, timeout, staged)
+
+    complete = False
+    try:
+        items, envelope = page(1, page_size)
+        response_data = envelope.get("response", {})
+        header = response_data.get("header", {})
+        body = response_data.get("body", {}) or {}
+
+        if replay:
+            # 보관 당시 페이지 크기 기준으로 나머지 페이지 위치 계산
+            page_size = int(body.get("numOfRows") or page_size)
+
+        total_count = int(body.get("totalCount") or 0)
+        pages = max(1, math.ceil(total_count / page_size))
+        meta.update({
+            "result_code": header.get("resultCode"),
+            "result_msg": header.get("resultMsg"),
+            "total_count": total_count,
+            "pages": pages,
+            "fetched_pages": 1,
+            "source": "archive" if replay else "api",
+        })
+        yield 0, items
+
+        if pages > 1:
+            remaining = iter(range(2, pages + 1))
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                running = {}
+                for page_no in remaining:
+                    running[executor.submit(page, page_no, page_size)] = page_no
+                    if len(running) >= concurrency:
+                        break
+
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        page_no = running.pop(future)
+                        page_items, _ = future.result()
+                        meta["fetched_pages"] += 1
+                        yield (page_no - 1) * page_size, page_items
+
+                        next_page = next(remaining, None)
+                        if next_page is not None:
+                            running[executor.submit(page, next_page, page_size)] = next_page
+
+        complete = meta["result_code"] in ("00", "0", None)
+    finally:
+        # 모든 페이지를 정상으로 받은 경우에만 보관본 교체
+        for staged in staged_pages:
+            if complete:
+                staged.commit()
+            else:
+                staged.discard()
@@ -0,0 +1,126 @@
+"""
+나라장터 원본 응답 보관소
+
+API 응답 원문을 gzip 으로 디스크에 보관해 파서 수정/스키마 변경 시
+data.go.kr 일일 한도를 쓰지 않고 보관본에서 다시 적재(replay)할 수 있게 한다.
+
+    <G2B_ARCHIVE_DIR>/<operation>/<bidNtceNo>/<bidNtceOrd>/<pageNo>.json.gz
+
+- 한 입찰건의 모든 페이지를 받은 뒤에만 한꺼번에 반영한다 (중간 실패 시 기존 보관본 유지)
+- 정상 응답(resultCode 00)만 보관한다
+- G2B_ARCHIVE_MAX_AGE 초(기본 1일) 안에 보관된 입찰건은 다시 조회하지 않는다
+
+환경변수 G2B_ARCHIVE_DIR 가 없으면 보관하지 않는다.
+"""
+import gzip
+import os
+import re
+import tempfile
+import time
+
+
+ARCHIVE_MAX_AGE = int(os.getenv("G2B_ARCHIVE_MAX_AGE", "86400"))
+
+_UNSAFE = re.compile(r"[^0-9A-Za-z_-]")
+
+
+def _segment(value):
+    return _UNSAFE.sub("_", str(value)) or "_"
+
+
+class StagedPage:
+    """보관 대기 중인 페이지 (commit 전까지는 임시 파일)"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self.file = gzip.GzipFile(fileobj=os.fdopen(fd, "wb"), mode="wb")
+
+    def write(self, chunk):
+        self.file.write(chunk)
+
+    def close(self):
+        if not self.file.closed:
+            fileobj = self.file.fileobj
+            self.file.close()
+            fileobj.close()
+
+    def commit(self):
+        self.close()
+        os.replace(self.temp_path, self.path)
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+
+
+class ResponseArchive:
+    def __init__(self, root, max_age=ARCHIVE_MAX_AGE):
+        self.root = root
+        self.max_age = max_age
+
+    def bid_dir(self, operation, bid_ntce_no, bid_ntce_ord):
+        return os.path.join(self.root, _segment(operation), _segment(bid_ntce_no), _segment(bid_ntce_ord))
+
+    def path(self, operation, bid_ntce_no, bid_ntce_ord, page_no):
+        return os.path.join(self.bid_dir(operation, bid_ntce_no, bid_ntce_ord), f"{int(page_no)}.json.gz")
+
+    def stage(self, operation, bid_ntce_no, bid_ntce_ord, page_no):
+        return StagedPage(self.path(operation, bid_ntce_no, bid_ntce_ord, page_no))
+
+    def open(self, operation, bid_ntce_no, bid_ntce_ord, page_no):
+        """보관본 읽기 (없으면 FileNotFoundError)"""
+        return gzip.open(self.path(operation, bid_ntce_no, bid_ntce_ord, page_no), "rb")
+
+    def age(self, operation, bid_ntce_no, bid_ntce_ord):
+        """1 페이지 보관 후 경과 시간 (초), 보관본이 없으면 None"""
+        try:
+            mtime = os.path.getmtime(self.path(operation, bid_ntce_no, bid_ntce_ord, 1))
+        except OSError:
+            return None
+        return time.time() - mtime
+
+    def is_fresh(self, operation, bid_ntce_no, bid_ntce_ord):
+        age = self.age(operation, bid_ntce_no, bid_ntce_ord)
+        return age is not None and age < self.max_age
+
+    def bids(self, operation):
+        """보관된 (bidNtceNo, bidNtceOrd) 목록 (최근 보관 순)"""
+        base = os.path.join(self.root, _segment(operation))
+        entries = []
+        try:
+            numbers = os.listdir(base)
+        except OSError:
+            return []
+        for bid_ntce_no in numbers:
+            try:
+                orders = os.listdir(os.path.join(base, bid_ntce_no))
+            except OSError:
+                continue
+            for bid_ntce_ord in orders:
+                first_page = os.path.join(base, bid_ntce_no, bid_ntce_ord, "1.json.gz")
+                try:
+                    entries.append((os.path.getmtime(first_page), bid_ntce_no, bid_ntce_ord))
+                except OSError:
+                    continue
+        entries.sort(reverse=True)
+        return [(bid_ntce_no, bid_ntce_ord) for _, bid_ntce_no, bid_ntce_ord in entries]
+
+
+_archive = None
+
+
+def get_archive():
+    """G2B_ARCHIVE_DIR 보관소 (설정이 없으면 None)"""
+    global _archive
+    root = os.getenv("G2B_ARCHIVE_DIR")
+    if not root:
+        return None
+    if _archive is None or _archive.root != root:
+        _archive = ResponseArchive(root)
+    return _archive
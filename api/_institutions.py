@@ -0,0 +1,115 @@
+"""
+발주기관 이름 → 기관 ID 해석 / 기관별 분석 결과 캐시
+
+sql/006_institution_dim.sql 의 pps_bid.institution 에서 자유 입력 이름에 해당하는 기관을 찾는다.
+정규화 이름이 정확히 같은 기관을 먼저, 없으면 정규화 이름에 검색어가 포함된 기관 중
+낙찰 건수가 가장 많은 기관을 고른다. (normalized_name pg_trgm 인덱스 사용)
+
+차원 테이블이 아직 없으면 psycopg2.errors.UndefinedTable 이 그대로 올라간다.
+
+환경변수
+- INSTITUTION_CACHE_SIZE: 캐시할 기관 분석 결과 수 (기본 256, 0 이면 끔)
+- INSTITUTION_CACHE_CHECK_INTERVAL: 캐시 항목 워터마크 재확인 간격 (초, 기본 60)
+"""
+from collections import OrderedDict
+import os
+import re
+import threading
+import time
+
+from api._text_search import like_pattern
+
+
+# SQL 함수 pps_bid.normalize_institution_name 과 같은 규칙
+_NAME_RUN = re.compile(r"[0-9a-z가-힣]+")
+
+# 기관 분석 결과가 바뀌었는지 판단하는 데이터 워터마크 식
+# - 공통: 최신 등록일 + 마지막 낙찰 상태 라벨 갱신 시각 (refresh_award_status_labels 는
+#   기존 행을 수정하므로 등록일만으로는 알 수 없음)
+# - 차원 사용: 마지막 기관 ID 지정/롤업 시각 추가 (refresh_institutions, refresh_institution_rollup)
+DIMENSION_WATERMARK_SQL = """concat_ws('/',
+    (SELECT MAX(rgst_dt) FROM bid_results),
+    (SELECT MAX(last_run_at) FROM pps_bid.etl_checkpoint
+     WHERE job_name IN ('refresh_award_status_labels', 'refresh_institutions', 'refresh_institution_rollup')))"""
+RAW_WATERMARK_SQL = """concat_ws('/',
+    (SELECT MAX(rgst_dt) FROM bid_results),
+    (SELECT MAX(last_run_at) FROM pps_bid.etl_checkpoint
+     WHERE job_name = 'refresh_award_status_labels'))"""
+
+
+def normalize_name(name):
+    """소문자화 후 영숫자/한글 외 문자 제거"""
+    if not name:
+        return ""
+    return "".join(_NAME_RUN.findall(name.lower()))
+
+
+def resolve_sql(name):
+    """
+    이름 → 기관 한 건을 고르는 SELECT (institution_id, canonical_name) 와 파라미터
+
+    이름이 정규화 후 비어 있으면 None
+    """
+    normalized = normalize_name(name)
+    if not normalized:
+        return None
+    return """
+        SELECT institution_id, canonical_name
+        FROM pps_bid.institution
+        WHERE normalized_name LIKE %s
+        ORDER BY normalized_name = %s DESC, bid_count DESC, institution_id
+        LIMIT 1
+    """, [like_pattern(normalized), normalized]
+
+
+class ProfileCache:
+    """
+    기관별 분석 결과 LRU 캐시 (프로세스 메모리)
+
+    항목마다 계산 당시의 데이터 워터마크를 함께 보관하고, check_interval 초가 지난 항목은
+    워터마크 쿼리 한 번으로 확인해 바뀌었으면 버린다.
+    캐시에 없는 항목은 쿼리 없이 None (분석 쿼리가 워터마크를 함께 돌려준다).
+    """
+
+    def __init__(self, maxsize, check_interval):
+        self.maxsize = maxsize
+        self.check_interval = check_interval
+        self._entries = OrderedDict()    # key → [value, watermark_sql, watermark, checked_at]
+        self._lock = threading.Lock()
+
+    def get(self, cursor, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            value, watermark_sql, watermark, checked_at = entry
+
+        if time.monotonic() - checked_at >= self.check_interval:
+            cursor.execute(f"SELECT {watermark_sql}")
+            if cursor.fetchone()[0] != watermark:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                return None
+            entry[3] = time.monotonic()
+        return value
+
+    def put(self, key, value, watermark_sql, watermark):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = [value, watermark_sql, watermark, time.monotonic()]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+PROFILE_CACHE = ProfileCache(
+    maxsize=int(os.getenv("INSTITUTION_CACHE_SIZE", "256")),
+    check_interval=float(os.getenv("INSTITUTION_CACHE_CHECK_INTERVAL", "60")),
+)
@@ -0,0 +1,210 @@
+"""
+프로세스 메트릭 (Prometheus 텍스트 형식)
+
+카운터/히스토그램은 프로세스 메모리에 쌓이며 /api/metrics 또는 추적 중인 엔드포인트의
+?metrics=1 로 내보낸다 (api/_response.track_request).
+서버리스 배포에서는 함수(api/*.py)·인스턴스마다 따로 집계되므로 Prometheus 에서 sum 으로 합친다.
+
+캐시 적중률 = pps_cache_requests_total{result="hit"} / pps_cache_requests_total (cache 별)
+
+환경변수 METRICS_TOKEN 이 있으면 Authorization: Bearer <token> 또는 ?token= 이 일치해야 내보낸다.
+?metrics=1 은 METRICS_TOKEN 이 설정돼 있을 때만 허용한다 (없으면 /api/metrics 에서만 공개).
+"""
+import hmac
+import os
+import threading
+import time
+
+
+# 초 단위 히스토그램 구간
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_local = threading.local()
+PROCESS_START_TIME = time.time()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {} if self.labelnames else {(): 0}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}    # labels → [구간별 건수..., 합계, 건수]
+        if not self.labelnames:
+            self._values[()] = [0] * (len(self.buckets) + 2)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            for bound, count in zip(self.buckets + (float("inf"),), state[:len(self.buckets)] + [state[-1]]):
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(state[-2], 6))}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+REQUESTS = Counter(
+    "pps_http_requests_total", "엔드포인트별 요청 수", ("endpoint", "status"))
+REQUEST_SECONDS = Histogram(
+    "pps_http_request_duration_seconds", "엔드포인트별 처리 시간", ("endpoint",))
+
+DB_CONNECT_SECONDS = Histogram(
+    "pps_db_connect_duration_seconds", "새 DB 연결 수립 시간")
+DB_CONNECT_ERRORS = Counter(
+    "pps_db_connect_errors_total", "DB 연결 실패 수")
+DB_CHECKOUT_SECONDS = Histogram(
+    "pps_db_checkout_duration_seconds", "풀에서 커넥션을 빌리는 시간 (대기/연결/헬스 체크 포함)", ("endpoint",))
+DB_QUERY_SECONDS = Histogram(
+    "pps_db_query_duration_seconds", "SQL 실행 시간 (execute/copy_expert)", ("endpoint",))
+DB_QUERY_ERRORS = Counter(
+    "pps_db_query_errors_total", "실패한 SQL 실행 수", ("endpoint",))
+
+G2B_REQUESTS = Counter(
+    "pps_g2b_requests_total", "나라장터 API 호출 수 (HTTP 상태, 연결 실패는 error)", ("operation", "status"))
+G2B_REQUEST_SECONDS = Histogram(
+    "pps_g2b_request_duration_seconds", "나라장터 API 페이지 조회 시간 (응답 수신·파싱 포함)", ("operation",))
+G2B_RESULT_CODES = Counter(
+    "pps_g2b_result_codes_total", "나라장터 API 응답 resultCode (JSON 이 아니면 invalid)", ("operation", "result_code"))
+
+PARTICIPANT_ROWS = Counter(
+    "pps_bid_participants_inserted_rows_total", "bid_participants 에 저장된 행 수 (upsert 는 갱신 포함)", ("mode",))
+
+CACHE_REQUESTS = Counter(
+    "pps_cache_requests_total", "캐시 조회 결과", ("cache", "result"))
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def set_endpoint(endpoint):
+    """현재 스레드에서 처리 중인 엔드포인트 (DB 쿼리 메트릭 레이블)"""
+    _local.endpoint = endpoint
+
+
+def current_endpoint():
+    return getattr(_local, "endpoint", None) or "none"
+
+
+def _pool_lines():
+    """커넥션 풀 상태 (풀이 이미 만들어진 경우만)"""
+    from api import _db
+
+    pool = _db._pool
+    if pool is None:
+        return []
+    stats = pool.stats()
+    lines = [
+        "# HELP pps_db_pool_connections 커넥션 풀 연결 수",
+        "# TYPE pps_db_pool_connections gauge",
+    ]
+    for state in ("size", "idle", "in_use"):
+        lines.append(f'pps_db_pool_connections{{state="{state}"}} {stats[state]}')
+    return lines
+
+
+def render():
+    """Prometheus 텍스트 형식 (version 0.0.4)"""
+    lines = [
+        "# HELP pps_process_start_time_seconds 프로세스 시작 시각 (unix 초)",
+        "# TYPE pps_process_start_time_seconds gauge",
+        f"pps_process_start_time_seconds {PROCESS_START_TIME:.3f}",
+    ]
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_pool_lines())
+    return "\n".join(lines) + "\n"
+
+
+def authorized(handler, query, require_token=False):
+    """METRICS_TOKEN 이 설정돼 있으면 토큰 확인 (require_token 이면 미설정 시 거부)"""
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        return not require_token
+    supplied = query.get("token", [None])[0]
+    header = handler.headers.get("Authorization", "") if getattr(handler, "headers", None) else ""
+    if header.startswith("Bearer "):
+        supplied = header[len("Bearer "):]
+    # 비 ASCII 문자열은 compare_digest 가 TypeError 를 내므로 바이트로 비교
+    return bool(supplied) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def send_metrics(handler, query, require_token=False):
+    if not authorized(handler, query, require_token):
+        handler.send_response(401)
+        handler.send_header("Content-Type", "text/plain; charset=utf-8")
+        handler.end_headers()
+        handler.wfile.write(b"unauthorized\n")
+        return
+    body = render().encode()
+    handler.send_response(200)
+    handler.send_header("Content-Type", CONTENT_TYPE)
+    handler.send_header("Cache-Control", "no-store")
+    handler.end_headers()
+    handler.wfile.write(body)
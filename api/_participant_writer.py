@@ -0,0 +1,148 @@
+"""
+bid_participants 일괄 저장
+
+여러 입찰건의 참가업체 행을 모아 임시 staging 테이블로 COPY 한 뒤
+INSERT ... SELECT ... ON CONFLICT DO NOTHING 한 문장으로 병합한다.
+행마다 INSERT 하던 왕복 비용 대신 배치당 세 문장(TRUNCATE, COPY, INSERT)만 든다.
+
+배치가 실패하면 (타입/길이 오류 등) 그 배치만 행 단위 SAVEPOINT 로 다시 넣고
+실패한 행의 오류를 해당 입찰건 debug["save_errors"] 에 남긴다.
+
+upsert=True 이면 기존 행을 새 값으로 덮어쓴다 (보관본 재적재 등).
+"""
+import csv
+import io
+
+import psycopg2
+
+from api import _metrics
+
+
+PARTICIPANT_COLUMNS = [
+    "bid_ntce_no", "bid_ntce_ord", "bid_clsfc_no",
+    "prtcpt_nm", "prtcpt_bizno", "prtcpt_ceo_nm",
+    "bid_amt", "bid_rate", "rank", "is_winner", "openg_dt",
+]
+
+# 한 번에 COPY 하는 최대 행 수
+BULK_BATCH_ROWS = 5000
+
+_COLUMN_LIST = ", ".join(PARTICIPANT_COLUMNS)
+_CONFLICT_KEY = "bid_ntce_no, bid_ntce_ord, prtcpt_bizno"
+_UPDATE_LIST = ", ".join(
+    f"{column} = EXCLUDED.{column}"
+    for column in PARTICIPANT_COLUMNS
+    if column not in ("bid_ntce_no", "bid_ntce_ord", "prtcpt_bizno")
+)
+
+
+class ParticipantWriter:
+    """
+    입찰건 단위로 add() 하고 flush() 로 일괄 저장 (flush 마다 commit)
+
+        writer = ParticipantWriter(cursor)
+        writer.add((bid_ntce_no, bid_ntce_ord), rows, debug_info)
+        writer.flush()
+        writer.saved[(bid_ntce_no, bid_ntce_ord)]   # 새로 저장된(upsert 면 저장/갱신된) 행 수
+
+    rows 는 PARTICIPANT_COLUMNS 순서의 튜플 목록이며 bid_ntce_no, bid_ntce_ord 는 key 와 같아야 한다.
+    """
+
+    def __init__(self, cursor, batch_rows=BULK_BATCH_ROWS, upsert=False):
+        self.cursor = cursor
+        self.batch_rows = batch_rows
+        self.upsert = upsert
+        self.saved = {}
+        self._rows = []
+        self._debug = {}
+        self._staging_ready = False
+
+    def add(self, key, rows, debug_info=None):
+        self.saved.setdefault(key, 0)
+        if debug_info is not None:
+            self._debug[key] = debug_info
+        self._rows.extend(rows)
+        if len(self._rows) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+
+        conn = self.cursor.connection
+        try:
+            inserted = self._copy_and_merge(rows)
+        except psycopg2.Error:
+            conn.rollback()
+            self._staging_ready = False
+            inserted = self._insert_row_by_row(rows)
+
+        for key in inserted:
+            self.saved[key] = self.saved.get(key, 0) + 1
+        conn.commit()
+        _metrics.PARTICIPANT_ROWS.inc(len(inserted), mode="upsert" if self.upsert else "insert")
+
+    def _conflict_clause(self):
+        if self.upsert:
+            return f"ON CONFLICT ({_CONFLICT_KEY}) DO UPDATE SET {_UPDATE_LIST}"
+        return f"ON CONFLICT ({_CONFLICT_KEY}) DO NOTHING"
+
+    def _ensure_staging(self):
+        if self._staging_ready:
+            return
+        # 풀 연결에서 재사용되는 세션 임시 테이블 (커밋 시 비워짐)
+        self.cursor.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS bid_participants_staging
+            ON COMMIT DELETE ROWS
+            AS SELECT {_COLUMN_LIST} FROM bid_participants WITH NO DATA
+        """)
+        self._staging_ready = True
+
+    def _copy_and_merge(self, rows):
+        """COPY → 집합 병합, 새로 저장된 행의 (bid_ntce_no, bid_ntce_ord) 목록 반환"""
+        self._ensure_staging()
+        self.cursor.execute("TRUNCATE bid_participants_staging")
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if value is None else value for value in row])
+        buffer.seek(0)
+
+        self.cursor.copy_expert(
+            f"COPY bid_participants_staging ({_COLUMN_LIST}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+        # 같은 배치 안의 중복 키는 하나만 (DO UPDATE 는 같은 행을 두 번 갱신할 수 없음)
+        self.cursor.execute(f"""
+            INSERT INTO bid_participants ({_COLUMN_LIST})
+            SELECT DISTINCT ON ({_CONFLICT_KEY}) {_COLUMN_LIST}
+            FROM bid_participants_staging
+            {self._conflict_clause()}
+            RETURNING bid_ntce_no, bid_ntce_ord
+        """)
+        return [(row[0], row[1]) for row in self.cursor.fetchall()]
+
+    def _insert_row_by_row(self, rows):
+        """배치 실패 시 행 단위 저장 (실패한 행은 debug 에 기록)"""
+        inserted = []
+        placeholders = ", ".join(["%s"] * len(PARTICIPANT_COLUMNS))
+        for row in rows:
+            self.cursor.execute("SAVEPOINT participant_row")
+            try:
+                self.cursor.execute(f"""
+                    INSERT INTO bid_participants ({_COLUMN_LIST})
+                    VALUES ({placeholders})
+                    {self._conflict_clause()}
+                    RETURNING bid_ntce_no, bid_ntce_ord
+                """, list(row))
+                if self.cursor.fetchone():
+                    inserted.append((row[0], row[1]))
+                self.cursor.execute("RELEASE SAVEPOINT participant_row")
+            except psycopg2.Error as e:
+                self.cursor.execute("ROLLBACK TO SAVEPOINT participant_row")
+                debug_info = self._debug.get((row[0], row[1]))
+                if debug_info is not None:
+                    debug_info.setdefault("save_errors", []).append(str(e)[:100])
+        return inserted
@@ -0,0 +1,98 @@
+"""
+낙찰률 분포 큐브 조회 (sql/004_rate_cube.sql)
+
+입찰유형 × log 금액 구간 × 참가업체수 셀의 히스토그램 칸을 SQL 에서 합산하고 (cell_conditions),
+병합된 히스토그램으로 표본 수/평균/표준편차/분위수/최소/최대를 계산한다.
+
+- 건수, 평균, 표준편차, 최소, 최대: 원본과 동일 (칸별 합/제곱합/최소/최대 보관)
+- 분위수: 해당 칸의 최소~최대 사이 선형 보간 (칸 폭 0.05%p 이내 오차)
+- 금액 조건은 구간 단위로 확장된다 (양 끝 최대 한 구간, 약 12%)
+"""
+import math
+
+
+# sql/004_rate_cube.sql 의 구간 정의와 동일
+AMOUNT_BUCKETS_PER_DECADE = 20
+MAX_PARTICIPANT_BUCKET = 100
+
+
+def amount_bucket(amount):
+    return int(math.floor(math.log10(amount) * AMOUNT_BUCKETS_PER_DECADE))
+
+
+def participant_bucket(participants):
+    return min(participants, MAX_PARTICIPANT_BUCKET)
+
+
+def cell_conditions(min_amount, max_amount, bid_type=None,
+                    min_participants=None, max_participants=None):
+    """
+    원본 조건 → pps_bid.rate_cube 셀 조건 (sql, params)
+
+    금액/참가업체수 범위는 해당 값이 속한 구간 전체로 넓어진다.
+    """
+    conditions = ["amount_bucket BETWEEN %s AND %s"]
+    params = [amount_bucket(max(min_amount, 1)), amount_bucket(max(max_amount, 1))]
+
+    if bid_type:
+        conditions.append("bid_type = %s")
+        params.append(bid_type)
+
+    if min_participants is not None:
+        conditions.append("participant_bucket BETWEEN %s AND %s")
+        params.extend([participant_bucket(min_participants), participant_bucket(max_participants)])
+
+    return " AND ".join(conditions), params
+
+
+def summarize_histogram(bins):
+    """
+    병합된 히스토그램 → 통계
+
+    bins: rate_bin 오름차순 [(cnt, rate_sum, rate_sumsq, rate_min, rate_max)]
+    """
+    total = sum(b[0] for b in bins)
+    if not total:
+        return {"sample_count": 0}
+
+    rate_sum = sum(b[1] for b in bins)
+    rate_sumsq = sum(b[2] for b in bins)
+    mean = rate_sum / total
+    std = None
+    if total > 1:
+        variance = (rate_sumsq - rate_sum * rate_sum / total) / (total - 1)
+        std = math.sqrt(max(variance, 0.0))
+
+    return {
+        "sample_count": total,
+        "mean": mean,
+        "std": std,
+        "q1": _histogram_quantile(bins, total, 0.25),
+        "median": _histogram_quantile(bins, total, 0.5),
+        "q3": _histogram_quantile(bins, total, 0.75),
+        "min": bins[0][3],
+        "max": bins[-1][4],
+    }
+
+
+def _histogram_kth(bins, k):
+    """0 부터 센 k 번째 값 (칸 안에서는 최소~최대 선형 보간)"""
+    seen = 0
+    for cnt, _, _, rate_min, rate_max in bins:
+        if k < seen + cnt:
+            if cnt == 1:
+                return rate_min
+            return rate_min + (rate_max - rate_min) * (k - seen) / (cnt - 1)
+        seen += cnt
+    return bins[-1][4]
+
+
+def _histogram_quantile(bins, total, q):
+    """PERCENTILE_CONT(q) 근사"""
+    position = q * (total - 1)
+    lower = int(math.floor(position))
+    upper = int(math.ceil(position))
+    lower_value = _histogram_kth(bins, lower)
+    if upper == lower:
+        return lower_value
+    return lower_value + (_histogram_kth(bins, upper) - lower_value) * (position - lower)
@@ -0,0 +1,373 @@
+"""
+낙찰률 정렬 인덱스 (프로세스 메모리)
+
+/api/probability 가 매 호출마다 PERCENTILE_CONT + COUNT(*) FILTER 두 번 스캔하던 것을
+입찰유형 × 금액 구간 × 참가업체수 구간별로 정렬된 sucsf_bid_rate NumPy 배열로 대체한다.
+
+- 분위수(PERCENTILE_CONT 와 동일한 선형 보간), 평균/표본표준편차, 특정 투찰률보다 높은 건수를
+  searchsorted 로 계산
+- 금액/참가업체수 조건 경계에 걸친 구간만 마스킹하고 나머지는 미리 계산한 합계를 그대로 사용
+- 워터마크가 바뀌거나 RATE_INDEX_MAX_AGE 초가 지나면 재구축
+  워터마크: 최신 등록일 + bid_results 누적 INSERT/DELETE 수 (등록일이 과거인 늦은 적재 포함)
+           + 마지막 낙찰 상태 라벨 갱신 시각 (refresh_award_status_labels)
+- 구축은 요청 밖 백그라운드 스레드에서 별도 커넥션("rate-index" statement_timeout)으로 하고,
+  구축 중에는 이전 인덱스를 (없으면 None → 호출 측 SQL 집계) 그대로 쓴다
+  (서버리스에서는 응답 후 인스턴스가 멈추면 구축도 다음 호출까지 멈춘다)
+"""
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from api import _metrics
+from api._db import get_connection
+
+
+# 금액 구간: log10(금액) 을 이 값으로 나눈 눈금 (10 → 구간 폭 약 26%)
+AMOUNT_BANDS_PER_DECADE = 10
+# 참가업체수 구간 폭
+PARTICIPANT_BAND_WIDTH = 5
+
+# 워터마크 확인 주기 / 최대 보관 시간 (초)
+WATERMARK_CHECK_INTERVAL = int(os.getenv("RATE_INDEX_CHECK_INTERVAL", "60"))
+RATE_INDEX_MAX_AGE = int(os.getenv("RATE_INDEX_MAX_AGE", "3600"))
+# 추정 행 수가 이보다 많으면 인덱스를 만들지 않음 (메모리 보호, 약 20 bytes/행)
+RATE_INDEX_MAX_ROWS = int(os.getenv("RATE_INDEX_MAX_ROWS", "20000000"))
+RATE_INDEX_ENABLED = os.getenv("RATE_INDEX_ENABLED", "1") == "1"
+
+LOAD_BATCH_SIZE = 50000
+# 이 건수 이하의 분포는 배열 하나로 병합해 분위수 계산 (초과 시 배열별 searchsorted 선택)
+MERGE_THRESHOLD = 500000
+
+
+class RateDistribution:
+    """조건에 맞는 낙찰률 분포 (정렬된 배열 여러 개의 합집합)"""
+
+    def __init__(self, parts, total, rate_sum, rate_sumsq):
+        self.parts = [part for part in parts if len(part)]
+        self.total = total
+        self.rate_sum = rate_sum
+        self.rate_sumsq = rate_sumsq
+        self._merged = None
+
+    def mean(self):
+        return self.rate_sum / self.total if self.total else None
+
+    def std(self):
+        """표본표준편차 (STDDEV 와 동일, n-1)"""
+        if self.total < 2:
+            return None
+        variance = (self.rate_sumsq - self.rate_sum * self.rate_sum / self.total) / (self.total - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def kth(self, k):
+        """0 부터 센 k 번째로 작은 값"""
+        if len(self.parts) == 1:
+            return float(self.parts[0][k])
+        if self.total <= MERGE_THRESHOLD:
+            return float(self.values()[k])
+
+        lo = [0] * len(self.parts)
+        hi = [len(part) for part in self.parts]
+        while True:
+            # 남은 범위가 가장 큰 배열의 중앙값을 기준으로 범위를 절반씩 줄임
+            widest = max(range(len(self.parts)), key=lambda i: hi[i] - lo[i])
+            pivot = self.parts[widest][(lo[widest] + hi[widest]) // 2]
+
+            less = [int(np.searchsorted(part, pivot, "left")) for part in self.parts]
+            less_equal = [int(np.searchsorted(part, pivot, "right")) for part in self.parts]
+            if sum(less) <= k < sum(less_equal):
+                return float(pivot)
+            if k < sum(less):
+                hi = [min(h, n) for h, n in zip(hi, less)]
+            else:
+                lo = [max(l, n) for l, n in zip(lo, less_equal)]
+
+    def quantile(self, q):
+        """PERCENTILE_CONT(q) 와 동일한 선형 보간 분위수"""
+        if not self.total:
+            return None
+        position = q * (self.total - 1)
+        lower = int(math.floor(position))
+        upper = int(math.ceil(position))
+        lower_value = self.kth(lower)
+        if upper == lower:
+            return lower_value
+        return lower_value + (self.kth(upper) - lower_value) * (position - lower)
+
+    def min(self):
+        return min(float(part[0]) for part in self.parts) if self.parts else None
+
+    def max(self):
+        return max(float(part[-1]) for part in self.parts) if self.parts else None
+
+    def count_above(self, rates):
+        """각 rate 보다 큰 값의 개수 (rates: 스칼라 또는 배열)"""
+        rates = np.asarray(rates, dtype=np.float64)
+        if self._merged is not None or (len(self.parts) > 1 and self.total <= MERGE_THRESHOLD):
+            return self.total - np.searchsorted(self.values(), rates, "right")
+        counts = np.zeros(rates.shape, dtype=np.int64)
+        for part in self.parts:
+            counts += len(part) - np.searchsorted(part, rates, "right")
+        return counts
+
+    def values(self):
+        """전체 값을 정렬된 하나의 배열로 (시뮬레이션 등 전체 표본이 필요한 경우)"""
+        if not self.parts:
+            return np.empty(0, dtype=np.float64)
+        if len(self.parts) == 1:
+            return self.parts[0]
+        if self._merged is None:
+            self._merged = np.sort(np.concatenate(self.parts))
+        return self._merged
+
+
+class RateIndex:
+    """입찰유형 × 금액 구간 × 참가업체수 구간별 정렬 낙찰률 배열"""
+
+    def __init__(self, watermark):
+        self.watermark = watermark
+        self.built_at = time.monotonic()
+        self.row_count = 0
+        self.segment_count = 0
+
+        # 구간별 데이터 (낙찰률 오름차순)
+        self._rates = []
+        self._amounts = []
+        self._participants = []
+        self._rate_sum = None
+        self._rate_sumsq = None
+
+        # 구간 메타 (구간 선택을 벡터 연산으로)
+        self._bid_types = None
+        self._amount_min = None
+        self._amount_max = None
+        self._participants_min = None
+        self._participants_max = None
+
+    @classmethod
+    def build(cls, conn, watermark):
+        """bid_results 를 서버 측 커서로 읽어 인덱스 구성"""
+        type_codes = {}
+        chunks = []
+
+        load_cursor = conn.cursor(name="rate_index_load")
+        load_cursor.itersize = LOAD_BATCH_SIZE
+        load_cursor.execute("""
+            SELECT bid_type, sucsf_bid_amt, COALESCE(prtcpt_cnum, -1), sucsf_bid_rate
+            FROM bid_results
+            WHERE sucsf_bid_rate IS NOT NULL
+                AND sucsf_bid_amt > 0
+        """)
+        try:
+            while True:
+                batch = load_cursor.fetchmany(LOAD_BATCH_SIZE)
+                if not batch:
+                    break
+                chunks.append((
+                    np.fromiter((type_codes.setdefault(row[0], len(type_codes)) for row in batch),
+                                dtype=np.int32, count=len(batch)),
+                    np.fromiter((row[1] for row in batch), dtype=np.int64, count=len(batch)),
+                    np.fromiter((row[2] for row in batch), dtype=np.int32, count=len(batch)),
+                    np.fromiter((row[3] for row in batch), dtype=np.float64, count=len(batch)),
+                ))
+        finally:
+            load_cursor.close()
+
+        index = cls(watermark)
+        if not chunks:
+            index._bid_types = np.empty(0, dtype=object)
+            return index
+
+        type_col = np.concatenate([chunk[0] for chunk in chunks])
+        amount_col = np.concatenate([chunk[1] for chunk in chunks])
+        participant_col = np.concatenate([chunk[2] for chunk in chunks])
+        rate_col = np.concatenate([chunk[3] for chunk in chunks])
+        del chunks
+
+        amount_band = np.floor(np.log10(amount_col) * AMOUNT_BANDS_PER_DECADE).astype(np.int64)
+        participant_band = participant_col // PARTICIPANT_BAND_WIDTH
+
+        # 구간 키 → 낙찰률 순 정렬
+        order = np.lexsort((rate_col, participant_band, amount_band, type_col))
+        type_col = type_col[order]
+        amount_col = amount_col[order]
+        participant_col = participant_col[order]
+        rate_col = rate_col[order]
+        amount_band = amount_band[order]
+        participant_band = participant_band[order]
+
+        key_changed = (
+            (np.diff(type_col) != 0)
+            | (np.diff(amount_band) != 0)
+            | (np.diff(participant_band) != 0)
+        )
+        starts = np.concatenate(([0], np.flatnonzero(key_changed) + 1))
+        ends = np.concatenate((starts[1:], [len(rate_col)]))
+
+        type_names = {code: name for name, code in type_codes.items()}
+        bid_types = []
+        amount_min, amount_max, participants_min, participants_max = [], [], [], []
+        for start, end in zip(starts, ends):
+            index._rates.append(rate_col[start:end])
+            index._amounts.append(amount_col[start:end])
+            index._participants.append(participant_col[start:end])
+            bid_types.append(type_names[int(type_col[start])])
+            amount_min.append(amount_col[start:end].min())
+            amount_max.append(amount_col[start:end].max())
+            participants_min.append(participant_col[start:end].min())
+            participants_max.append(participant_col[start:end].max())
+
+        index._bid_types = np.array(bid_types, dtype=object)
+        index._amount_min = np.array(amount_min, dtype=np.int64)
+        index._amount_max = np.array(amount_max, dtype=np.int64)
+        index._participants_min = np.array(participants_min, dtype=np.int64)
+        index._participants_max = np.array(participants_max, dtype=np.int64)
+        index._rate_sum = np.add.reduceat(rate_col, starts)
+        index._rate_sumsq = np.add.reduceat(rate_col * rate_col, starts)
+        index.row_count = len(rate_col)
+        index.segment_count = len(starts)
+        return index
+
+    def select(self, bid_type=None, min_amount=None, max_amount=None,
+               min_participants=None, max_participants=None):
+        """
+        조건에 맞는 분포 조회
+
+        bid_type = %s, sucsf_bid_amt BETWEEN, prtcpt_cnum BETWEEN 조건과 같은 결과를 낸다.
+        """
+        if not self.segment_count:
+            return RateDistribution([], 0, 0.0, 0.0)
+
+        amount_lo = min_amount if min_amount is not None else -np.inf
+        amount_hi = max_amount if max_amount is not None else np.inf
+        participants_lo = min_participants if min_participants is not None else -np.inf
+        participants_hi = max_participants if max_participants is not None else np.inf
+
+        overlaps = (
+            (self._amount_max >= amount_lo) & (self._amount_min <= amount_hi)
+            & (self._participants_max >= participants_lo) & (self._participants_min <= participants_hi)
+        )
+        if bid_type:
+            overlaps &= self._bid_types == bid_type
+        contained = (
+            (self._amount_min >= amount_lo) & (self._amount_max <= amount_hi)
+            & (self._participants_min >= participants_lo) & (self._participants_max <= participants_hi)
+        )
+
+        parts = []
+        total = 0
+        rate_sum = 0.0
+        rate_sumsq = 0.0
+        for i in np.flatnonzero(overlaps):
+            rates = self._rates[i]
+            if contained[i]:
+                parts.append(rates)
+                total += len(rates)
+                rate_sum += float(self._rate_sum[i])
+                rate_sumsq += float(self._rate_sumsq[i])
+                continue
+
+            # 경계 구간: 마스킹해도 정렬 순서 유지
+            amounts = self._amounts[i]
+            participants = self._participants[i]
+            mask = (
+                (amounts >= amount_lo) & (amounts <= amount_hi)
+                & (participants >= participants_lo) & (participants <= participants_hi)
+            )
+            selected = rates[mask]
+            if len(selected):
+                parts.append(selected)
+                total += len(selected)
+                rate_sum += float(selected.sum())
+                rate_sumsq += float((selected * selected).sum())
+
+        return RateDistribution(parts, total, rate_sum, rate_sumsq)
+
+
+_index = None
+_index_lock = threading.Lock()
+_last_checked = 0.0
+_building = False
+
+
+def _read_watermark(cursor):
+    cursor.execute("""
+        SELECT concat_ws('/',
+            (SELECT MAX(rgst_dt) FROM bid_results),
+            (SELECT n_tup_ins + n_tup_del FROM pg_stat_user_tables WHERE relid = 'bid_results'::regclass),
+            (SELECT MAX(last_run_at) FROM pps_bid.etl_checkpoint
+             WHERE job_name = 'refresh_award_status_labels'))
+    """)
+    return cursor.fetchone()[0]
+
+
+def _estimated_rows(cursor):
+    cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = 'bid_results'::regclass")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def _build(watermark):
+    """백그라운드 구축 (실패하면 다음 워터마크 확인 때 다시 시도)"""
+    global _index, _building
+    try:
+        with get_connection("rate-index") as conn:
+            index = RateIndex.build(conn, watermark)
+        with _index_lock:
+            _index = index
+    except Exception as e:
+        print(f"[rate-index] 구축 실패: {e}", file=sys.stderr)
+    finally:
+        with _index_lock:
+            _building = False
+
+
+def get_rate_index(conn):
+    """
+    프로세스 전역 인덱스 조회 (없거나 워터마크가 바뀌었으면 백그라운드 재구축 시작)
+
+    비활성화되어 있거나, 테이블이 너무 크거나, 아직 구축 중이면 None → 호출 측은 SQL 집계로 처리
+    """
+    global _index, _last_checked, _building
+
+    if not RATE_INDEX_ENABLED:
+        return None
+
+    now = time.monotonic()
+    index = _index
+    if index is not None and now - _last_checked < WATERMARK_CHECK_INTERVAL:
+        _metrics.record_cache("rate_index", True)
+        return index
+
+    with _index_lock:
+        index = _index
+        if index is not None and now - _last_checked < WATERMARK_CHECK_INTERVAL:
+            _metrics.record_cache("rate_index", True)
+            return index
+        if _building:
+            return index
+
+        cursor = conn.cursor()
+        watermark = _read_watermark(cursor)
+        _last_checked = time.monotonic()
+        if (
+            index is not None
+            and index.watermark == watermark
+            and now - index.built_at < RATE_INDEX_MAX_AGE
+        ):
+            _metrics.record_cache("rate_index", True)
+            return index
+
+        _metrics.record_cache("rate_index", False)
+        if _estimated_rows(cursor) > RATE_INDEX_MAX_ROWS:
+            _index = None
+            return None
+
+        _building = True
+
+    threading.Thread(target=_build, args=(watermark,), name="rate-index-build", daemon=True).start()
+    return index
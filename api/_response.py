@@ -0,0 +1,77 @@
+"""
+공용 JSON 응답 / 요청 계측
+
+모든 api/*.py 핸들러의 _send_response 가 사용한다.
+- 요청 중 실행한 SQL 소요 시간을 Server-Timing 헤더로 전송 (api/_timing.py)
+- DEBUG_TIMINGS=1 또는 ?debug=timings 이면 본문에 _timings 필드 추가
+
+track_request 는 do_GET 에 붙여 요청 수/처리 시간 메트릭을 남긴다 (api/_metrics.py).
+"""
+import functools
+import json
+import os
+import time
+from urllib.parse import parse_qs, urlparse
+
+from api import _metrics, _timing
+
+
+def timings_requested(handler):
+    if os.getenv("DEBUG_TIMINGS", "").lower() in ("1", "true", "yes"):
+        return True
+    query = parse_qs(urlparse(getattr(handler, "path", "") or "").query)
+    return "timings" in query.get("debug", [])
+
+
+def send_json(handler, status_code, data):
+    entries = _timing.take()
+    if isinstance(data, dict) and timings_requested(handler):
+        data = dict(data, _timings=_timing.summary(entries))
+
+    handler.send_response(status_code)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Access-Control-Allow-Origin", "*")
+    handler.send_header("Server-Timing", _timing.server_timing(entries))
+    handler.send_header("Timing-Allow-Origin", "*")
+    handler.end_headers()
+    handler.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+
+
+def track_request(endpoint):
+    """
+    do_GET 데코레이터: 엔드포인트별 요청 수(상태 코드별)와 처리 시간 기록
+
+    ?metrics=1 이면 요청을 처리하지 않고 이 프로세스의 메트릭을 Prometheus 형식으로 반환
+    (서버리스에서는 함수마다 프로세스가 따로라서 엔드포인트 URL 로 직접 수집)
+    공개 엔드포인트이므로 METRICS_TOKEN 이 설정돼 있고 일치할 때만 내보낸다 (아니면 401)
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(handler):
+            query = parse_qs(urlparse(getattr(handler, "path", "") or "").query)
+            if "1" in query.get("metrics", []):
+                _metrics.send_metrics(handler, query, require_token=True)
+                return
+
+            # 이전 요청에서 내보내지 못한 쿼리 기록 폐기
+            _timing.take()
+            _metrics.set_endpoint(endpoint)
+            statuses = []
+            send_response = handler.send_response
+
+            def capture(code, message=None):
+                statuses.append(code)
+                send_response(code, message)
+
+            handler.send_response = capture
+            started = time.perf_counter()
+            try:
+                return method(handler)
+            finally:
+                elapsed = time.perf_counter() - started
+                del handler.send_response
+                _metrics.set_endpoint(None)
+                _metrics.REQUESTS.inc(endpoint=endpoint, status=str(statuses[0]) if statuses else "none")
+                _metrics.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+        return wrapper
+    return decorator
@@ -0,0 +1,164 @@
+"""
+투찰 결과 몬테카를로 시뮬레이션 (/api/probability)
+
+유사 공고들의 실제 참가업체 투찰률(bid_participants.bid_rate)을 경험 분포로 쓴다.
+한 번의 시행은
+  1. 유사 공고 하나를 무작위로 고르고
+  2. 그 공고의 투찰률 분포에서 경쟁업체 N 개의 투찰률을 복원 추출한 뒤
+  3. 내 투찰률보다 낮은(앞선) 경쟁업체 수로 순위를 정한다. (낮은 투찰률 = 높은 순위)
+
+경쟁업체를 독립 추출하면 "나보다 앞선 업체 수"는 Binomial(N, p_b) 를 따르므로
+(p_b = 공고 b 에서 내 투찰률보다 낮은 비율, 동률은 1/2) 개별 투찰률 대신
+이 값을 직접 추출한다. 분포는 동일하고 시행당 난수 두 개로 끝나므로
+10만 회도 수 ms 안에 계산된다.
+
+여러 투찰률을 한 번에 평가할 때는 (simulate_curve) 같은 시드로 공고를 같게 추출하고
+이항 추출 대신 추출된 공고별 정확한 값 (1 - p_b)^N, N * p_b 를 평균한다.
+기댓값은 simulate 와 같고 투찰률 × 공고 행렬 연산 한 번으로 끝난다.
+"""
+import numpy as np
+
+
+DEFAULT_TRIALS = 20000
+MAX_TRIALS = 100000
+DEFAULT_SEED = 0
+
+# 시뮬레이션에 사용할 최근 유사 공고 수 상한
+MAX_HISTORY_BIDS = 2000
+# 이보다 유사 공고가 적으면 시뮬레이션하지 않음
+MIN_HISTORY_BIDS = 10
+
+
+class BidHistory:
+    """
+    공고별 참가업체 투찰률
+
+    rates: 공고 순으로 이어 붙인 투찰률 (공고 안에서는 정렬)
+    offsets: 공고별 시작 위치 (len = 공고 수 + 1)
+    """
+
+    def __init__(self, rates, offsets):
+        self.rates = rates
+        self.offsets = offsets
+        self.sizes = np.diff(offsets)
+
+    @property
+    def bid_count(self):
+        return len(self.sizes)
+
+    @property
+    def participant_count(self):
+        return len(self.rates)
+
+    def beat_probabilities(self, my_rate):
+        """공고별로 경쟁업체 한 곳이 my_rate 보다 앞설 확률 (동률은 1/2)"""
+        below = np.add.reduceat((self.rates < my_rate).astype(np.int64), self.offsets[:-1])
+        equal = np.add.reduceat((self.rates == my_rate).astype(np.int64), self.offsets[:-1])
+        return (below + 0.5 * equal) / self.sizes
+
+    def beat_probability_matrix(self, my_rates):
+        """beat_probabilities 를 여러 투찰률에 대해 한 번에 (행: 투찰률, 열: 공고)"""
+        my_rates = np.asarray(my_rates, dtype=np.float64)
+        # 투찰률을 정수 순위로 바꿔 (공고, 순위) 키가 전체 정렬되도록 한다
+        values, inverse = np.unique(np.concatenate([self.rates, my_rates]), return_inverse=True)
+        stride = len(values) + 1
+        bid_keys = np.arange(self.bid_count, dtype=np.int64) * stride
+        keys = np.repeat(bid_keys, self.sizes) + inverse[:len(self.rates)]
+        queries = inverse[len(self.rates):, None] + bid_keys[None, :]
+        starts = self.offsets[:-1]
+        below = np.searchsorted(keys, queries, side="left") - starts
+        equal = np.searchsorted(keys, queries, side="right") - starts - below
+        return (below + 0.5 * equal) / self.sizes
+
+
+def load_bid_history(cursor, where_clause, params, max_bids=MAX_HISTORY_BIDS):
+    """
+    조건(bid_results 별칭 b)에 맞는 최근 공고들의 참가업체 투찰률 조회
+
+    참가업체 정보가 없는 공고는 제외된다.
+    """
+    cursor.execute(f"""
+        WITH similar AS (
+            SELECT b.bid_ntce_no, COALESCE(b.bid_ntce_ord, '00') AS bid_ntce_ord
+            FROM bid_results b
+            WHERE {where_clause}
+            ORDER BY b.rgst_dt DESC
+            LIMIT %s
+        )
+        SELECT s.bid_ntce_no, s.bid_ntce_ord, p.bid_rate::float8
+        FROM similar s
+        JOIN bid_participants p
+            ON p.bid_ntce_no = s.bid_ntce_no
+            AND p.bid_ntce_ord = s.bid_ntce_ord
+        WHERE p.bid_rate > 0
+        ORDER BY s.bid_ntce_no, s.bid_ntce_ord, p.bid_rate
+    """, params + [max_bids])
+
+    rows = cursor.fetchall()
+    rates = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+
+    starts = [0]
+    for i in range(1, len(rows)):
+        if rows[i][0] != rows[i - 1][0] or rows[i][1] != rows[i - 1][1]:
+            starts.append(i)
+    offsets = np.array(starts + [len(rows)] if rows else [0], dtype=np.int64)
+
+    return BidHistory(rates, offsets)
+
+
+def simulate(history, my_rate, competitors=None, trials=DEFAULT_TRIALS, seed=DEFAULT_SEED):
+    """
+    my_rate 로 투찰했을 때 낙찰 확률과 순위 분포
+
+    competitors: 경쟁업체 수 (None 이면 추출된 공고의 실제 참가업체 수 - 1)
+    반환: win_probability(%), expected_rank, rank_distribution[{rank, probability(%)}]
+    """
+    rng = np.random.default_rng(seed)
+
+    bids = rng.integers(0, history.bid_count, size=trials)
+    if competitors is None:
+        counts = np.maximum(history.sizes[bids] - 1, 0)
+    else:
+        counts = np.full(trials, max(competitors, 0), dtype=np.int64)
+
+    beaten_by = rng.binomial(counts, history.beat_probabilities(my_rate)[bids])
+    ranks = beaten_by + 1
+
+    rank_counts = np.bincount(ranks)
+    rank_distribution = [
+        {"rank": rank, "probability": round(float(count) / trials * 100, 2)}
+        for rank, count in enumerate(rank_counts.tolist())
+        if count
+    ]
+
+    return {
+        "win_probability": round(float(rank_counts[1]) / trials * 100, 1) if len(rank_counts) > 1 else 0.0,
+        "expected_rank": round(float(ranks.mean()), 2),
+        "rank_distribution": rank_distribution,
+        "trials": trials,
+        "seed": seed,
+        "history_bids": history.bid_count,
+        "history_participants": history.participant_count,
+    }
+
+
+def simulate_curve(history, my_rates, competitors=None, trials=DEFAULT_TRIALS, seed=DEFAULT_SEED):
+    """
+    여러 투찰률의 낙찰 확률과 기대 순위
+
+    반환: (win_probabilities(%), expected_ranks) 배열, my_rates 순서
+    """
+    rng = np.random.default_rng(seed)
+
+    # 공고별 추출 비율 (simulate 와 같은 시드면 같은 추출)
+    bids = rng.integers(0, history.bid_count, size=trials)
+    weights = np.bincount(bids, minlength=history.bid_count) / trials
+    if competitors is None:
+        counts = np.maximum(history.sizes - 1, 0)
+    else:
+        counts = max(competitors, 0)
+
+    beat = history.beat_probability_matrix(my_rates)
+    win_probabilities = ((1 - beat) ** counts) @ weights * 100
+    expected_ranks = 1 + (beat * counts) @ weights
+    return win_probabilities, expected_ranks
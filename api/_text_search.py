@@ -0,0 +1,76 @@
+"""
+부분 문자열 검색 조건 생성
+
+bid_ntce_nm / dminstt_nm / bidwinnr_nm 에 대한 LIKE '%term%' 를 인덱스를 탈 수 있는 형태로 만든다.
+(인덱스 정의: sql/003_text_search.sql)
+
+- bid_ntce_nm: 한글 2-gram tsvector GIN 인덱스(pps_bid.ko_bigram_tsvector)로 후보를 좁힌 뒤 LIKE 로 재확인
+- dminstt_nm, bidwinnr_nm: pg_trgm GIN 인덱스가 LIKE 를 직접 처리
+- 정렬용 유사도 점수: pg_trgm similarity()
+"""
+import re
+
+
+# 2-gram tsvector 인덱스가 있는 컬럼 → 인덱스 식
+TOKENIZED_COLUMNS = {
+    "bid_ntce_nm": "pps_bid.ko_bigram_tsvector(bid_ntce_nm)",
+}
+
+# SQL 함수 pps_bid.ko_bigram_tsvector 와 같은 규칙 (소문자화 후 영숫자/한글 연속 구간 단위)
+_TOKEN_RUN = re.compile(r"[0-9a-z가-힣]+")
+
+
+def tokenize(text):
+    """
+    한글 인식 2-gram 토크나이저
+
+    영숫자/한글 연속 구간마다 인접한 두 글자씩 잘라 토큰으로 만든다.
+    '도로포장공사' → ['도로', '로포', '포장', '장공', '공사']
+    한 글자 구간은 2-gram 이 없으므로 제외한다 (LIKE 재확인으로 처리).
+    """
+    if not text:
+        return []
+    tokens = []
+    for run in _TOKEN_RUN.findall(text.lower()):
+        for i in range(len(run) - 1):
+            token = run[i:i + 2]
+            if token not in tokens:
+                tokens.append(token)
+    return tokens
+
+
+def to_tsquery(text):
+    """검색어 → tsquery 문자열 (모든 2-gram AND). 토큰이 없으면 None"""
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    return " & ".join(f"'{token}'" for token in tokens)
+
+
+def like_pattern(term):
+    """LIKE 와일드카드(%, _)를 이스케이프한 부분 일치 패턴"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def substring_condition(column, term):
+    """
+    column 에 term 이 포함되는 조건 (sql, params)
+
+    결과 집합은 term 을 글자 그대로 포함하는 행이다. term 의 %, _ 는 와일드카드가 아닌 문자로
+    취급하므로 이 문자가 들어간 검색어는 기존 LIKE '%term%' 와 결과가 다르다.
+    """
+    like_sql = f"{column} LIKE %s"
+    like_params = [like_pattern(term)]
+
+    index_expr = TOKENIZED_COLUMNS.get(column)
+    tsquery = to_tsquery(term) if index_expr else None
+    if not tsquery:
+        return like_sql, like_params
+
+    return f"({index_expr} @@ %s::tsquery AND {like_sql})", [tsquery] + like_params
+
+
+def similarity_expr(column):
+    """정렬용 유사도 점수 식 (파라미터: 검색어 1개)"""
+    return f"similarity({column}, %s)"
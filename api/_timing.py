@@ -0,0 +1,164 @@
+"""
+요청별 SQL 소요 시간 기록
+
+api/_db.py 풀의 커넥션은 모두 TimedCursor 를 쓰므로 핸들러 코드를 바꾸지 않아도
+execute / copy_expert 마다 소요 시간, 행 수, 정규화 SQL 이 현재 스레드의 요청 기록에 쌓인다.
+응답 시 api/_response.send_json 이 take() 로 기록을 꺼내 Server-Timing 헤더로 내보낸다.
+
+환경변수
+- DEBUG_TIMINGS=1: 모든 응답 본문에 _timings 필드 추가 (요청별로는 ?debug=timings)
+- SLOW_QUERY_EXPLAIN_MS: 이 시간(ms) 이상 걸린 SELECT 는 EXPLAIN (ANALYZE, BUFFERS) 로 한 번 더 실행해
+  계획을 _timings 와 표준 오류 로그에 남긴다 (쿼리를 다시 실행하므로 진단할 때만 설정)
+  다시 실행한 효과는 세이브포인트로 항상 롤백하고, 세이브포인트를 쓸 수 없는 autocommit 커넥션은 건너뛴다.
+  쓰기 CTE, 행 잠금, pps_bid 함수 호출이 있는 쿼리는 실행 없이 EXPLAIN 만 한다.
+"""
+from collections import deque
+import os
+import re
+import sys
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+from api import _metrics
+
+# 요청 하나에 보관하는 최대 쿼리 수 (내보내지 못한 기록이 쌓이지 않도록 오래된 것부터 버림)
+MAX_RECORDED_QUERIES = 200
+# Server-Timing 헤더에 개별로 싣는 최대 쿼리 수 / SQL 길이
+MAX_HEADER_QUERIES = 20
+HEADER_SQL_LENGTH = 80
+LOGGED_SQL_LENGTH = 300
+MAX_PLAN_LENGTH = 8000
+
+_COMMENT = re.compile(r"--[^\n]*")
+_SPACE = re.compile(r"\s+")
+# 다시 실행하면 안 되는 쿼리 (쓰기 CTE, 행 잠금, 쓰기 작업을 하는 pps_bid 함수 호출)
+_SIDE_EFFECTS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE)\b|\bFOR\s+(KEY\s+)?SHARE\b|\bpps_bid\.\w+\s*\(",
+    re.IGNORECASE,
+)
+
+_local = threading.local()
+
+
+def _entries():
+    entries = getattr(_local, "entries", None)
+    if entries is None:
+        entries = _local.entries = deque(maxlen=MAX_RECORDED_QUERIES)
+    return entries
+
+
+def take():
+    """현재 스레드의 기록을 꺼내고 비움"""
+    entries = list(_entries())
+    _local.entries = deque(maxlen=MAX_RECORDED_QUERIES)
+    return entries
+
+
+def normalize_sql(query):
+    """주석 제거, 공백 정리 (바인딩 전 템플릿이므로 파라미터 값은 들어가지 않음)"""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = str(query)
+    return _SPACE.sub(" ", _COMMENT.sub("", query)).strip()
+
+
+def explain_threshold_ms():
+    try:
+        return float(os.getenv("SLOW_QUERY_EXPLAIN_MS") or 0)
+    except ValueError:
+        return 0.0
+
+
+def _explain(cursor, query, vars, analyze=True):
+    """
+    같은 커넥션에서 EXPLAIN 실행 (analyze=True 면 ANALYZE, BUFFERS)
+
+    세이브포인트 안에서 실행하고 성공/실패와 관계없이 롤백하므로 다시 실행한 쿼리의 효과는
+    남지 않고 원래 트랜잭션은 유지된다. (autocommit 커넥션에서는 호출하지 않음)
+    """
+    conn = cursor.connection
+    options = b"ANALYZE, BUFFERS" if analyze else b"COSTS"
+    explain_cursor = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    try:
+        explain_cursor.execute("SAVEPOINT timing_explain")
+        try:
+            explain_cursor.execute(b"EXPLAIN (" + options + b") " + cursor.mogrify(query, vars))
+            plan = "\n".join(row[0] for row in explain_cursor.fetchall())
+        except psycopg2.Error as e:
+            plan = f"EXPLAIN 실패: {str(e).strip()}"
+        explain_cursor.execute("ROLLBACK TO SAVEPOINT timing_explain")
+        explain_cursor.execute("RELEASE SAVEPOINT timing_explain")
+    except psycopg2.Error as e:
+        plan = f"EXPLAIN 실패: {str(e).strip()}"
+    finally:
+        explain_cursor.close()
+    return plan[:MAX_PLAN_LENGTH]
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """execute / copy_expert 소요 시간을 요청 기록에 남기는 커서"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(query, vars)
+            failed = False
+            return result
+        finally:
+            self._record(query, vars, (time.perf_counter() - started) * 1000, failed)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().copy_expert(sql, file, size)
+            failed = False
+            return result
+        finally:
+            self._record(sql, None, (time.perf_counter() - started) * 1000, failed)
+
+    def _record(self, query, vars, elapsed_ms, failed):
+        sql = normalize_sql(query)
+        entry = {"sql": sql[:LOGGED_SQL_LENGTH], "ms": round(elapsed_ms, 2), "rows": self.rowcount}
+        if failed:
+            entry["error"] = True
+            _metrics.DB_QUERY_ERRORS.inc(endpoint=_metrics.current_endpoint())
+        _metrics.DB_QUERY_SECONDS.observe(elapsed_ms / 1000, endpoint=_metrics.current_endpoint())
+
+        threshold = explain_threshold_ms()
+        if (threshold and not failed and elapsed_ms >= threshold and self.name is None
+                and not self.connection.autocommit
+                and sql.split(" ", 1)[0].upper() in ("SELECT", "WITH")):
+            entry["plan"] = _explain(self, query, vars, analyze=not _SIDE_EFFECTS.search(sql))
+            print(f"[slow-query] {elapsed_ms:.1f}ms {sql[:LOGGED_SQL_LENGTH]}\n{entry['plan']}", file=sys.stderr)
+
+        _entries().append(entry)
+
+
+def _header_text(text):
+    """Server-Timing desc 용 quoted-string (헤더는 latin-1 이므로 ASCII 만)"""
+    text = text.encode("ascii", "replace").decode("ascii")
+    return text.replace("\\", "\\\\").replace('"', "'")
+
+
+def server_timing(entries):
+    """Server-Timing 헤더 값: db 합계 + 쿼리별 q1, q2, ..."""
+    total = sum(entry["ms"] for entry in entries)
+    parts = [f'db;dur={total:.1f};desc="{len(entries)} queries"']
+    for i, entry in enumerate(entries[:MAX_HEADER_QUERIES], start=1):
+        parts.append(f'q{i};dur={entry["ms"]:.1f};desc="{_header_text(entry["sql"][:HEADER_SQL_LENGTH])}"')
+    return ", ".join(parts)
+
+
+def summary(entries):
+    """응답 본문 _timings 필드"""
+    return {
+        "db_ms": round(sum(entry["ms"] for entry in entries), 2),
+        "query_count": len(entries),
+        "queries": entries,
+    }
@@ -1,44 +1,68 @@
 from http.server import BaseHTTPRequestHandler
-import json
+from concurrent.futures import ThreadPoolExecutor
 import os
-import psycopg2
-import urllib.request
-import urllib.parse
+import queue
+import urllib.error
 from urllib.parse import parse_qs, urlparse
 
+from api._collection_queue import QueueUnavailable, claim, complete, enqueue_new
+from api._db import get_connection
+from api._g2b import DEFAULT_CONCURRENCY, clamp_concurrency, iter_all_pages
+from api._g2b_archive import get_archive
+from api._participant_writer import ParticipantWriter
+from api._response import send_json, track_request
+
+# 원본 보관소 사용 방식 (api/_g2b.iter_all_pages)
+FETCH_MODES = ("auto", "live", "replay")
+
 class handler(BaseHTTPRequestHandler):
+    @track_request("collect-participants")
     def do_GET(self):
         """
         입찰참가업체 정보 수집 API
         - getOpengResultListInfoOpengCompt: 개찰결과 개찰완료 목록 조회
+        
+        파라미터:
+        - bid_no: 입찰공고번호 (선택, 없으면 최근 미수집 낙찰건)
+        - limit: 최근 낙찰건 수집 개수 (기본 10)
+        - concurrency: 동시 API 호출 수 (기본 G2B_CONCURRENCY, 최대 16)
+        - mode: 원본 보관소(G2B_ARCHIVE_DIR) 사용 방식 (기본 auto)
+            auto   - 최근(G2B_ARCHIVE_MAX_AGE) 보관된 입찰건은 보관본, 아니면 API 조회 후 보관
+            live   - 항상 API 조회 후 보관
+            replay - 보관본만 다시 적재 (기존 행 갱신, bid_no 가 없으면 최근 보관 순 limit 건)
         """
         try:
             query = parse_qs(urlparse(self.path).query)
             
             bid_no = query.get('bid_no', [None])[0]
             limit = int(query.get('limit', [10])[0])
+            concurrency = clamp_concurrency(query.get('concurrency', [DEFAULT_CONCURRENCY])[0])
+            mode = query.get('mode', ['auto'])[0]
+            if mode not in FETCH_MODES:
+                self._send_error(400, f"mode 는 {', '.join(FETCH_MODES)} 중 하나입니다")
+                return
             
             api_key = os.getenv("G2B_API_KEY")
-            if not api_key:
+            if not api_key and mode != "replay":
                 self._send_error(500, "G2B_API_KEY 환경변수가 설정되지 않았습니다.")
                 return
             
-            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-            cursor = conn.cursor()
-            
-            if bid_no:
-                result = self._collect_single(cursor, conn, api_key, bid_no)
-            else:
-                result = self._collect_recent(cursor, conn, api_key, limit)
+            with get_connection("collect-participants") as conn:
+                cursor = conn.cursor()
             
-            conn.close()
+                if bid_no:
+                    result = self._collect_single(cursor, conn, api_key, bid_no, mode)
+                elif mode == "replay":
+                    result = self._replay_archive(cursor, limit, concurrency)
+                else:
+                    result = self._collect_recent(cursor, conn, api_key, limit, concurrency, mode)
             
             self._send_response(200, result)
             
         except Exception as e:
             self._send_error(500, str(e))
     
-    def _collect_single(self, cursor, conn, api_key, bid_no):
+    def _collect_single(self, cursor, conn, api_key, bid_no, mode="auto"):
         """특정 입찰건 참가업체 수집"""
         
         cursor.execute("""
@@ -54,7 +78,7 @@ class handler(BaseHTTPRequestHandler):
         
         result = self._fetch_and_save_participants(
             cursor, conn, api_key,
-            bid[0], bid[1] or "00", bid[2] or "00"
+            bid[0], bid[1] or "00", bid[2] or "00", mode
         )
         
         return {
@@ -66,8 +90,149 @@ class handler(BaseHTTPRequestHandler):
             "debug": result.get("debug")
         }
     
-    def _collect_recent(self, cursor, conn, api_key, limit):
-        """최근 낙찰건 기준 참가업체 수집"""
+    def _collect_recent(self, cursor, conn, api_key, limit, concurrency=DEFAULT_CONCURRENCY, mode="auto"):
+        """
+        최근 낙찰건 기준 참가업체 수집
+        - API 호출은 스레드 풀에서 동시에 (속도 제한은 api/_g2b.py 토큰 버킷)
+        - 대상은 작업 큐(api/_collection_queue.py)에서 임대하고 결과 상태를 기록
+        - 페이지가 도착하는 순서대로 이 스레드에서 ParticipantWriter 에 모아
+          여러 입찰건을 한 번에 COPY 저장 (api/_participant_writer.py)
+        """
+        
+        # 작업 큐에서 배치 임대 (큐가 없으면 기존 안티 조인)
+        try:
+            enqueue_new(cursor)
+            bids = claim(cursor, limit)
+            use_queue = True
+        except QueueUnavailable:
+            bids = self._select_uncollected_bids(cursor, limit)
+            use_queue = False
+        
+        results, total_collected = self._collect_bids(cursor, api_key, bids, concurrency, mode)
+        
+        if use_queue:
+            complete(cursor, [
+                self._queue_outcome(bid, result) for bid, result in zip(bids, results)
+            ])
+        
+        return {
+            "success": True,
+            "processed_count": len(bids),
+            "total_collected": total_collected,
+            "concurrency": concurrency,
+            "queue": use_queue,
+            "results": results
+        }
+    
+    def _collect_bids(self, cursor, api_key, bids, concurrency, mode):
+        """
+        입찰건 목록 동시 조회 → 단일 저장 스레드
+        
+        반환: (입찰건별 결과, 저장 건수 합)
+        """
+        
+        results = [None] * len(bids)
+        writer = ParticipantWriter(cursor, upsert=mode == "replay")
+        
+        # 작업 스레드 → 저장 스레드 (크기 제한으로 저장이 밀리면 조회도 대기)
+        messages = queue.Queue(maxsize=concurrency * 2)
+        
+        def fetch(i, bid):
+            def on_page(start, items, debug_info):
+                messages.put(("page", i, start, items, debug_info))
+            try:
+                messages.put(("done", i, self._fetch_participants(api_key, bid[0], bid[1] or "00", on_page, mode)))
+            except Exception as e:
+                messages.put(("failed", i, e))
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for i, bid in enumerate(bids):
+                executor.submit(fetch, i, bid)
+            
+            pending = len(bids)
+            while pending:
+                message = messages.get()
+                kind, i = message[0], message[1]
+                bid = bids[i]
+                
+                if kind == "page":
+                    _, _, start, items, debug_info = message
+                    try:
+                        writer.add(
+                            (bid[0], bid[1] or "00"),
+                            self._participant_rows(items, debug_info, bid[0], bid[1] or "00", bid[2] or "00", start),
+                            debug_info
+                        )
+                    except Exception as e:
+                        debug_info.setdefault("save_errors", []).append(str(e)[:100])
+                elif kind == "done":
+                    results[i] = {
+                        "bid_no": bid[0],
+                        "bid_name": bid[3],
+                        "bid_type": bid[4],
+                        "debug": message[2]
+                    }
+                    pending -= 1
+                else:
+                    results[i] = {
+                        "bid_no": bid[0],
+                        "bid_name": bid[3],
+                        "error": str(message[2]),
+                        "status": "failed"
+                    }
+                    pending -= 1
+        
+        # 남은 행 저장 후 입찰건별 저장 건수 반영
+        writer.flush()
+        
+        total_collected = 0
+        for bid, result in zip(bids, results):
+            if result.get("status") == "failed":
+                continue
+            collected = writer.saved.get((bid[0], bid[1] or "00"), 0)
+            result["collected"] = collected
+            result["status"] = "success" if collected > 0 else "no_data"
+            total_collected += collected
+        
+        return results, total_collected
+    
+    def _replay_archive(self, cursor, limit, concurrency):
+        """보관된 원본 응답을 API 호출 없이 다시 적재 (최근 보관 순 limit 건)"""
+        
+        archive = get_archive()
+        if archive is None:
+            return {"success": False, "message": "G2B_ARCHIVE_DIR 가 설정되지 않았습니다."}
+        
+        archived = archive.bids("getOpengResultListInfoOpengCompt")[:limit]
+        if not archived:
+            return {"success": True, "processed_count": 0, "total_collected": 0, "results": []}
+        
+        cursor.execute("""
+            SELECT DISTINCT ON (bid_ntce_no, COALESCE(bid_ntce_ord, '00'))
+                bid_ntce_no, COALESCE(bid_ntce_ord, '00'), bid_clsfc_no, bid_ntce_nm, bid_type
+            FROM bid_results
+            WHERE bid_ntce_no = ANY(%s)
+        """, [[bid_ntce_no for bid_ntce_no, _ in archived]])
+        known = {(row[0], row[1]): row for row in cursor.fetchall()}
+        
+        bids = [
+            known.get((bid_ntce_no, bid_ntce_ord), (bid_ntce_no, bid_ntce_ord, None, None, None))
+            for bid_ntce_no, bid_ntce_ord in archived
+        ]
+        
+        results, total_collected = self._collect_bids(cursor, None, bids, concurrency, "replay")
+        
+        return {
+            "success": True,
+            "processed_count": len(bids),
+            "total_collected": total_collected,
+            "concurrency": concurrency,
+            "mode": "replay",
+            "results": results
+        }
+    
+    def _select_uncollected_bids(self, cursor, limit):
+        """참가업체가 없는 최근 낙찰건 (작업 큐 미적용 DB 용)"""
         
         cursor.execute("""
             SELECT b.bid_ntce_no, b.bid_ntce_ord, b.bid_clsfc_no, b.bid_ntce_nm, b.bid_type
@@ -75,80 +240,78 @@ class handler(BaseHTTPRequestHandler):
             LEFT JOIN bid_participants p ON b.bid_ntce_no = p.bid_ntce_no
             WHERE p.id IS NULL
                 AND b.prtcpt_cnum > 1
-                AND b.prtcpt_cnum <= 100
             GROUP BY b.bid_ntce_no, b.bid_ntce_ord, b.bid_clsfc_no, b.bid_ntce_nm, b.bid_type, b.rgst_dt
             ORDER BY b.rgst_dt DESC
             LIMIT %s
         """, [limit])
         
-        bids = cursor.fetchall()
-        
-        results = []
-        total_collected = 0
+        return cursor.fetchall()
+    
+    def _queue_outcome(self, bid, result):
+        """수집 결과 → 작업 큐 상태 (done / empty / failed)"""
         
-        for bid in bids:
-            try:
-                result = self._fetch_and_save_participants(
-                    cursor, conn, api_key,
-                    bid[0], bid[1] or "00", bid[2] or "00"
-                )
-                collected = result.get("saved", 0)
-                results.append({
-                    "bid_no": bid[0],
-                    "bid_name": bid[3],
-                    "bid_type": bid[4],
-                    "collected": collected,
-                    "status": "success" if collected > 0 else "no_data",
-                    "debug": result.get("debug")
-                })
-                total_collected += collected
-            except Exception as e:
-                results.append({
-                    "bid_no": bid[0],
-                    "bid_name": bid[3],
-                    "error": str(e),
-                    "status": "failed"
-                })
+        debug_info = result.get("debug") or {}
+        error = result.get("error") or debug_info.get("error")
+        if result.get("status") == "failed" or error:
+            status = "failed"
+        elif debug_info.get("items_count"):
+            status = "done"
+        else:
+            status = "empty"
         
-        return {
-            "success": True,
-            "processed_count": len(bids),
-            "total_collected": total_collected,
-            "results": results
-        }
+        return (bid[0], bid[1], status, bid[5], result.get("collected"), error)
     
-    def _fetch_and_save_participants(self, cursor, conn, api_key, bid_ntce_no, bid_ntce_ord, bid_clsfc_no):
+    def _fetch_and_save_participants(self, cursor, conn, api_key, bid_ntce_no, bid_ntce_ord, bid_clsfc_no,
+                                     mode="auto"):
         """
         나라장터 API에서 참가업체 조회 후 저장
         - getOpengResultListInfoOpengCompt: 개찰결과 개찰완료 목록 조회
+        - 페이지가 도착할 때마다 바로 저장 대기열에 넣는다
+        - mode=replay 이면 보관본에서 읽어 기존 행까지 갱신
+        """
+        key = (bid_ntce_no, bid_ntce_ord)
+        writer = ParticipantWriter(cursor, upsert=mode == "replay")
+        
+        def on_page(start, items, debug_info):
+            writer.add(
+                key,
+                self._participant_rows(items, debug_info, bid_ntce_no, bid_ntce_ord, bid_clsfc_no, start),
+                debug_info
+            )
+        
+        debug_info = self._fetch_participants(api_key, bid_ntce_no, bid_ntce_ord, on_page, mode)
+        writer.flush()
+        return {"saved": writer.saved.get(key, 0), "debug": debug_info}
+    
+    def _fetch_participants(self, api_key, bid_ntce_no, bid_ntce_ord, on_page, mode="auto"):
+        """
+        개찰결과 개찰완료 목록 전체 페이지 조회 (DB 를 사용하지 않으므로 작업 스레드에서 호출 가능)
+        
+        totalCount 까지 페이지를 넘기며 페이지마다 on_page(start_index, items, debug_info) 호출
+        반환: debug_info
         """
         
-        # 개찰결과 개찰완료 목록 조회 API (정확한 엔드포인트)
-        base_url = "https://apis.data.go.kr/1230000/as/ScsbidInfoService/getOpengResultListInfoOpengCompt"
-
         params = {
-            "numOfRows": "100",
-            "pageNo": "1",
             "bidNtceNo": bid_ntce_no,
             "bidNtceOrd": bid_ntce_ord,
             "type": "json"
         }
         
-        other_params = urllib.parse.urlencode(params)
-        url = f"{base_url}?serviceKey={api_key}&{other_params}"
-        
         debug_info = {
             "bid_no": bid_ntce_no,
             "bid_ntce_ord": bid_ntce_ord,
             "api": "getOpengResultListInfoOpengCompt"
         }
         
+        meta = {}
+        items_count = 0
         try:
-            req = urllib.request.Request(url)
-            req.add_header("User-Agent", "Mozilla/5.0")
-            with urllib.request.urlopen(req, timeout=30) as response:
-                raw_data = response.read().decode('utf-8')
-                data = json.loads(raw_data)
+            for start, items in iter_all_pages("getOpengResultListInfoOpengCompt", api_key, params, meta, mode=mode):
+                # 첫 번째 아이템 구조 확인용
+                if items and "sample_keys" not in debug_info:
+                    debug_info["sample_keys"] = list(items[0].keys())
+                items_count += len(items)
+                on_page(start, items, debug_info)
         except urllib.error.HTTPError as e:
             error_body = ""
             try:
@@ -156,48 +319,17 @@ class handler(BaseHTTPRequestHandler):
             except:
                 pass
             debug_info["error"] = f"HTTP {e.code}: {error_body}"
-            return {"saved": 0, "debug": debug_info}
         except Exception as e:
             debug_info["error"] = str(e)
-            return {"saved": 0, "debug": debug_info}
-        
-        # 응답 파싱
-        items = []
-        try:
-            response_data = data.get("response", {})
-            header = response_data.get("header", {})
-            debug_info["result_code"] = header.get("resultCode")
-            debug_info["result_msg"] = header.get("resultMsg")
-            
-            body = response_data.get("body", {})
-            total_count = body.get("totalCount", 0)
-            debug_info["total_count"] = total_count
-            
-            item_list = body.get("items", [])
-            
-            if isinstance(item_list, dict):
-                items = item_list.get("item", [])
-            elif isinstance(item_list, list):
-                items = item_list
-                
-            if isinstance(items, dict):
-                items = [items]
-                
-            debug_info["items_count"] = len(items)
-            
-            # 첫 번째 아이템 구조 확인용
-            if items:
-                debug_info["sample_keys"] = list(items[0].keys())
-                
-        except Exception as e:
-            debug_info["parse_error"] = str(e)
-            items = []
         
-        if not items:
-            return {"saved": 0, "debug": debug_info}
+        debug_info.update(meta)
+        debug_info["items_count"] = items_count
+        return debug_info
+    
+    def _participant_rows(self, items, debug_info, bid_ntce_no, bid_ntce_ord, bid_clsfc_no, start=0):
+        """API 항목 → bid_participants 행 (PARTICIPANT_COLUMNS 순서, start: 페이지 시작 위치)"""
         
-        # DB에 저장
-        saved_count = 0
+        rows = []
         for idx, item in enumerate(items):
             try:
                 # 사업자번호 추출
@@ -211,16 +343,9 @@ class handler(BaseHTTPRequestHandler):
                     continue
                 
                 # 순위 추출
-                rank = self._parse_int(item.get("opengRnk") or item.get("rnk")) or (idx + 1)
+                rank = self._parse_int(item.get("opengRnk") or item.get("rnk")) or (start + idx + 1)
                 
-                cursor.execute("""
-                    INSERT INTO bid_participants (
-                        bid_ntce_no, bid_ntce_ord, bid_clsfc_no,
-                        prtcpt_nm, prtcpt_bizno, prtcpt_ceo_nm,
-                        bid_amt, bid_rate, rank, is_winner, openg_dt
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (bid_ntce_no, bid_ntce_ord, prtcpt_bizno) DO NOTHING
-                """, [
+                rows.append((
                     bid_ntce_no,
                     bid_ntce_ord,
                     item.get("bidClsfcNo") or bid_clsfc_no,
@@ -232,16 +357,14 @@ class handler(BaseHTTPRequestHandler):
                     rank,
                     rank == 1,
                     item.get("opengDt")
-                ])
-                saved_count += 1
+                ))
             except Exception as e:
                 if "save_errors" not in debug_info:
                     debug_info["save_errors"] = []
                 debug_info["save_errors"].append(str(e)[:100])
                 continue
         
-        conn.commit()
-        return {"saved": saved_count, "debug": debug_info}
+        return rows
     
     def _parse_int(self, val):
         if val is None:
@@ -260,11 +383,7 @@ class handler(BaseHTTPRequestHandler):
             return None
     
     def _send_response(self, status_code, data):
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+        send_json(self, status_code, data)
     
     def _send_error(self, status_code, message):
         self._send_response(status_code, {"success": False, "error": message})
@@ -1,10 +1,12 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import os
-import psycopg2
 from urllib.parse import parse_qs, urlparse
 
+from api._db import get_connection
+from api._response import send_json, track_request
+from api._text_search import substring_condition
+
 class handler(BaseHTTPRequestHandler):
+    @track_request("competitors")
     def do_GET(self):
         """
         경쟁사 분석 API
@@ -23,13 +25,11 @@ class handler(BaseHTTPRequestHandler):
             limit = int(query.get('limit', [10])[0])
             
             # DB 연결
-            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-            cursor = conn.cursor()
-            
-            # 경쟁사 분석
-            result = self._analyze_competitors(cursor, institution, bid_type, limit)
+            with get_connection("competitors") as conn:
+                cursor = conn.cursor()
             
-            conn.close()
+                # 경쟁사 분석
+                result = self._analyze_competitors(cursor, institution, bid_type, limit)
             
             self._send_response(200, result)
             
@@ -44,8 +44,9 @@ class handler(BaseHTTPRequestHandler):
         params = []
         
         if institution:
-            conditions.append("dminstt_nm LIKE %s")
-            params.append(f"%{institution}%")
+            condition, condition_params = substring_condition("dminstt_nm", institution)
+            conditions.append(condition)
+            params.extend(condition_params)
         
         if bid_type:
             conditions.append("bid_type = %s")
@@ -139,11 +140,7 @@ class handler(BaseHTTPRequestHandler):
         }
     
     def _send_response(self, status_code, data):
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+        send_json(self, status_code, data)
     
     def _send_error(self, status_code, message):
         self._send_response(status_code, {"success": False, "error": message})
@@ -1,18 +1,19 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import os
 import psycopg2
 
+from api import _metrics
+from api._db import get_connection
+from api._response import send_json, track_request
+
 class handler(BaseHTTPRequestHandler):
+    @track_request("dashboard")
     def do_GET(self):
         """대시보드 통계 API"""
         try:
-            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-            cursor = conn.cursor()
-            
-            result = self._get_dashboard_stats(cursor)
+            with get_connection("dashboard") as conn:
+                cursor = conn.cursor()
             
-            conn.close()
+                result = self._get_dashboard_stats(cursor)
             
             self._send_response(200, result)
             
@@ -20,7 +21,119 @@ class handler(BaseHTTPRequestHandler):
             self._send_error(500, str(e))
     
     def _get_dashboard_stats(self, cursor):
-        """대시보드 통계 조회"""
+        """
+        대시보드 통계 조회
+        - pps_bid.dashboard_snapshot 단일 행 조회 (야간 refresh_dashboard_snapshot 으로 갱신)
+        - 스냅샷이 아직 없으면 bid_results 직접 집계로 대체
+        """
+        
+        try:
+            cursor.execute("""
+                SELECT payload, refreshed_at
+                FROM pps_bid.dashboard_snapshot
+                WHERE id = 1
+            """)
+            row = cursor.fetchone()
+        except psycopg2.errors.UndefinedTable:
+            cursor.connection.rollback()
+            row = None
+        
+        _metrics.record_cache("dashboard_snapshot", bool(row))
+        if not row:
+            return self._get_live_dashboard_stats(cursor)
+        
+        return self._format_snapshot(row[0], row[1])
+    
+    def _format_snapshot(self, payload, refreshed_at):
+        """스냅샷 payload 를 기존 응답 형식으로 변환"""
+        
+        summary = payload.get("summary") or {}
+        recent = payload.get("recent_30days") or {}
+        
+        recent_count = recent.get("bids") or 0
+        prev_count = recent.get("prev_count") or 1
+        trend = round(((recent_count - prev_count) / prev_count) * 100, 1) if prev_count > 0 else 0
+        
+        monthly_trend = []
+        for row in payload.get("monthly_trend") or []:
+            monthly_trend.append({
+                "month": row["month"],
+                "count": row["count"],
+                "amount": int(row["amount"]) if row["amount"] else 0,
+                "avg_rate": float(row["avg_rate"]) if row["avg_rate"] else 0
+            })
+        
+        by_type = []
+        for row in payload.get("by_type") or []:
+            by_type.append({
+                "type": row["type"],
+                "count": row["count"],
+                "amount": int(row["amount"]) if row["amount"] else 0,
+                "avg_rate": float(row["avg_rate"]) if row["avg_rate"] else 0
+            })
+        
+        top_institutions = []
+        for row in payload.get("top_institutions") or []:
+            top_institutions.append({
+                "name": row["name"],
+                "count": row["count"],
+                "amount": int(row["amount"]) if row["amount"] else 0
+            })
+        
+        top_companies = []
+        for row in payload.get("top_companies") or []:
+            top_companies.append({
+                "name": row["name"],
+                "count": row["count"],
+                "amount": int(row["amount"]) if row["amount"] else 0,
+                "avg_rate": float(row["avg_rate"]) if row["avg_rate"] else 0
+            })
+        
+        recent_bids = []
+        for row in payload.get("recent_bids") or []:
+            recent_bids.append({
+                "bid_name": row["bid_name"],
+                "institution": row["institution"],
+                "winner": row["winner"],
+                "amount": int(row["amount"]) if row["amount"] else 0,
+                "rate": float(row["rate"]) if row["rate"] else 0,
+                "date": row["date"]
+            })
+        
+        rate_distribution = []
+        for row in payload.get("rate_distribution") or []:
+            rate_distribution.append({
+                "range": row["range"],
+                "count": row["count"]
+            })
+        
+        return {
+            "success": True,
+            "snapshot_at": refreshed_at.isoformat() if refreshed_at else None,
+            "summary": {
+                "total_bids": summary.get("total_bids") or 0,
+                "total_companies": summary.get("total_companies") or 0,
+                "total_institutions": summary.get("total_institutions") or 0,
+                "total_amount": int(summary["total_amount"]) if summary.get("total_amount") else 0,
+                "avg_rate": float(summary["avg_rate"]) if summary.get("avg_rate") else 0,
+                "avg_participants": float(summary["avg_participants"]) if summary.get("avg_participants") else 0
+            },
+            "recent_30days": {
+                "bids": recent_count,
+                "amount": int(recent["amount"]) if recent.get("amount") else 0,
+                "avg_rate": float(recent["avg_rate"]) if recent.get("avg_rate") else 0,
+                "trend": trend
+            },
+            "monthly_trend": monthly_trend,
+            "by_type": by_type,
+            "top_institutions": top_institutions,
+            "top_companies": top_companies,
+            "recent_bids": recent_bids,
+            "rate_distribution": rate_distribution
+        }
+    
+    def _get_live_dashboard_stats(self, cursor):
+        """대시보드 통계 조회 (bid_results 직접 집계)"""
         
         # 전체 요약
         cursor.execute("""
@@ -231,11 +344,7 @@ class handler(BaseHTTPRequestHandler):
         }
     
     def _send_response(self, status_code, data):
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+        send_json(self, status_code, data)
     
     def _send_error(self, status_code, message):
         self._send_response(status_code, {"success": False, "error": message})
@@ -1,57 +1,113 @@
 from http.server import BaseHTTPRequestHandler
-import json
 import os
-import psycopg2
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from api._db import get_connection
+from api._response import send_json, track_request
+
+
+# 데이터 기간(MIN/MAX rgst_dt) 캐시 유지 시간 (초)
+WATERMARK_TTL = float(os.getenv("HEALTH_WATERMARK_TTL", "300"))
+
+_watermark = None          # (조회 시각, min_date, max_date)
+_watermark_lock = threading.Lock()
+
 
 class handler(BaseHTTPRequestHandler):
+    @track_request("health")
     def do_GET(self):
+        """
+        헬스 체크
+
+        - ?probe=live: 프로세스 생존 확인 (DB 접근 없음)
+        - ?probe=ready: 풀 커넥션으로 SELECT 1 (실패 시 503)
+        - 기본: 건수는 pg_class.reltuples 추정치, 데이터 기간은 캐시된 워터마크
+        - ?deep=1: COUNT(*) / MIN·MAX 정확한 값
+        """
+        query = parse_qs(urlparse(self.path).query)
+        probe = query.get("probe", [""])[0]
+
+        if probe == "live":
+            send_json(self, 200, {"success": True, "status": "alive"})
+            return
+
         try:
-            # DB 연결 테스트
-            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-            cursor = conn.cursor()
-            
-            # 전체 건수 조회
-            cursor.execute("SELECT COUNT(*) FROM bid_results")
-            total_count = cursor.fetchone()[0]
-            
-            # 데이터 기간 조회
-            cursor.execute("""
-                SELECT 
-                    MIN(rgst_dt)::date as min_date,
-                    MAX(rgst_dt)::date as max_date
-                FROM bid_results
-                WHERE rgst_dt IS NOT NULL
-            """)
-            date_range = cursor.fetchone()
-            
-            conn.close()
-            
-            response = {
-                "success": True,
-                "status": "healthy",
-                "database": "connected",
-                "total_records": total_count,
-                "date_range": {
-                    "min": str(date_range[0]) if date_range else None,
-                    "max": str(date_range[1]) if date_range else None
-                }
-            }
-            
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Access-Control-Allow-Origin", "*")
-            self.end_headers()
-            self.wfile.write(json.dumps(response, ensure_ascii=False).encode())
-            
+            with get_connection("health") as conn:
+                cursor = conn.cursor()
+
+                if probe == "ready":
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                    response = {"success": True, "status": "ready", "database": "connected"}
+                elif "1" in query.get("deep", []):
+                    response = self._exact_summary(cursor)
+                else:
+                    response = self._estimated_summary(cursor)
+
+            send_json(self, 200, response)
+
         except Exception as e:
             response = {
                 "success": False,
                 "status": "unhealthy",
                 "error": str(e)
             }
-            
-            self.send_response(500)
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Access-Control-Allow-Origin", "*")
-            self.end_headers()
-            self.wfile.write(json.dumps(response, ensure_ascii=False).encode())
+
+            send_json(self, 503 if probe == "ready" else 500, response)
+
+    def _estimated_summary(self, cursor):
+        """카탈로그 추정 건수 + 캐시된 데이터 기간"""
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = 'bid_results'::regclass")
+        row = cursor.fetchone()
+        # ANALYZE 전이면 reltuples = -1
+        total_count = row[0] if row and row[0] >= 0 else None
+
+        min_date, max_date = self._cached_date_range(cursor)
+        return self._format(total_count, min_date, max_date, estimated=True)
+
+    def _exact_summary(self, cursor):
+        cursor.execute("SELECT COUNT(*) FROM bid_results")
+        total_count = cursor.fetchone()[0]
+
+        min_date, max_date = self._read_date_range(cursor)
+        return self._format(total_count, min_date, max_date, estimated=False)
+
+    def _cached_date_range(self, cursor):
+        global _watermark
+
+        cached = _watermark
+        if cached is not None and time.monotonic() - cached[0] < WATERMARK_TTL:
+            return cached[1], cached[2]
+
+        with _watermark_lock:
+            cached = _watermark
+            if cached is not None and time.monotonic() - cached[0] < WATERMARK_TTL:
+                return cached[1], cached[2]
+            min_date, max_date = self._read_date_range(cursor)
+            _watermark = (time.monotonic(), min_date, max_date)
+            return min_date, max_date
+
+    def _read_date_range(self, cursor):
+        """데이터 기간 (idx_bid_results_rgst_dt_bid_no 양 끝 조회)"""
+        cursor.execute("""
+            SELECT
+                (SELECT MIN(rgst_dt) FROM bid_results WHERE rgst_dt IS NOT NULL)::date as min_date,
+                (SELECT MAX(rgst_dt) FROM bid_results WHERE rgst_dt IS NOT NULL)::date as max_date
+        """)
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def _format(self, total_count, min_date, max_date, estimated):
+        return {
+            "success": True,
+            "status": "healthy",
+            "database": "connected",
+            "total_records": total_count,
+            "estimated": estimated,
+            "date_range": {
+                "min": str(min_date) if min_date else None,
+                "max": str(max_date) if max_date else None
+            }
+        }
@@ -1,10 +1,44 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import os
-import psycopg2
 from urllib.parse import parse_qs, urlparse
 
+import psycopg2
+
+from api import _metrics
+from api._db import get_connection
+from api._institutions import (
+    DIMENSION_WATERMARK_SQL,
+    PROFILE_CACHE,
+    RAW_WATERMARK_SQL,
+    resolve_sql,
+)
+from api._rate_cube import summarize_histogram
+from api._response import send_json, track_request
+from api._text_search import substring_condition
+
+# 기관 목록 집계 대상: 기관 차원 사용 시 / 미적용 시
+DIMENSION_LIST_SOURCE = {
+    "from": "bid_results b JOIN pps_bid.institution i ON i.institution_id = b.institution_id",
+    "filter": "NOT i.is_noise",
+    "id": "i.institution_id",
+    "name": "i.canonical_name",
+    "key": "i.institution_id",
+    "group": "i.institution_id, i.canonical_name",
+}
+RAW_LIST_SOURCE = {
+    "from": "bid_results b",
+    "filter": """b.dminstt_nm IS NOT NULL
+                AND b.dminstt_nm NOT LIKE '%%수요기관%%'
+                AND b.dminstt_nm NOT LIKE '%%각 %%'
+                AND char_length(b.dminstt_nm) > 2""",
+    "id": "NULL::integer",
+    "name": "b.dminstt_nm",
+    "key": "b.dminstt_nm",
+    "group": "b.dminstt_nm",
+}
+
+
 class handler(BaseHTTPRequestHandler):
+    @track_request("institution")
     def do_GET(self):
         """
         기관별 패턴 분석 API
@@ -19,15 +53,13 @@ class handler(BaseHTTPRequestHandler):
             name = query.get('name', [None])[0]
             limit = int(query.get('limit', [20])[0])
             
-            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-            cursor = conn.cursor()
-            
-            if name:
-                result = self._analyze_institution(cursor, name)
-            else:
-                result = self._get_institution_list(cursor, limit)
+            with get_connection("institution") as conn:
+                cursor = conn.cursor()
             
-            conn.close()
+                if name:
+                    result = self._analyze_institution(cursor, name)
+                else:
+                    result = self._get_institution_list(cursor, limit)
             
             self._send_response(200, result)
             
@@ -35,27 +67,102 @@ class handler(BaseHTTPRequestHandler):
             self._send_error(500, str(e))
     
     def _get_institution_list(self, cursor, limit):
-        """상위 발주기관 목록"""
+        """
+        상위 발주기관 목록
+        - 기관 × 월 롤업(sql/007)이 있으면 롤업 합산 (기관 수에 비례)
+        - 기관 차원(sql/006)만 있으면 기관 ID 단위 집계 (잡음 기관은 is_noise 로 제외)
+        - 없으면 dminstt_nm 표기 단위 집계 + 조회 시점 잡음 필터
+        """
         
-        query = """
+        try:
+            result = self._query_rollup_list(cursor, limit)
+            if result["summary"]["total_bids"]:
+                return result
+        except psycopg2.errors.UndefinedTable:
+            cursor.connection.rollback()
+        
+        try:
+            return self._query_institution_list(cursor, limit, DIMENSION_LIST_SOURCE)
+        except psycopg2.errors.UndefinedTable:
+            cursor.connection.rollback()
+            return self._query_institution_list(cursor, limit, RAW_LIST_SOURCE)
+    
+    def _query_rollup_list(self, cursor, limit):
+        """pps_bid.institution_monthly 합산 (낙찰업체 수는 상위 limit 개 기관만 계산)"""
+        
+        cursor.execute("""
+            WITH ranked AS (
+                SELECT 
+                    m.institution_id,
+                    SUM(m.bid_count) as bid_count,
+                    SUM(m.amount_sum) as total_amount,
+                    SUM(m.rate_sum) as rate_sum,
+                    MIN(m.rate_min) as min_rate,
+                    MAX(m.rate_max) as max_rate,
+                    SUM(m.participants_sum) as participants_sum,
+                    SUM(m.participants_count) as participants_count
+                FROM pps_bid.institution_monthly m
+                JOIN pps_bid.institution i ON i.institution_id = m.institution_id
+                WHERE NOT i.is_noise
+                GROUP BY m.institution_id
+                ORDER BY bid_count DESC
+                LIMIT %s
+            )
             SELECT 
-                dminstt_nm,
+                r.institution_id,
+                i.canonical_name,
+                r.bid_count,
+                r.total_amount,
+                ROUND(r.total_amount / r.bid_count, 0) as avg_amount,
+                ROUND(r.rate_sum / r.bid_count, 2) as avg_rate,
+                ROUND(r.min_rate, 2) as min_rate,
+                ROUND(r.max_rate, 2) as max_rate,
+                ROUND(r.participants_sum / NULLIF(r.participants_count, 0), 1) as avg_participants,
+                (
+                    SELECT COUNT(DISTINCT w.bidwinnr_bizno)
+                    FROM pps_bid.institution_winner w
+                    WHERE w.institution_id = r.institution_id
+                        AND w.rated_count > 0
+                        AND w.bidwinnr_bizno <> ''
+                ) as unique_winners
+            FROM ranked r
+            JOIN pps_bid.institution i ON i.institution_id = r.institution_id
+            ORDER BY r.bid_count DESC
+        """, [limit])
+        rows = cursor.fetchall()
+        
+        # 전체 통계
+        cursor.execute("""
+            SELECT 
+                COUNT(DISTINCT m.institution_id) as total_institutions,
+                SUM(m.bid_count) as total_bids,
+                ROUND(SUM(m.rate_sum) / NULLIF(SUM(m.bid_count), 0), 2) as overall_avg_rate
+            FROM pps_bid.institution_monthly m
+            JOIN pps_bid.institution i ON i.institution_id = m.institution_id
+            WHERE NOT i.is_noise
+        """)
+        total_stats = cursor.fetchone()
+        
+        return self._format_institution_list(rows, total_stats)
+    
+    def _query_institution_list(self, cursor, limit, source):
+        query = f"""
+            SELECT 
+                {source["id"]},
+                {source["name"]},
                 COUNT(*) as bid_count,
-                SUM(sucsf_bid_amt) as total_amount,
-                ROUND(AVG(sucsf_bid_amt)::numeric, 0) as avg_amount,
-                ROUND(AVG(sucsf_bid_rate)::numeric, 2) as avg_rate,
-                ROUND(MIN(sucsf_bid_rate)::numeric, 2) as min_rate,
-                ROUND(MAX(sucsf_bid_rate)::numeric, 2) as max_rate,
-                ROUND(AVG(prtcpt_cnum)::numeric, 1) as avg_participants,
-                COUNT(DISTINCT bidwinnr_bizno) as unique_winners
-            FROM bid_results
-            WHERE dminstt_nm IS NOT NULL 
-                AND sucsf_bid_amt > 0
-                AND sucsf_bid_rate IS NOT NULL
-                AND dminstt_nm NOT LIKE '%%수요기관%%'
-                AND dminstt_nm NOT LIKE '%%각 %%'
-                AND char_length(dminstt_nm) > 2
-            GROUP BY dminstt_nm
+                SUM(b.sucsf_bid_amt) as total_amount,
+                ROUND(AVG(b.sucsf_bid_amt)::numeric, 0) as avg_amount,
+                ROUND(AVG(b.sucsf_bid_rate)::numeric, 2) as avg_rate,
+                ROUND(MIN(b.sucsf_bid_rate)::numeric, 2) as min_rate,
+                ROUND(MAX(b.sucsf_bid_rate)::numeric, 2) as max_rate,
+                ROUND(AVG(b.prtcpt_cnum)::numeric, 1) as avg_participants,
+                COUNT(DISTINCT b.bidwinnr_bizno) as unique_winners
+            FROM {source["from"]}
+            WHERE {source["filter"]}
+                AND b.sucsf_bid_amt > 0
+                AND b.sucsf_bid_rate IS NOT NULL
+            GROUP BY {source["group"]}
             ORDER BY bid_count DESC
             LIMIT %s
         """
@@ -63,167 +170,394 @@ class handler(BaseHTTPRequestHandler):
         cursor.execute(query, [limit])
         rows = cursor.fetchall()
         
-        institutions = []
-        for row in rows:
-            institutions.append({
-                "name": row[0],
-                "bid_count": row[1],
-                "total_amount": int(row[2]) if row[2] else 0,
-                "avg_amount": int(row[3]) if row[3] else 0,
-                "avg_rate": float(row[4]) if row[4] else 0,
-                "min_rate": float(row[5]) if row[5] else 0,
-                "max_rate": float(row[6]) if row[6] else 0,
-                "avg_participants": float(row[7]) if row[7] else 0,
-                "unique_winners": row[8]
-            })
-        
         # 전체 통계
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
-                COUNT(DISTINCT dminstt_nm) as total_institutions,
+                COUNT(DISTINCT {source["key"]}) as total_institutions,
                 COUNT(*) as total_bids,
-                ROUND(AVG(sucsf_bid_rate)::numeric, 2) as overall_avg_rate
-            FROM bid_results
-            WHERE dminstt_nm IS NOT NULL 
-                AND sucsf_bid_rate IS NOT NULL
-                AND dminstt_nm NOT LIKE '%%수요기관%%'
-                AND dminstt_nm NOT LIKE '%%각 %%'
-                AND char_length(dminstt_nm) > 2
+                ROUND(AVG(b.sucsf_bid_rate)::numeric, 2) as overall_avg_rate
+            FROM {source["from"]}
+            WHERE {source["filter"]}
+                AND b.sucsf_bid_rate IS NOT NULL
         """)
         total_stats = cursor.fetchone()
         
+        return self._format_institution_list(rows, total_stats)
+    
+    def _format_institution_list(self, rows, total_stats):
+        institutions = []
+        for row in rows:
+            institutions.append({
+                "id": row[0],
+                "name": row[1],
+                "bid_count": row[2],
+                "total_amount": int(row[3]) if row[3] else 0,
+                "avg_amount": int(row[4]) if row[4] else 0,
+                "avg_rate": float(row[5]) if row[5] else 0,
+                "min_rate": float(row[6]) if row[6] else 0,
+                "max_rate": float(row[7]) if row[7] else 0,
+                "avg_participants": float(row[8]) if row[8] else 0,
+                "unique_winners": row[9]
+            })
+        
         return {
             "success": True,
             "summary": {
                 "total_institutions": total_stats[0] if total_stats else 0,
-                "total_bids": total_stats[1] if total_stats else 0,
+                "total_bids": int(total_stats[1]) if total_stats and total_stats[1] else 0,
                 "overall_avg_rate": float(total_stats[2]) if total_stats and total_stats[2] else 0
             },
             "institutions": institutions
         }
     
     def _analyze_institution(self, cursor, name):
-        """특정 기관 상세 분석"""
-        
-        # 기본 통계
-        stats_query = """
-            SELECT 
-                dminstt_nm,
-                COUNT(*) as bid_count,
-                SUM(sucsf_bid_amt) as total_amount,
-                ROUND(AVG(sucsf_bid_amt)::numeric, 0) as avg_amount,
-                ROUND(AVG(sucsf_bid_rate)::numeric, 3) as avg_rate,
-                ROUND(STDDEV(sucsf_bid_rate)::numeric, 3) as std_rate,
-                ROUND(MIN(sucsf_bid_rate)::numeric, 3) as min_rate,
-                ROUND(MAX(sucsf_bid_rate)::numeric, 3) as max_rate,
-                ROUND(PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q1_rate,
-                ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as median_rate,
-                ROUND(PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q3_rate,
-                ROUND(AVG(prtcpt_cnum)::numeric, 1) as avg_participants,
-                COUNT(DISTINCT bidwinnr_bizno) as unique_winners
-            FROM bid_results
-            WHERE dminstt_nm LIKE %s
-                AND sucsf_bid_amt > 0
-                AND sucsf_bid_rate IS NOT NULL
-            GROUP BY dminstt_nm
-            ORDER BY COUNT(*) DESC
-            LIMIT 1
+        """
+        특정 기관 상세 분석
+        - 기관별 결과 캐시 (데이터 워터마크가 바뀌면 무효, api/_institutions.ProfileCache)
+        - 캐시에 없으면 기관 해석 + 통계/상위 낙찰업체/월별 추이/최근 낙찰을 한 문장으로 조회
+          (롤업이 있으면 최근 낙찰 10건만 원본에서 읽음)
         """
         
-        cursor.execute(stats_query, [f"%{name}%"])
-        stats = cursor.fetchone()
+        key = name.strip()
+        cached = PROFILE_CACHE.get(cursor, key)
+        _metrics.record_cache("institution_profile", cached is not None)
+        if cached is not None:
+            return cached
         
-        if not stats:
+        loaded = None
+        resolved = resolve_sql(name)
+        if resolved:
+            # 기관 × 월 롤업 → 기관 ID 인덱스 조회 순으로 시도 (롤업이 없거나 아직 비어 있으면 다음)
+            loaders = [
+                lambda: self._load_profile_from_rollup(cursor, resolved[0], resolved[1]),
+                lambda: self._load_profile(
+                    cursor, resolved[0], resolved[1],
+                    "b.institution_id = t.institution_id", DIMENSION_WATERMARK_SQL
+                ),
+            ]
+            for loader in loaders:
+                try:
+                    loaded = loader()
+                except psycopg2.errors.UndefinedTable:
+                    cursor.connection.rollback()
+                if loaded is not None:
+                    break
+        
+        if loaded is None:
+            # 기관 차원 미적용 또는 아직 등록되지 않은 이름 → 가장 많이 나온 dminstt_nm 표기
+            name_condition, name_params = substring_condition("dminstt_nm", name)
+            target_sql = f"""
+                SELECT NULL::integer AS institution_id, dminstt_nm AS canonical_name
+                FROM bid_results
+                WHERE {name_condition}
+                GROUP BY dminstt_nm
+                ORDER BY COUNT(*) DESC
+                LIMIT 1
+            """
+            loaded = self._load_profile(
+                cursor, target_sql, name_params,
+                "b.dminstt_nm = t.canonical_name", RAW_WATERMARK_SQL
+            )
+        
+        if loaded is None:
             return {
                 "success": False,
                 "message": f"'{name}' 기관을 찾을 수 없습니다."
             }
         
-        # 상위 낙찰업체
-        top_winners_query = """
+        result, watermark_sql, watermark = loaded
+        PROFILE_CACHE.put(key, result, watermark_sql, watermark)
+        return result
+    
+    def _load_profile(self, cursor, target_sql, target_params, join_condition, watermark_sql):
+        """
+        기관 분석 한 문장 조회 → (결과, 워터마크 식, 워터마크) (기관/데이터가 없으면 None)
+        
+        target_sql: 대상 기관 한 건 (institution_id, canonical_name)
+        join_condition: bid_results b 와 대상 t 의 조인 조건
+        """
+        
+        query = f"""
+            WITH target AS (
+                {target_sql}
+            ),
+            scoped AS MATERIALIZED (
+                SELECT
+                    b.bid_ntce_nm,
+                    b.bidwinnr_nm,
+                    b.bidwinnr_bizno,
+                    b.sucsf_bid_amt,
+                    b.sucsf_bid_rate,
+                    b.prtcpt_cnum,
+                    b.rgst_dt
+                FROM target t
+                JOIN bid_results b ON {join_condition}
+            ),
+            stats AS (
+                SELECT 
+                    COUNT(*) as bid_count,
+                    SUM(sucsf_bid_amt) as total_amount,
+                    ROUND(AVG(sucsf_bid_amt)::numeric, 0) as avg_amount,
+                    ROUND(AVG(sucsf_bid_rate)::numeric, 3) as avg_rate,
+                    ROUND(STDDEV(sucsf_bid_rate)::numeric, 3) as std_rate,
+                    ROUND(MIN(sucsf_bid_rate)::numeric, 3) as min_rate,
+                    ROUND(MAX(sucsf_bid_rate)::numeric, 3) as max_rate,
+                    ROUND(PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q1_rate,
+                    ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as median_rate,
+                    ROUND(PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q3_rate,
+                    ROUND(AVG(prtcpt_cnum)::numeric, 1) as avg_participants,
+                    COUNT(DISTINCT bidwinnr_bizno) as unique_winners
+                FROM scoped
+                WHERE sucsf_bid_amt > 0
+                    AND sucsf_bid_rate IS NOT NULL
+            ),
+            top_winners AS (
+                SELECT 
+                    bidwinnr_nm,
+                    bidwinnr_bizno,
+                    COUNT(*) as win_count,
+                    SUM(sucsf_bid_amt) as total_amount,
+                    ROUND(AVG(sucsf_bid_rate)::numeric, 2) as avg_rate
+                FROM scoped
+                WHERE bidwinnr_nm IS NOT NULL
+                GROUP BY bidwinnr_nm, bidwinnr_bizno
+                ORDER BY win_count DESC
+                LIMIT 10
+            ),
+            monthly AS (
+                SELECT 
+                    TO_CHAR(rgst_dt, 'YYYY-MM') as month,
+                    COUNT(*) as count,
+                    ROUND(AVG(sucsf_bid_rate)::numeric, 2) as avg_rate,
+                    SUM(sucsf_bid_amt) as total_amount
+                FROM scoped
+                WHERE rgst_dt IS NOT NULL
+                    AND sucsf_bid_rate IS NOT NULL
+                GROUP BY TO_CHAR(rgst_dt, 'YYYY-MM')
+                ORDER BY month DESC
+                LIMIT 12
+            ),
+            recent AS (
+                SELECT 
+                    bid_ntce_nm,
+                    bidwinnr_nm,
+                    sucsf_bid_amt,
+                    sucsf_bid_rate,
+                    prtcpt_cnum,
+                    rgst_dt
+                FROM scoped
+                ORDER BY rgst_dt DESC
+                LIMIT 10
+            )
             SELECT 
-                bidwinnr_nm,
-                bidwinnr_bizno,
-                COUNT(*) as win_count,
-                SUM(sucsf_bid_amt) as total_amount,
-                ROUND(AVG(sucsf_bid_rate)::numeric, 2) as avg_rate
-            FROM bid_results
-            WHERE dminstt_nm LIKE %s
-                AND bidwinnr_nm IS NOT NULL
-            GROUP BY bidwinnr_nm, bidwinnr_bizno
-            ORDER BY win_count DESC
-            LIMIT 10
+                t.institution_id,
+                t.canonical_name,
+                s.*,
+                (SELECT json_agg(json_build_array(bidwinnr_nm, bidwinnr_bizno, win_count, total_amount, avg_rate)
+                                 ORDER BY win_count DESC)
+                 FROM top_winners),
+                (SELECT json_agg(json_build_array(month, count, avg_rate, total_amount) ORDER BY month)
+                 FROM monthly),
+                (SELECT json_agg(json_build_array(bid_ntce_nm, bidwinnr_nm, sucsf_bid_amt, sucsf_bid_rate,
+                                                  prtcpt_cnum, rgst_dt::date)
+                                 ORDER BY rgst_dt DESC)
+                 FROM recent),
+                {watermark_sql}
+            FROM target t
+            CROSS JOIN stats s
         """
         
-        cursor.execute(top_winners_query, [f"%{name}%"])
-        top_winners = []
-        for row in cursor.fetchall():
-            top_winners.append({
-                "company_name": row[0],
-                "bizno": row[1],
-                "win_count": row[2],
-                "total_amount": int(row[3]) if row[3] else 0,
-                "avg_rate": float(row[4]) if row[4] else 0
-            })
+        cursor.execute(query, target_params)
+        row = cursor.fetchone()
         
-        # 월별 추이
-        monthly_query = """
+        if not row or not row[2]:
+            return None
+        
+        stats = row[2:14]
+        profile = self._format_profile(row[0], row[1], {
+            "bid_count": stats[0],
+            "total_amount": stats[1],
+            "avg_amount": stats[2],
+            "mean": stats[3],
+            "std": stats[4],
+            "min": stats[5],
+            "max": stats[6],
+            "q1": stats[7],
+            "median": stats[8],
+            "q3": stats[9],
+            "avg_participants": stats[10],
+            "unique_winners": stats[11]
+        }, row[14], row[15], row[16])
+        return profile, watermark_sql, row[17]
+    
+    def _load_profile_from_rollup(self, cursor, target_sql, target_params):
+        """
+        기관 × 월 롤업으로 분석 (sql/007_institution_rollup.sql) → (결과, 워터마크 식, 워터마크)
+        
+        분위수는 낙찰률 칸 히스토그램 병합 근사 (칸 폭 0.05%p 이내), 롤업에 행이 없으면 None
+        """
+        
+        query = f"""
+            WITH target AS (
+                {target_sql}
+            ),
+            months AS (
+                SELECT m.*
+                FROM target t
+                JOIN pps_bid.institution_monthly m ON m.institution_id = t.institution_id
+            ),
+            bins AS (
+                SELECT 
+                    r.rate_bin,
+                    SUM(r.cnt) as cnt,
+                    SUM(r.rate_sum) as rate_sum,
+                    SUM(r.rate_sumsq) as rate_sumsq,
+                    MIN(r.rate_min) as rate_min,
+                    MAX(r.rate_max) as rate_max
+                FROM target t
+                JOIN pps_bid.institution_monthly_rate_bins r ON r.institution_id = t.institution_id
+                GROUP BY r.rate_bin
+            ),
+            winners AS (
+                SELECT 
+                    w.bidwinnr_bizno,
+                    w.bidwinnr_nm,
+                    SUM(w.win_count) as win_count,
+                    SUM(w.amount_sum) as amount_sum,
+                    SUM(w.rate_sum) as rate_sum,
+                    SUM(w.rate_count) as rate_count,
+                    SUM(w.rated_count) as rated_count
+                FROM target t
+                JOIN pps_bid.institution_winner w ON w.institution_id = t.institution_id
+                GROUP BY w.bidwinnr_bizno, w.bidwinnr_nm
+            ),
+            top_winners AS (
+                SELECT *
+                FROM winners
+                WHERE bidwinnr_nm <> ''
+                ORDER BY win_count DESC
+                LIMIT 10
+            ),
+            monthly AS (
+                SELECT *
+                FROM months
+                ORDER BY month DESC
+                LIMIT 12
+            ),
+            recent AS (
+                SELECT 
+                    b.bid_ntce_nm,
+                    b.bidwinnr_nm,
+                    b.sucsf_bid_amt,
+                    b.sucsf_bid_rate,
+                    b.prtcpt_cnum,
+                    b.rgst_dt
+                FROM target t
+                JOIN bid_results b ON b.institution_id = t.institution_id
+                ORDER BY b.rgst_dt DESC
+                LIMIT 10
+            )
             SELECT 
-                TO_CHAR(rgst_dt, 'YYYY-MM') as month,
-                COUNT(*) as count,
-                ROUND(AVG(sucsf_bid_rate)::numeric, 2) as avg_rate,
-                SUM(sucsf_bid_amt) as total_amount
-            FROM bid_results
-            WHERE dminstt_nm LIKE %s
-                AND rgst_dt IS NOT NULL
-                AND sucsf_bid_rate IS NOT NULL
-            GROUP BY TO_CHAR(rgst_dt, 'YYYY-MM')
-            ORDER BY month DESC
-            LIMIT 12
+                t.institution_id,
+                t.canonical_name,
+                (SELECT json_build_array(SUM(amount_sum), SUM(participants_sum), SUM(participants_count))
+                 FROM months),
+                (SELECT json_agg(json_build_array(cnt, rate_sum, rate_sumsq, rate_min, rate_max) ORDER BY rate_bin)
+                 FROM bins),
+                (SELECT COUNT(DISTINCT bidwinnr_bizno)
+                 FROM winners
+                 WHERE rated_count > 0 AND bidwinnr_bizno <> ''),
+                (SELECT json_agg(json_build_array(bidwinnr_nm, NULLIF(bidwinnr_bizno, ''), win_count, amount_sum,
+                                                  ROUND(rate_sum / NULLIF(rate_count, 0), 2))
+                                 ORDER BY win_count DESC)
+                 FROM top_winners),
+                (SELECT json_agg(json_build_array(TO_CHAR(month, 'YYYY-MM'), bid_count,
+                                                  ROUND(rate_sum / bid_count, 2), amount_sum)
+                                 ORDER BY month)
+                 FROM monthly),
+                (SELECT json_agg(json_build_array(bid_ntce_nm, bidwinnr_nm, sucsf_bid_amt, sucsf_bid_rate,
+                                                  prtcpt_cnum, rgst_dt::date)
+                                 ORDER BY rgst_dt DESC)
+                 FROM recent),
+                {DIMENSION_WATERMARK_SQL}
+            FROM target t
         """
         
-        cursor.execute(monthly_query, [f"%{name}%"])
+        cursor.execute(query, target_params)
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        bins = [
+            (int(b[0]), float(b[1]), float(b[2]), float(b[3]), float(b[4]))
+            for b in row[3] or []
+        ]
+        summary = summarize_histogram(bins)
+        count = summary["sample_count"]
+        if not count:
+            return None
+        
+        amount_sum, participants_sum, participants_count = row[2]
+        
+        def rounded(value, digits):
+            return round(value, digits) if value is not None else None
+        
+        profile = self._format_profile(row[0], row[1], {
+            "bid_count": count,
+            "total_amount": amount_sum,
+            "avg_amount": round(amount_sum / count) if amount_sum else 0,
+            "mean": rounded(summary["mean"], 3),
+            "std": rounded(summary["std"], 3),
+            "min": rounded(summary["min"], 3),
+            "max": rounded(summary["max"], 3),
+            "q1": rounded(summary["q1"], 3),
+            "median": rounded(summary["median"], 3),
+            "q3": rounded(summary["q3"], 3),
+            "avg_participants": round(participants_sum / participants_count, 1) if participants_count else None,
+            "unique_winners": row[4]
+        }, row[5], row[6], row[7])
+        return profile, DIMENSION_WATERMARK_SQL, row[8]
+    
+    def _format_profile(self, institution_id, institution_name, stats, top_winner_rows, monthly_rows, recent_rows):
+        """기관 분석 응답 (목록 행은 json_build_array 순서)"""
+        
+        # 상위 낙찰업체
+        top_winners = []
+        for winner in top_winner_rows or []:
+            top_winners.append({
+                "company_name": winner[0],
+                "bizno": winner[1],
+                "win_count": winner[2],
+                "total_amount": int(winner[3]) if winner[3] else 0,
+                "avg_rate": float(winner[4]) if winner[4] else 0
+            })
+        
+        # 월별 추이 (오래된 달부터)
         monthly_trend = []
-        for row in cursor.fetchall():
+        for month in monthly_rows or []:
             monthly_trend.append({
-                "month": row[0],
-                "count": row[1],
-                "avg_rate": float(row[2]) if row[2] else 0,
-                "total_amount": int(row[3]) if row[3] else 0
+                "month": month[0],
+                "count": month[1],
+                "avg_rate": float(month[2]) if month[2] else 0,
+                "total_amount": int(month[3]) if month[3] else 0
             })
-        monthly_trend.reverse()
         
         # 최근 낙찰 내역
-        recent_query = """
-            SELECT 
-                bid_ntce_nm,
-                bidwinnr_nm,
-                sucsf_bid_amt,
-                sucsf_bid_rate,
-                prtcpt_cnum,
-                rgst_dt::date
-            FROM bid_results
-            WHERE dminstt_nm LIKE %s
-            ORDER BY rgst_dt DESC
-            LIMIT 10
-        """
-        
-        cursor.execute(recent_query, [f"%{name}%"])
         recent_bids = []
-        for row in cursor.fetchall():
+        for bid in recent_rows or []:
             recent_bids.append({
-                "bid_name": row[0],
-                "winner": row[1],
-                "amount": int(row[2]) if row[2] else 0,
-                "rate": float(row[3]) if row[3] else 0,
-                "participants": row[4],
-                "date": str(row[5]) if row[5] else None
+                "bid_name": bid[0],
+                "winner": bid[1],
+                "amount": int(bid[2]) if bid[2] else 0,
+                "rate": float(bid[3]) if bid[3] else 0,
+                "participants": bid[4],
+                "date": str(bid[5]) if bid[5] else None
             })
         
         # 추천 투찰률 계산
-        avg_rate = float(stats[4]) if stats[4] else 0
-        q1_rate = float(stats[8]) if stats[8] else 0
-        median_rate = float(stats[9]) if stats[9] else 0
+        avg_rate = float(stats["mean"]) if stats["mean"] else 0
+        q1_rate = float(stats["q1"]) if stats["q1"] else 0
+        median_rate = float(stats["median"]) if stats["median"] else 0
         
         recommended_rate = {
             "optimal": round((q1_rate + median_rate) / 2, 2),
@@ -234,21 +568,22 @@ class handler(BaseHTTPRequestHandler):
         return {
             "success": True,
             "institution": {
-                "name": stats[0],
-                "bid_count": stats[1],
-                "total_amount": int(stats[2]) if stats[2] else 0,
-                "avg_amount": int(stats[3]) if stats[3] else 0,
-                "unique_winners": stats[12],
-                "avg_participants": float(stats[11]) if stats[11] else 0
+                "id": institution_id,
+                "name": institution_name,
+                "bid_count": stats["bid_count"],
+                "total_amount": int(stats["total_amount"]) if stats["total_amount"] else 0,
+                "avg_amount": int(stats["avg_amount"]) if stats["avg_amount"] else 0,
+                "unique_winners": stats["unique_winners"],
+                "avg_participants": float(stats["avg_participants"]) if stats["avg_participants"] else 0
             },
             "rate_statistics": {
                 "mean": avg_rate,
-                "std": float(stats[5]) if stats[5] else 0,
-                "min": float(stats[6]) if stats[6] else 0,
-                "max": float(stats[7]) if stats[7] else 0,
+                "std": float(stats["std"]) if stats["std"] else 0,
+                "min": float(stats["min"]) if stats["min"] else 0,
+                "max": float(stats["max"]) if stats["max"] else 0,
                 "q1": q1_rate,
                 "median": median_rate,
-                "q3": float(stats[10]) if stats[10] else 0
+                "q3": float(stats["q3"]) if stats["q3"] else 0
             },
             "recommended_rate": recommended_rate,
             "top_winners": top_winners,
@@ -257,11 +592,7 @@ class handler(BaseHTTPRequestHandler):
         }
     
     def _send_response(self, status_code, data):
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+        send_json(self, status_code, data)
     
     def _send_error(self, status_code, message):
         self._send_response(status_code, {"success": False, "error": message})
@@ -0,0 +1,10 @@
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from api._metrics import send_metrics
+
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        """이 프로세스의 메트릭 (Prometheus 텍스트 형식, api/_metrics.py)"""
+        send_metrics(self, parse_qs(urlparse(self.path).query))
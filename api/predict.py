@@ -1,10 +1,24 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import os
-import psycopg2
 from urllib.parse import parse_qs, urlparse
 
+import psycopg2
+
+from api import _metrics
+from api._db import get_connection
+from api._rate_cube import cell_conditions, summarize_histogram
+from api._response import send_json, track_request
+from api._text_search import substring_condition
+
+
+# 예측 조건 단계 (엄격 → 완화 순)
+# strict 만 발주기관/참가업체수(±5) 조건을 적용한다.
+PREDICTION_LEVELS = [
+    {"name": "strict", "amount_range": (0.7, 1.3), "min_samples": 10},
+    {"name": "relaxed", "amount_range": (0.5, 1.5), "min_samples": 5},
+]
+
 class handler(BaseHTTPRequestHandler):
+    @track_request("predict")
     def do_GET(self):
         """
         낙찰가 예측 API
@@ -31,19 +45,17 @@ class handler(BaseHTTPRequestHandler):
                 return
             
             # DB 연결
-            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-            cursor = conn.cursor()
+            with get_connection("predict") as conn:
+                cursor = conn.cursor()
             
-            # 유사 조건 데이터 조회
-            result = self._predict_bid_rate(
-                cursor, 
-                estimated_price, 
-                institution, 
-                bid_type, 
-                participants
-            )
-            
-            conn.close()
+                # 유사 조건 데이터 조회
+                result = self._predict_bid_rate(
+                    cursor, 
+                    estimated_price, 
+                    institution, 
+                    bid_type, 
+                    participants
+                )
             
             self._send_response(200, result)
             
@@ -51,67 +63,261 @@ class handler(BaseHTTPRequestHandler):
             self._send_error(500, str(e))
     
     def _predict_bid_rate(self, cursor, estimated_price, institution, bid_type, participants):
-        """과거 데이터 기반 낙찰률 예측"""
+        """
+        과거 데이터 기반 낙찰률 예측
+        
+        모든 조건 단계(PREDICTION_LEVELS)를 한 번의 쿼리로 집계한 뒤
+        표본 수를 만족하는 가장 엄격한 단계를 사용한다.
+        """
+        levels = [
+            self._level_filters(level, estimated_price, institution, bid_type, participants)
+            for level in PREDICTION_LEVELS
+        ]
+        
+        # 발주기관 조건이 없으면 사전 집계 큐브, 아니면 원본 집계
+        level_stats = None
+        if not institution:
+            level_stats, similar_cases = self._load_levels_from_cube(cursor, levels)
+            _metrics.record_cache("rate_cube", level_stats is not None)
+        source = "cube"
+        if level_stats is None:
+            level_stats, similar_cases = self._load_levels_from_raw(cursor, levels)
+            source = "raw"
         
-        # 금액 범위 설정 (±30%)
-        min_amount = int(estimated_price * 0.7)
-        max_amount = int(estimated_price * 1.3)
+        for level, stats in zip(PREDICTION_LEVELS, level_stats):
+            if stats["sample_count"] < level["min_samples"]:
+                continue
+            if level["name"] == "strict":
+                result = self._strict_result(estimated_price, participants, stats, similar_cases)
+            else:
+                result = self._relaxed_result(estimated_price, stats)
+            result["source"] = source
+            return result
         
-        # 조건 구성
+        return {
+            "success": False,
+            "message": "유사한 과거 데이터가 부족합니다",
+            "sample_count": level_stats[-1]["sample_count"]
+        }
+    
+    def _level_filters(self, level, estimated_price, institution, bid_type, participants):
+        """조건 단계 → 필터 값"""
+        filters = {
+            "min_amount": int(estimated_price * level["amount_range"][0]),
+            "max_amount": int(estimated_price * level["amount_range"][1]),
+            "bid_type": bid_type,
+            "institution": None,
+            "min_participants": None,
+            "max_participants": None
+        }
+        if level["name"] == "strict":
+            filters["institution"] = institution
+            if participants:
+                filters["min_participants"] = max(1, participants - 5)
+                filters["max_participants"] = participants + 5
+        return filters
+    
+    def _raw_conditions(self, filters):
+        """필터 → bid_results 조건 (sql, params)"""
         conditions = [
             "sucsf_bid_rate IS NOT NULL",
             "sucsf_bid_amt > 0",
             "sucsf_bid_amt BETWEEN %s AND %s"
         ]
-        params = [min_amount, max_amount]
+        params = [filters["min_amount"], filters["max_amount"]]
         
-        if institution:
-            conditions.append("dminstt_nm LIKE %s")
-            params.append(f"%{institution}%")
+        if filters["institution"]:
+            condition, condition_params = substring_condition("dminstt_nm", filters["institution"])
+            conditions.append(condition)
+            params.extend(condition_params)
         
-        if bid_type:
+        if filters["bid_type"]:
             conditions.append("bid_type = %s")
-            params.append(bid_type)
+            params.append(filters["bid_type"])
         
-        if participants:
+        if filters["min_participants"] is not None:
             conditions.append("prtcpt_cnum BETWEEN %s AND %s")
-            params.extend([max(1, participants - 5), participants + 5])
+            params.extend([filters["min_participants"], filters["max_participants"]])
         
-        where_clause = " AND ".join(conditions)
+        return " AND ".join(conditions), params
+    
+    def _similar_cases_sql(self, source_sql):
+        """가장 엄격한 단계의 최근 사례 10건 (json 배열 스칼라 서브쿼리)"""
+        return f"""
+            (SELECT json_agg(json_build_array(
+                        bid_ntce_nm, dminstt_nm, sucsf_bid_amt, sucsf_bid_rate,
+                        prtcpt_cnum, rgst_dt::date
+                    ) ORDER BY rgst_dt DESC)
+             FROM (
+                {source_sql}
+                ORDER BY rgst_dt DESC
+                LIMIT 10
+             ) similar)
+        """
+    
+    def _load_levels_from_raw(self, cursor, levels):
+        """
+        bid_results 한 번 스캔으로 단계별 집계 + 유사 사례
+        
+        가장 느슨한 단계 조건으로 읽고 각 단계는 FILTER 조건부 집계로 계산한다.
+        """
+        loosest_sql, loosest_params = self._raw_conditions(levels[-1])
+        
+        flag_columns = []
+        flag_params = []
+        for i, filters in enumerate(levels):
+            level_sql, level_params = self._raw_conditions(filters)
+            flag_columns.append(f"({level_sql}) AS level_{i}")
+            flag_params.extend(level_params)
+        
+        aggregates = []
+        for i in range(len(levels)):
+            level_filter = f"FILTER (WHERE level_{i})"
+            aggregates.extend([
+                f"COUNT(*) {level_filter}",
+                f"AVG(sucsf_bid_rate) {level_filter}",
+                f"STDDEV(sucsf_bid_rate) {level_filter}",
+                f"PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY sucsf_bid_rate) {level_filter}",
+                f"PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY sucsf_bid_rate) {level_filter}",
+                f"PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY sucsf_bid_rate) {level_filter}",
+                f"MIN(sucsf_bid_rate) {level_filter}",
+                f"MAX(sucsf_bid_rate) {level_filter}",
+            ])
+        
+        similar_sql = self._similar_cases_sql("SELECT * FROM matched WHERE level_0")
         
-        # 통계 쿼리
         query = f"""
-            SELECT 
-                COUNT(*) as sample_count,
-                ROUND(AVG(sucsf_bid_rate)::numeric, 3) as avg_rate,
-                ROUND(STDDEV(sucsf_bid_rate)::numeric, 3) as std_rate,
-                ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as median_rate,
-                ROUND(PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q1_rate,
-                ROUND(PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q3_rate,
-                ROUND(MIN(sucsf_bid_rate)::numeric, 3) as min_rate,
-                ROUND(MAX(sucsf_bid_rate)::numeric, 3) as max_rate
-            FROM bid_results
-            WHERE {where_clause}
+            WITH matched AS (
+                SELECT
+                    bid_ntce_nm,
+                    dminstt_nm,
+                    sucsf_bid_amt,
+                    sucsf_bid_rate,
+                    prtcpt_cnum,
+                    rgst_dt,
+                    {", ".join(flag_columns)}
+                FROM bid_results
+                WHERE {loosest_sql}
+            )
+            SELECT
+                {", ".join(aggregates)},
+                {similar_sql}
+            FROM matched
         """
+        cursor.execute(query, flag_params + loosest_params)
+        row = cursor.fetchone()
         
-        cursor.execute(query, params)
-        stats = cursor.fetchone()
+        level_stats = []
+        for i in range(len(levels)):
+            values = row[i * 8:(i + 1) * 8]
+            level_stats.append({
+                "sample_count": values[0] or 0,
+                "mean": values[1],
+                "std": values[2],
+                "median": values[3],
+                "q1": values[4],
+                "q3": values[5],
+                "min": values[6],
+                "max": values[7]
+            })
         
-        sample_count = stats[0] or 0
+        return level_stats, self._format_similar_cases(row[-1])
+    
+    def _load_levels_from_cube(self, cursor, levels):
+        """
+        pps_bid.rate_cube 에서 단계별 히스토그램 + 유사 사례를 한 쿼리로 조회
+        
+        큐브 테이블이 없으면 (None, None)
+        """
+        def cube_conditions(filters):
+            return cell_conditions(
+                filters["min_amount"], filters["max_amount"], filters["bid_type"],
+                filters["min_participants"], filters["max_participants"]
+            )
+        
+        loosest_sql, loosest_params = cube_conditions(levels[-1])
         
-        # 데이터 부족 시 조건 완화
-        if sample_count < 10:
-            return self._predict_with_relaxed_conditions(
-                cursor, estimated_price, bid_type, participants
+        flag_columns = []
+        flag_params = []
+        bin_columns = []
+        bin_values = []
+        for i, filters in enumerate(levels):
+            level_sql, level_params = cube_conditions(filters)
+            flag_columns.append(f"({level_sql}) AS level_{i}")
+            flag_params.extend(level_params)
+            level_filter = f"FILTER (WHERE level_{i})"
+            bin_columns.extend([
+                f"SUM(cnt) {level_filter} AS cnt_{i}",
+                f"SUM(rate_sum) {level_filter} AS rate_sum_{i}",
+                f"SUM(rate_sumsq) {level_filter} AS rate_sumsq_{i}",
+                f"MIN(rate_min) {level_filter} AS rate_min_{i}",
+                f"MAX(rate_max) {level_filter} AS rate_max_{i}",
+            ])
+            bin_values.extend([f"cnt_{i}", f"rate_sum_{i}", f"rate_sumsq_{i}", f"rate_min_{i}", f"rate_max_{i}"])
+        
+        strict_sql, strict_params = self._raw_conditions(levels[0])
+        similar_sql = self._similar_cases_sql(f"SELECT * FROM bid_results WHERE {strict_sql}")
+        
+        query = f"""
+            WITH cells AS (
+                SELECT
+                    rate_bin, cnt, rate_sum, rate_sumsq, rate_min, rate_max,
+                    {", ".join(flag_columns)}
+                FROM pps_bid.rate_cube
+                WHERE {loosest_sql}
+            ),
+            bins AS (
+                SELECT rate_bin, {", ".join(bin_columns)}
+                FROM cells
+                GROUP BY rate_bin
             )
+            SELECT
+                (SELECT json_agg(json_build_array({", ".join(bin_values)}) ORDER BY rate_bin) FROM bins),
+                {similar_sql}
+        """
+        try:
+            cursor.execute(query, flag_params + loosest_params + strict_params)
+        except psycopg2.errors.UndefinedTable:
+            cursor.connection.rollback()
+            return None, None
         
-        avg_rate = float(stats[1]) if stats[1] else 0
-        std_rate = float(stats[2]) if stats[2] else 0
-        median_rate = float(stats[3]) if stats[3] else 0
-        q1_rate = float(stats[4]) if stats[4] else 0
-        q3_rate = float(stats[5]) if stats[5] else 0
-        min_rate = float(stats[6]) if stats[6] else 0
-        max_rate = float(stats[7]) if stats[7] else 0
+        bins_json, similar_json = cursor.fetchone()
+        
+        level_stats = []
+        for i in range(len(levels)):
+            bins = []
+            for values in bins_json or []:
+                cnt, rate_sum, rate_sumsq, rate_min, rate_max = values[i * 5:(i + 1) * 5]
+                if cnt:
+                    bins.append((int(cnt), float(rate_sum), float(rate_sumsq), float(rate_min), float(rate_max)))
+            level_stats.append(summarize_histogram(bins))
+        
+        return level_stats, self._format_similar_cases(similar_json)
+    
+    def _format_similar_cases(self, rows):
+        similar_cases = []
+        for row in rows or []:
+            similar_cases.append({
+                "bid_name": row[0],
+                "institution": row[1],
+                "amount": row[2],
+                "rate": float(row[3]) if row[3] else None,
+                "participants": row[4],
+                "date": str(row[5]) if row[5] else None
+            })
+        return similar_cases
+    
+    def _strict_result(self, estimated_price, participants, stats, similar_cases):
+        """기본 조건 결과"""
+        sample_count = stats["sample_count"]
+        
+        avg_rate = self._round3(stats["mean"])
+        std_rate = self._round3(stats["std"])
+        median_rate = self._round3(stats["median"])
+        q1_rate = self._round3(stats["q1"])
+        q3_rate = self._round3(stats["q3"])
+        min_rate = self._round3(stats["min"])
+        max_rate = self._round3(stats["max"])
         
         # 참가업체수 보정
         adjustment = 0
@@ -135,32 +341,6 @@ class handler(BaseHTTPRequestHandler):
         low_amount = int(estimated_price * recommended_low / 100)
         high_amount = int(estimated_price * recommended_high / 100)
         
-        # 유사 사례 조회
-        similar_query = f"""
-            SELECT 
-                bid_ntce_nm,
-                dminstt_nm,
-                sucsf_bid_amt,
-                sucsf_bid_rate,
-                prtcpt_cnum,
-                rgst_dt::date
-            FROM bid_results
-            WHERE {where_clause}
-            ORDER BY rgst_dt DESC
-            LIMIT 10
-        """
-        cursor.execute(similar_query, params)
-        similar_cases = []
-        for row in cursor.fetchall():
-            similar_cases.append({
-                "bid_name": row[0],
-                "institution": row[1],
-                "amount": row[2],
-                "rate": float(row[3]) if row[3] else None,
-                "participants": row[4],
-                "date": str(row[5]) if row[5] else None
-            })
-        
         return {
             "success": True,
             "estimated_price": estimated_price,
@@ -188,51 +368,14 @@ class handler(BaseHTTPRequestHandler):
             "similar_cases": similar_cases
         }
     
-    def _predict_with_relaxed_conditions(self, cursor, estimated_price, bid_type, participants):
-        """조건 완화하여 재검색"""
-        
-        min_amount = int(estimated_price * 0.5)
-        max_amount = int(estimated_price * 1.5)
+    def _relaxed_result(self, estimated_price, stats):
+        """완화된 조건 결과"""
+        sample_count = stats["sample_count"]
         
-        conditions = [
-            "sucsf_bid_rate IS NOT NULL",
-            "sucsf_bid_amt BETWEEN %s AND %s"
-        ]
-        params = [min_amount, max_amount]
-        
-        if bid_type:
-            conditions.append("bid_type = %s")
-            params.append(bid_type)
-        
-        where_clause = " AND ".join(conditions)
-        
-        query = f"""
-            SELECT 
-                COUNT(*) as sample_count,
-                ROUND(AVG(sucsf_bid_rate)::numeric, 3) as avg_rate,
-                ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as median_rate,
-                ROUND(PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q1_rate,
-                ROUND(PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q3_rate
-            FROM bid_results
-            WHERE {where_clause}
-        """
-        
-        cursor.execute(query, params)
-        stats = cursor.fetchone()
-        
-        sample_count = stats[0] or 0
-        
-        if sample_count < 5:
-            return {
-                "success": False,
-                "message": "유사한 과거 데이터가 부족합니다",
-                "sample_count": sample_count
-            }
-        
-        avg_rate = float(stats[1]) if stats[1] else 87.5
-        median_rate = float(stats[2]) if stats[2] else 87.5
-        q1_rate = float(stats[3]) if stats[3] else 86.0
-        q3_rate = float(stats[4]) if stats[4] else 89.0
+        avg_rate = self._round3(stats["mean"]) or 87.5
+        median_rate = self._round3(stats["median"]) or 87.5
+        q1_rate = self._round3(stats["q1"]) or 86.0
+        q3_rate = self._round3(stats["q3"]) or 89.0
         
         optimal_rate = round((q1_rate + median_rate) / 2, 3)
         
@@ -259,12 +402,11 @@ class handler(BaseHTTPRequestHandler):
             }
         }
     
+    def _round3(self, value):
+        return round(float(value), 3) if value else 0
+    
     def _send_response(self, status_code, data):
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+        send_json(self, status_code, data)
     
     def _send_error(self, status_code, message):
         self._send_response(status_code, {"success": False, "error": message})
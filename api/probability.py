@@ -1,20 +1,47 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import os
-import psycopg2
 from urllib.parse import parse_qs, urlparse
 
+import numpy as np
+
+from api._db import get_connection
+from api._rate_index import RateDistribution, get_rate_index
+from api._response import send_json, track_request
+from api._simulation import (
+    DEFAULT_SEED, DEFAULT_TRIALS, MAX_TRIALS, MIN_HISTORY_BIDS, load_bid_history, simulate, simulate_curve
+)
+from api._text_search import substring_condition
+
+
+# 리스크 레벨: (레벨, 색상, 추천 문구) - _risk_bucket 순서
+RISK_LEVELS = [
+    ("높음", "red", "⚠️ 투찰률이 너무 낮습니다. 덤핑 의심을 받거나 수익성이 낮을 수 있습니다."),
+    ("적정-공격적", "yellow", "✅ 공격적인 투찰입니다. 낙찰 가능성이 높지만 마진이 적을 수 있습니다."),
+    ("적정", "green", "✅ 적정 수준의 투찰입니다. 낙찰 가능성과 수익성의 균형이 좋습니다."),
+    ("보수적", "yellow", "⚡ 보수적인 투찰입니다. 수익성은 좋지만 낙찰 가능성이 낮아질 수 있습니다."),
+    ("낮음", "red", "⚠️ 투찰률이 높습니다. 낙찰 가능성이 낮을 수 있으니 재검토를 권장합니다."),
+]
+
+# 곡선 모드 최대 계산 지점 수
+MAX_CURVE_POINTS = 1000
+
 class handler(BaseHTTPRequestHandler):
+    @track_request("probability")
     def do_GET(self):
         """
         낙찰 확률 계산 API
         
         파라미터:
-        - my_rate: 내 투찰률 (필수)
+        - my_rate: 내 투찰률 (필수, 곡선 모드 제외)
         - estimated_price: 예정가격 (선택)
         - institution: 발주기관명 (선택)
         - bid_type: 입찰유형 (선택)
         - participants: 예상 참가업체수 (선택)
+        - trials: 몬테카를로 시행 횟수 (선택, 기본 20000, 최대 100000)
+        - seed: 난수 시드 (선택, 기본 0 - 같은 입력이면 같은 결과)
+        
+        곡선 모드 (여러 투찰률을 한 번에 계산):
+        - rates: 쉼표로 구분한 투찰률 목록 (예: 87.5,88,88.5)
+        - rate_from, rate_to, rate_step: 투찰률 범위 (rate_step 기본 0.1)
         """
         try:
             # 파라미터 파싱
@@ -29,71 +56,60 @@ class handler(BaseHTTPRequestHandler):
             participants = query.get('participants', [None])[0]
             if participants:
                 participants = int(participants)
+            trials = int(query.get('trials', [DEFAULT_TRIALS])[0])
+            trials = max(1, min(trials, MAX_TRIALS))
+            seed = int(query.get('seed', [DEFAULT_SEED])[0])
+            
+            curve_rates = self._parse_curve_rates(query)
+            if curve_rates is not None:
+                if not curve_rates:
+                    self._send_error(400, "계산할 투찰률이 없습니다")
+                    return
+                if len(curve_rates) > MAX_CURVE_POINTS:
+                    self._send_error(400, f"투찰률은 최대 {MAX_CURVE_POINTS}개까지 계산할 수 있습니다")
+                    return
+                
+                with get_connection("probability") as conn:
+                    cursor = conn.cursor()
+                    result = self._calculate_curve(
+                        cursor, curve_rates, estimated_price, institution, bid_type, participants,
+                        trials, seed
+                    )
+                
+                self._send_response(200, result)
+                return
             
             if not my_rate:
                 self._send_error(400, "my_rate는 필수입니다")
                 return
             
             # DB 연결
-            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-            cursor = conn.cursor()
+            with get_connection("probability") as conn:
+                cursor = conn.cursor()
             
-            # 확률 계산
-            result = self._calculate_probability(
-                cursor, my_rate, estimated_price, institution, bid_type, participants
-            )
-            
-            conn.close()
+                # 확률 계산
+                result = self._calculate_probability(
+                    cursor, my_rate, estimated_price, institution, bid_type, participants,
+                    trials, seed
+                )
             
             self._send_response(200, result)
             
         except Exception as e:
             self._send_error(500, str(e))
     
-    def _calculate_probability(self, cursor, my_rate, estimated_price, institution, bid_type, participants):
-        """과거 데이터 기반 낙찰 확률 계산"""
-        
-        # 조건 구성
-        conditions = ["sucsf_bid_rate IS NOT NULL", "sucsf_bid_amt > 0"]
-        params = []
-        
-        if estimated_price:
-            min_amount = int(estimated_price * 0.5)
-            max_amount = int(estimated_price * 1.5)
-            conditions.append("sucsf_bid_amt BETWEEN %s AND %s")
-            params.extend([min_amount, max_amount])
-        
-        if institution:
-            conditions.append("dminstt_nm LIKE %s")
-            params.append(f"%{institution}%")
-        
-        if bid_type:
-            conditions.append("bid_type = %s")
-            params.append(bid_type)
-        
-        if participants:
-            conditions.append("prtcpt_cnum BETWEEN %s AND %s")
-            params.extend([max(1, participants - 10), participants + 10])
-        
-        where_clause = " AND ".join(conditions)
-        
-        # 통계 쿼리
-        stats_query = f"""
-            SELECT 
-                COUNT(*) as total,
-                ROUND(AVG(sucsf_bid_rate)::numeric, 3) as avg_rate,
-                ROUND(STDDEV(sucsf_bid_rate)::numeric, 3) as std_rate,
-                ROUND(PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q1,
-                ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as median,
-                ROUND(PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q3
-            FROM bid_results
-            WHERE {where_clause}
+    def _calculate_probability(self, cursor, my_rate, estimated_price, institution, bid_type, participants,
+                               trials=DEFAULT_TRIALS, seed=DEFAULT_SEED):
+        """
+        과거 데이터 기반 낙찰 확률 계산
+        - 유사 공고의 참가업체 투찰 이력이 있으면 몬테카를로 시뮬레이션(api/_simulation.py)으로
+          낙찰 확률과 순위 분포를 계산
+        - 없으면 낙찰률 백분위 기반 추정식 사용
         """
         
-        cursor.execute(stats_query, params)
-        stats = cursor.fetchone()
+        distribution = self._load_distribution(cursor, estimated_price, institution, bid_type, participants)
         
-        total = stats[0] or 0
+        total = distribution["total"]
         
         if total < 10:
             return {
@@ -102,22 +118,14 @@ class handler(BaseHTTPRequestHandler):
                 "sample_count": total
             }
         
-        avg_rate = float(stats[1]) if stats[1] else 0
-        std_rate = float(stats[2]) if stats[2] else 1
-        q1 = float(stats[3]) if stats[3] else 0
-        median = float(stats[4]) if stats[4] else 0
-        q3 = float(stats[5]) if stats[5] else 0
+        avg_rate = distribution["mean"] or 0
+        std_rate = distribution["std"] or 1
+        q1 = distribution["q1"] or 0
+        median = distribution["median"] or 0
+        q3 = distribution["q3"] or 0
         
         # 내 투찰률보다 높은(덜 경쟁적인) 비율 계산
-        percentile_query = f"""
-            SELECT 
-                COUNT(*) FILTER (WHERE sucsf_bid_rate > %s) as higher_count
-            FROM bid_results
-            WHERE {where_clause}
-        """
-        
-        cursor.execute(percentile_query, [my_rate] + params)
-        higher_count = cursor.fetchone()[0] or 0
+        higher_count = distribution["higher_count"](my_rate)
         
         # 백분위 계산 (낮은 투찰률 = 높은 경쟁력)
         percentile = round((higher_count / total) * 100, 1)
@@ -133,6 +141,14 @@ class handler(BaseHTTPRequestHandler):
         
         win_probability = round(max(5, min(95, win_probability)), 1)
         
+        # 참가업체 투찰 이력 기반 시뮬레이션
+        history = self._load_history(cursor, estimated_price, institution, bid_type, participants)
+        simulation = None
+        if history is not None:
+            competitors = participants - 1 if participants else None
+            simulation = simulate(history, my_rate, competitors, trials, seed)
+            win_probability = simulation["win_probability"]
+        
         # Z-score 계산
         z_score = round((my_rate - avg_rate) / std_rate, 2) if std_rate > 0 else 0
         
@@ -140,32 +156,14 @@ class handler(BaseHTTPRequestHandler):
         estimated_rank = max(1, int(((100 - percentile) / 100) * (participants or 10)) + 1)
         
         # 리스크 레벨 및 추천
-        if my_rate < q1 - 2:
-            risk_level = "높음"
-            risk_color = "red"
-            recommendation = "⚠️ 투찰률이 너무 낮습니다. 덤핑 의심을 받거나 수익성이 낮을 수 있습니다."
-        elif my_rate < q1:
-            risk_level = "적정-공격적"
-            risk_color = "yellow"
-            recommendation = "✅ 공격적인 투찰입니다. 낙찰 가능성이 높지만 마진이 적을 수 있습니다."
-        elif my_rate < median:
-            risk_level = "적정"
-            risk_color = "green"
-            recommendation = "✅ 적정 수준의 투찰입니다. 낙찰 가능성과 수익성의 균형이 좋습니다."
-        elif my_rate < q3:
-            risk_level = "보수적"
-            risk_color = "yellow"
-            recommendation = "⚡ 보수적인 투찰입니다. 수익성은 좋지만 낙찰 가능성이 낮아질 수 있습니다."
-        else:
-            risk_level = "낮음"
-            risk_color = "red"
-            recommendation = "⚠️ 투찰률이 높습니다. 낙찰 가능성이 낮을 수 있으니 재검토를 권장합니다."
+        risk_level, risk_color, recommendation = RISK_LEVELS[self._risk_bucket(my_rate, q1, median, q3)]
         
         return {
             "success": True,
             "my_rate": my_rate,
             "my_amount": int(estimated_price * my_rate / 100) if estimated_price else None,
             "win_probability": win_probability,
+            "win_probability_method": "simulation" if simulation else "heuristic",
             "percentile": percentile,
             "estimated_rank": estimated_rank,
             "total_participants": participants or "미지정",
@@ -182,15 +180,285 @@ class handler(BaseHTTPRequestHandler):
                 "median": median,
                 "q1": q1,
                 "q3": q3
+            },
+            "simulation": simulation
+        }
+    
+    def _load_history(self, cursor, estimated_price, institution, bid_type, participants):
+        """시뮬레이션용 유사 공고 참가업체 투찰률 (이력이 부족하면 None)"""
+        
+        conditions, params = self._filter_conditions(estimated_price, institution, bid_type, participants)
+        where_clause = " AND ".join(conditions) if conditions else "TRUE"
+        
+        history = load_bid_history(cursor, where_clause, params)
+        if history.bid_count < MIN_HISTORY_BIDS:
+            return None
+        return history
+    
+    def _risk_bucket(self, my_rate, q1, median, q3):
+        """RISK_LEVELS 인덱스"""
+        if my_rate < q1 - 2:
+            return 0
+        elif my_rate < q1:
+            return 1
+        elif my_rate < median:
+            return 2
+        elif my_rate < q3:
+            return 3
+        return 4
+    
+    def _parse_curve_rates(self, query):
+        """곡선 모드 투찰률 목록 (곡선 모드가 아니면 None)"""
+        
+        rates = query.get('rates', [None])[0]
+        if rates:
+            return sorted({round(float(rate), 3) for rate in rates.split(",") if rate.strip()})
+        
+        rate_from = query.get('rate_from', [None])[0]
+        rate_to = query.get('rate_to', [None])[0]
+        if rate_from is None or rate_to is None:
+            return None
+        
+        rate_from = float(rate_from)
+        rate_to = float(rate_to)
+        rate_step = float(query.get('rate_step', [0.1])[0])
+        if rate_step <= 0 or rate_to < rate_from:
+            return []
+        
+        count = int(round((rate_to - rate_from) / rate_step)) + 1
+        return [round(rate_from + rate_step * i, 3) for i in range(min(count, MAX_CURVE_POINTS + 1))]
+    
+    def _calculate_curve(self, cursor, rates, estimated_price, institution, bid_type, participants,
+                         trials=DEFAULT_TRIALS, seed=DEFAULT_SEED):
+        """
+        여러 투찰률의 낙찰 확률 곡선
+        - 분포와 참가업체 투찰 이력은 한 번만 조회하고 모든 투찰률을 벡터 연산으로 평가
+        - 이력이 있으면 낙찰 확률은 시뮬레이션 (api/_simulation.simulate_curve, 같은 시드의
+          simulate 와 공고 추출이 같고 이항 추출만 정확한 확률로 대체), 없으면 _calculate_probability
+          와 같은 백분위 기반 추정식
+        """
+        
+        distribution = self._load_distribution(
+            cursor, estimated_price, institution, bid_type, participants, fetch_rates=True
+        )
+        
+        total = distribution["total"]
+        
+        if total < 10:
+            return {
+                "success": False,
+                "message": "확률 계산을 위한 데이터가 부족합니다",
+                "sample_count": total
             }
+        
+        avg_rate = distribution["mean"] or 0
+        std_rate = distribution["std"] or 1
+        q1 = distribution["q1"] or 0
+        median = distribution["median"] or 0
+        q3 = distribution["q3"] or 0
+        
+        my_rates = np.asarray(rates, dtype=np.float64)
+        higher_counts = distribution["higher_count"](my_rates)
+        
+        percentiles = np.array([round((count / total) * 100, 1) for count in higher_counts.tolist()])
+        
+        history = self._load_history(cursor, estimated_price, institution, bid_type, participants)
+        expected_ranks = None
+        if history is not None:
+            competitors = participants - 1 if participants else None
+            win_probabilities, expected_ranks = simulate_curve(history, my_rates, competitors, trials, seed)
+        elif participants and participants > 1:
+            win_probabilities = np.clip(np.minimum(95, percentiles * (1.5 / participants) * 2), 5, 95)
+        else:
+            win_probabilities = np.clip(percentiles, 5, 95)
+        
+        z_scores = (my_rates - avg_rate) / std_rate if std_rate > 0 else np.zeros(len(my_rates))
+        
+        estimated_ranks = np.maximum(
+            1, (((100 - percentiles) / 100) * (participants or 10)).astype(np.int64) + 1
+        )
+        
+        risk_buckets = np.select(
+            [my_rates < q1 - 2, my_rates < q1, my_rates < median, my_rates < q3],
+            [0, 1, 2, 3],
+            default=4
+        )
+        
+        points = []
+        for i, rate in enumerate(rates):
+            risk_level, risk_color, _ = RISK_LEVELS[int(risk_buckets[i])]
+            point = {
+                "rate": rate,
+                "amount": int(estimated_price * rate / 100) if estimated_price else None,
+                "win_probability": round(float(win_probabilities[i]), 1),
+                "percentile": float(percentiles[i]),
+                "estimated_rank": int(estimated_ranks[i]),
+                "z_score": round(float(z_scores[i]), 2),
+                "risk": {
+                    "level": risk_level,
+                    "color": risk_color
+                }
+            }
+            if expected_ranks is not None:
+                point["expected_rank"] = round(float(expected_ranks[i]), 2)
+            points.append(point)
+        
+        simulation = None
+        if history is not None:
+            simulation = {
+                "trials": trials,
+                "seed": seed,
+                "history_bids": history.bid_count,
+                "history_participants": history.participant_count,
+            }
+        
+        return {
+            "success": True,
+            "win_probability_method": "simulation" if history is not None else "heuristic",
+            "total_participants": participants or "미지정",
+            "sample_count": total,
+            "distribution": {
+                "mean": avg_rate,
+                "std": std_rate,
+                "median": median,
+                "q1": q1,
+                "q3": q3
+            },
+            "points": points,
+            "simulation": simulation
         }
     
+    def _load_distribution(self, cursor, estimated_price, institution, bid_type, participants,
+                           fetch_rates=False):
+        """
+        조건에 맞는 낙찰률 분포 통계
+        - 발주기관 조건이 없으면 메모리 낙찰률 인덱스(api/_rate_index.py) 사용
+        - 발주기관 조건이 있거나 인덱스를 쓸 수 없으면 SQL 집계
+        - fetch_rates=True 이면 SQL 경로에서도 낙찰률을 한 번에 가져와 메모리에서 계산
+          (여러 투찰률을 평가하는 곡선 모드용)
+        
+        반환: total, mean, std, q1, median, q3, higher_count(rate 또는 rate 배열) 함수
+        """
+        
+        min_amount = max_amount = None
+        if estimated_price:
+            min_amount = int(estimated_price * 0.5)
+            max_amount = int(estimated_price * 1.5)
+        
+        min_participants = max_participants = None
+        if participants:
+            min_participants = max(1, participants - 10)
+            max_participants = participants + 10
+        
+        rate_index = None if institution else get_rate_index(cursor.connection)
+        if rate_index is not None:
+            selected = rate_index.select(
+                bid_type, min_amount, max_amount, min_participants, max_participants
+            )
+            return self._summarize(selected)
+        
+        # 조건 구성
+        filter_conditions, params = self._filter_conditions(
+            estimated_price, institution, bid_type, participants
+        )
+        conditions = ["sucsf_bid_rate IS NOT NULL", "sucsf_bid_amt > 0"] + filter_conditions
+        
+        where_clause = " AND ".join(conditions)
+        
+        if fetch_rates:
+            cursor.execute(f"""
+                SELECT sucsf_bid_rate::float8
+                FROM bid_results
+                WHERE {where_clause}
+                ORDER BY sucsf_bid_rate
+            """, params)
+            rates = np.fromiter((row[0] for row in cursor.fetchall()), dtype=np.float64)
+            return self._summarize(
+                RateDistribution([rates], len(rates), float(rates.sum()), float((rates * rates).sum()))
+            )
+        
+        # 통계 쿼리
+        stats_query = f"""
+            SELECT 
+                COUNT(*) as total,
+                ROUND(AVG(sucsf_bid_rate)::numeric, 3) as avg_rate,
+                ROUND(STDDEV(sucsf_bid_rate)::numeric, 3) as std_rate,
+                ROUND(PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q1,
+                ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as median,
+                ROUND(PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY sucsf_bid_rate)::numeric, 3) as q3
+            FROM bid_results
+            WHERE {where_clause}
+        """
+        
+        cursor.execute(stats_query, params)
+        stats = cursor.fetchone()
+        
+        def higher_count(rate):
+            percentile_query = f"""
+                SELECT 
+                    COUNT(*) FILTER (WHERE sucsf_bid_rate > %s) as higher_count
+                FROM bid_results
+                WHERE {where_clause}
+            """
+            cursor.execute(percentile_query, [rate] + params)
+            return cursor.fetchone()[0] or 0
+        
+        return {
+            "total": stats[0] or 0,
+            "mean": float(stats[1]) if stats[1] else None,
+            "std": float(stats[2]) if stats[2] else None,
+            "q1": float(stats[3]) if stats[3] else None,
+            "median": float(stats[4]) if stats[4] else None,
+            "q3": float(stats[5]) if stats[5] else None,
+            "higher_count": higher_count
+        }
+    
+    def _filter_conditions(self, estimated_price, institution, bid_type, participants):
+        """
+        유사 공고 조건 (bid_results 컬럼)
+        - 예정가격 ±50%, 참가업체수 ±10
+        """
+        conditions = []
+        params = []
+        
+        if estimated_price:
+            conditions.append("sucsf_bid_amt BETWEEN %s AND %s")
+            params.extend([int(estimated_price * 0.5), int(estimated_price * 1.5)])
+        
+        if institution:
+            condition, condition_params = substring_condition("dminstt_nm", institution)
+            conditions.append(condition)
+            params.extend(condition_params)
+        
+        if bid_type:
+            conditions.append("bid_type = %s")
+            params.append(bid_type)
+        
+        if participants:
+            conditions.append("prtcpt_cnum BETWEEN %s AND %s")
+            params.extend([max(1, participants - 10), participants + 10])
+        
+        return conditions, params
+    
+    def _summarize(self, selected):
+        """RateDistribution → _load_distribution 반환 형식"""
+        return {
+            "total": selected.total,
+            "mean": self._round3(selected.mean()),
+            "std": self._round3(selected.std()),
+            "q1": self._round3(selected.quantile(0.25)),
+            "median": self._round3(selected.quantile(0.5)),
+            "q3": self._round3(selected.quantile(0.75)),
+            "higher_count": lambda rate: (
+                int(selected.count_above(rate)) if np.ndim(rate) == 0 else selected.count_above(rate)
+            )
+        }
+    
+    def _round3(self, value):
+        return round(value, 3) if value is not None else None
+    
     def _send_response(self, status_code, data):
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+        send_json(self, status_code, data)
     
     def _send_error(self, status_code, message):
         self._send_response(status_code, {"success": False, "error": message})
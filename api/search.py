@@ -1,10 +1,36 @@
 from http.server import BaseHTTPRequestHandler
+import base64
+import csv
+import io
 import json
-import os
-import psycopg2
+import sys
 from urllib.parse import parse_qs, urlparse
 
+import psycopg2
+
+from api import _timing
+from api._db import get_connection
+from api._response import send_json, track_request
+from api._text_search import similarity_expr, substring_condition
+
+
+# count=approximate 에서 추정 건수가 이 이상이면 정확한 COUNT 대신 추정치를 사용
+APPROXIMATE_COUNT_THRESHOLD = 100000
+# 근사 통계 계산 시 TABLESAMPLE SYSTEM 비율 (%)
+APPROXIMATE_SAMPLE_PERCENT = 1
+# 내보내기(format=ndjson|csv) 시 서버 측 커서에서 한 번에 가져오는 행 수
+EXPORT_BATCH_SIZE = 2000
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+EXPORT_COLUMNS = [
+    "bid_no", "bid_name", "institution", "winner", "winner_bizno",
+    "amount", "rate", "participants", "date", "bid_type"
+]
+
 class handler(BaseHTTPRequestHandler):
+    @track_request("search")
     def do_GET(self):
         """
         입찰 정보 검색 API
@@ -21,6 +47,11 @@ class handler(BaseHTTPRequestHandler):
         - end_date: 종료일 (선택, YYYY-MM-DD)
         - limit: 조회 개수 (기본 50)
         - offset: 페이지 오프셋 (기본 0)
+        - sort: 'relevance' 이면 검색어 유사도 순 정렬 (선택, offset 페이지네이션 전용)
+        - paging: 'cursor' 이면 커서 페이지네이션 첫 페이지 (선택)
+        - cursor: 이전 응답의 next_cursor (선택, 지정 시 건수/통계 생략)
+        - count: 'approximate' 이면 넓은 조건에서 추정 건수/표본 통계 사용 (선택)
+        - format: 'ndjson' 또는 'csv' 이면 조건에 맞는 전체 결과를 스트리밍 내보내기 (선택)
         """
         try:
             query = parse_qs(urlparse(self.path).query)
@@ -36,42 +67,56 @@ class handler(BaseHTTPRequestHandler):
             end_date = query.get('end_date', [None])[0]
             limit = int(query.get('limit', [50])[0])
             offset = int(query.get('offset', [0])[0])
+            sort = query.get('sort', ['date'])[0]
+            paging = query.get('paging', ['offset'])[0]
+            page_cursor = query.get('cursor', [None])[0]
+            count_mode = query.get('count', ['exact'])[0]
+            export_format = query.get('format', [None])[0]
             
-            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-            cursor = conn.cursor()
+            if export_format:
+                if export_format not in EXPORT_FORMATS:
+                    self._send_error(400, "format은 ndjson 또는 csv 입니다")
+                    return
+                conditions, params = self._build_conditions(
+                    keyword, institution, company,
+                    min_amount, max_amount, min_rate, max_rate,
+                    start_date, end_date
+                )
+                with get_connection("search-export") as conn:
+                    self._export_bids(conn, conditions, params, export_format)
+                return
             
-            result = self._search_bids(
-                cursor, keyword, institution, company,
-                min_amount, max_amount, min_rate, max_rate,
-                start_date, end_date, limit, offset
-            )
+            with get_connection("search") as conn:
+                cursor = conn.cursor()
             
-            conn.close()
+                result = self._search_bids(
+                    cursor, keyword, institution, company,
+                    min_amount, max_amount, min_rate, max_rate,
+                    start_date, end_date, limit, offset,
+                    paging=paging, page_cursor=page_cursor, sort=sort,
+                    count_mode=count_mode
+                )
             
             self._send_response(200, result)
             
+        except ValueError as e:
+            self._send_error(400, str(e))
         except Exception as e:
             self._send_error(500, str(e))
     
-    def _search_bids(self, cursor, keyword, institution, company,
-                     min_amount, max_amount, min_rate, max_rate,
-                     start_date, end_date, limit, offset):
-        """입찰 정보 검색"""
+    def _build_conditions(self, keyword, institution, company,
+                          min_amount, max_amount, min_rate, max_rate,
+                          start_date, end_date):
+        """검색 조건 WHERE 절 구성"""
         
         conditions = ["1=1"]
         params = []
         
-        if keyword:
-            conditions.append("bid_ntce_nm LIKE %s")
-            params.append(f"%{keyword}%")
-        
-        if institution:
-            conditions.append("dminstt_nm LIKE %s")
-            params.append(f"%{institution}%")
-        
-        if company:
-            conditions.append("bidwinnr_nm LIKE %s")
-            params.append(f"%{company}%")
+        for column, term in (("bid_ntce_nm", keyword), ("dminstt_nm", institution), ("bidwinnr_nm", company)):
+            if term:
+                condition, condition_params = substring_condition(column, term)
+                conditions.append(condition)
+                params.extend(condition_params)
         
         if min_amount:
             conditions.append("sucsf_bid_amt >= %s")
@@ -97,16 +142,218 @@ class handler(BaseHTTPRequestHandler):
             conditions.append("rgst_dt::date <= %s")
             params.append(end_date)
         
+        return conditions, params
+    
+    def _encode_cursor(self, rgst_dt, bid_ntce_no):
+        """(rgst_dt, bid_ntce_no) → 불투명 커서 문자열"""
+        raw = json.dumps([rgst_dt.isoformat(), bid_ntce_no], ensure_ascii=False)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    def _decode_cursor(self, token):
+        """커서 문자열 → (rgst_dt, bid_ntce_no)"""
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            rgst_dt, bid_ntce_no = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            return rgst_dt, bid_ntce_no
+        except Exception:
+            raise ValueError("잘못된 cursor 입니다")
+    
+    def _search_bids(self, cursor, keyword, institution, company,
+                     min_amount, max_amount, min_rate, max_rate,
+                     start_date, end_date, limit, offset,
+                     paging="offset", page_cursor=None, sort="date", count_mode="exact"):
+        """입찰 정보 검색"""
+        
+        conditions, params = self._build_conditions(
+            keyword, institution, company,
+            min_amount, max_amount, min_rate, max_rate,
+            start_date, end_date
+        )
+        
+        if page_cursor or paging == "cursor":
+            return self._search_bids_keyset(cursor, conditions, params, limit, page_cursor)
+        
         where_clause = " AND ".join(conditions)
         
-        # 전체 건수 조회
-        count_query = f"""
-            SELECT COUNT(*) FROM bid_results WHERE {where_clause}
+        # 정렬: 기본 등록일 역순, relevance 는 pg_trgm 유사도 합계 순
+        score_terms = [
+            (column, term)
+            for column, term in (("bid_ntce_nm", keyword), ("dminstt_nm", institution), ("bidwinnr_nm", company))
+            if term
+        ]
+        if sort == "relevance" and score_terms:
+            score_select = " + ".join(similarity_expr(column) for column, _ in score_terms)
+            score_params = [term for _, term in score_terms]
+            order_by = [("score", "DESC"), ("rgst_dt", "DESC")]
+        else:
+            score_select = "NULL::real"
+            score_params = []
+            order_by = [("rgst_dt", "DESC")]
+        
+        # 넓은 조건은 플래너 추정치로 건수를 대신하고 통계는 표본으로 계산
+        count_estimated = False
+        if count_mode == "approximate":
+            estimate = self._estimate_count(cursor, where_clause, params)
+            if estimate >= APPROXIMATE_COUNT_THRESHOLD:
+                count_estimated = True
+                total_count = estimate
+                rows = self._fetch_page(
+                    cursor, where_clause, params, score_select, score_params, order_by, limit, offset
+                )
+                search_stats = self._sampled_stats(cursor, where_clause, params, estimate)
+        
+        if not count_estimated:
+            total_count, search_stats, rows = self._search_single_pass(
+                cursor, where_clause, params, score_select, score_params, order_by, limit, offset
+            )
+        
+        results = self._format_rows(rows)
+        if score_params:
+            for result, row in zip(results, rows):
+                result["score"] = round(float(row[11]), 4) if row[11] is not None else 0
+        
+        response = {
+            "success": True,
+            "total_count": total_count,
+            "limit": limit,
+            "offset": offset,
+            "sort": "relevance" if score_params else "date",
+            "has_more": (offset + limit) < total_count,
+            "statistics": search_stats,
+            "results": results
+        }
+        if count_estimated:
+            response["count_estimated"] = True
+        return response
+    
+    def _search_bids_keyset(self, cursor, conditions, params, limit, page_cursor):
+        """
+        커서 페이지네이션 (rgst_dt DESC, bid_ntce_no DESC)
+        - 첫 페이지: 건수/통계 포함 (단일 쿼리)
+        - 다음 페이지(cursor 지정): 데이터 조회만 수행
+        """
+        
+        conditions = conditions + ["rgst_dt IS NOT NULL"]
+        order_by = [("rgst_dt", "DESC"), ("bid_ntce_no", "DESC")]
+        
+        # 다음 페이지 존재 여부 확인을 위해 limit + 1 건 조회
+        total_count = None
+        search_stats = None
+        if page_cursor:
+            cursor_rgst_dt, cursor_bid_no = self._decode_cursor(page_cursor)
+            page_conditions = conditions + ["(rgst_dt, bid_ntce_no) < (%s, %s)"]
+            page_params = params + [cursor_rgst_dt, cursor_bid_no]
+            rows = self._fetch_page(
+                cursor, " AND ".join(page_conditions), page_params, "NULL::real", [], order_by, limit + 1, 0
+            )
+        else:
+            total_count, search_stats, rows = self._search_single_pass(
+                cursor, " AND ".join(conditions), params, "NULL::real", [], order_by, limit + 1, 0
+            )
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = self._encode_cursor(rows[-1][10], rows[-1][0]) if has_more and rows else None
+        
+        return {
+            "success": True,
+            "paging": "cursor",
+            "total_count": total_count,
+            "limit": limit,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+            "statistics": search_stats,
+            "results": self._format_rows(rows)
+        }
+    
+    def _order_sql(self, order_by, alias=None):
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(f"{prefix}{column} {direction}" for column, direction in order_by)
+    
+    def _search_single_pass(self, cursor, where_clause, params, score_select, score_params,
+                            order_by, limit, offset):
+        """
+        건수 + 통계 + 페이지를 한 번의 스캔으로 조회
+        - matched CTE 를 두 번 참조하므로 한 번만 계산(materialize)된다
+        - 결과가 없으면 통계 행 1개(페이지 컬럼 NULL)만 반환
+        """
+        
+        query = f"""
+            WITH matched AS (
+                SELECT 
+                    bid_ntce_no,
+                    bid_ntce_nm,
+                    dminstt_nm,
+                    bidwinnr_nm,
+                    bidwinnr_bizno,
+                    sucsf_bid_amt,
+                    sucsf_bid_rate,
+                    prtcpt_cnum,
+                    rgst_dt,
+                    bid_type,
+                    {score_select} as score
+                FROM bid_results
+                WHERE {where_clause}
+            ),
+            stats AS (
+                SELECT 
+                    COUNT(*) as total_count,
+                    ROUND(AVG(sucsf_bid_rate)::numeric, 2) as avg_rate,
+                    ROUND(AVG(sucsf_bid_amt)::numeric, 0) as avg_amount,
+                    SUM(sucsf_bid_amt) as total_amount,
+                    ROUND(AVG(prtcpt_cnum)::numeric, 1) as avg_participants
+                FROM matched
+            ),
+            page AS (
+                SELECT * FROM matched
+                ORDER BY {self._order_sql(order_by)}
+                LIMIT %s OFFSET %s
+            )
+            SELECT 
+                stats.total_count,
+                stats.avg_rate,
+                stats.avg_amount,
+                stats.total_amount,
+                stats.avg_participants,
+                page.bid_ntce_no,
+                page.bid_ntce_nm,
+                page.dminstt_nm,
+                page.bidwinnr_nm,
+                page.bidwinnr_bizno,
+                page.sucsf_bid_amt,
+                page.sucsf_bid_rate,
+                page.prtcpt_cnum,
+                page.rgst_dt::date,
+                page.bid_type,
+                page.rgst_dt,
+                page.score
+            FROM stats
+            LEFT JOIN page ON TRUE
+            ORDER BY {self._order_sql(order_by, "page")}
         """
-        cursor.execute(count_query, params)
-        total_count = cursor.fetchone()[0]
         
-        # 데이터 조회
+        cursor.execute(query, score_params + params + [limit, offset])
+        combined = cursor.fetchall()
+        
+        first = combined[0]
+        total_count = first[0] or 0
+        
+        search_stats = None
+        if total_count > 0:
+            search_stats = {
+                "avg_rate": float(first[1]) if first[1] else 0,
+                "avg_amount": int(first[2]) if first[2] else 0,
+                "total_amount": int(first[3]) if first[3] else 0,
+                "avg_participants": float(first[4]) if first[4] else 0
+            }
+        
+        rows = [row[5:] for row in combined if row[5] is not None]
+        return total_count, search_stats, rows
+    
+    def _fetch_page(self, cursor, where_clause, params, score_select, score_params,
+                    order_by, limit, offset):
+        """페이지 데이터만 조회 (건수/통계 없음)"""
+        
         data_query = f"""
             SELECT 
                 bid_ntce_no,
@@ -118,16 +365,52 @@ class handler(BaseHTTPRequestHandler):
                 sucsf_bid_rate,
                 prtcpt_cnum,
                 rgst_dt::date,
-                bid_type
+                bid_type,
+                rgst_dt,
+                {score_select} as score
             FROM bid_results
             WHERE {where_clause}
-            ORDER BY rgst_dt DESC
+            ORDER BY {self._order_sql(order_by)}
             LIMIT %s OFFSET %s
         """
         
-        cursor.execute(data_query, params + [limit, offset])
-        rows = cursor.fetchall()
+        cursor.execute(data_query, score_params + params + [limit, offset])
+        return cursor.fetchall()
+    
+    def _estimate_count(self, cursor, where_clause, params):
+        """플래너 추정 건수 (EXPLAIN, 실제 스캔 없음)"""
+        
+        cursor.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM bid_results WHERE {where_clause}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    
+    def _sampled_stats(self, cursor, where_clause, params, estimate):
+        """TABLESAMPLE 표본으로 검색 통계 근사"""
+        
+        stats_query = f"""
+            SELECT 
+                ROUND(AVG(sucsf_bid_rate)::numeric, 2) as avg_rate,
+                ROUND(AVG(sucsf_bid_amt)::numeric, 0) as avg_amount,
+                ROUND(AVG(prtcpt_cnum)::numeric, 1) as avg_participants
+            FROM bid_results TABLESAMPLE SYSTEM (%s)
+            WHERE {where_clause}
+        """
+        cursor.execute(stats_query, [APPROXIMATE_SAMPLE_PERCENT] + params)
+        stats = cursor.fetchone()
         
+        avg_amount = int(stats[1]) if stats[1] else 0
+        return {
+            "avg_rate": float(stats[0]) if stats[0] else 0,
+            "avg_amount": avg_amount,
+            "total_amount": avg_amount * estimate,
+            "avg_participants": float(stats[2]) if stats[2] else 0,
+            "sampled": True
+        }
+    
+    def _format_rows(self, rows):
+        """조회 행 → 응답 형식"""
         results = []
         for row in rows:
             results.append({
@@ -142,46 +425,109 @@ class handler(BaseHTTPRequestHandler):
                 "date": str(row[8]) if row[8] else None,
                 "bid_type": row[9]
             })
+        return results
+    
+    def _export_bids(self, conn, conditions, params, export_format):
+        """
+        검색 결과 전체 스트리밍 내보내기
+        - 서버 측 named cursor + fetchmany 배치로 메모리 사용량 일정
+        - 배치마다 chunked transfer encoding 청크 1개 전송
+        - 도중에 실패하면 종료 청크 없이 연결을 닫음 (NDJSON 은 오류 줄을 먼저 기록)
+        """
         
-        # 검색 통계
-        if total_count > 0:
-            stats_query = f"""
-                SELECT 
-                    ROUND(AVG(sucsf_bid_rate)::numeric, 2) as avg_rate,
-                    ROUND(AVG(sucsf_bid_amt)::numeric, 0) as avg_amount,
-                    SUM(sucsf_bid_amt) as total_amount,
-                    ROUND(AVG(prtcpt_cnum)::numeric, 1) as avg_participants
-                FROM bid_results
-                WHERE {where_clause}
-            """
-            cursor.execute(stats_query, params)
-            stats = cursor.fetchone()
+        where_clause = " AND ".join(conditions)
+        
+        export_cursor = conn.cursor(name="search_export")
+        export_cursor.itersize = EXPORT_BATCH_SIZE
+        export_cursor.execute(f"""
+            SELECT 
+                bid_ntce_no,
+                bid_ntce_nm,
+                dminstt_nm,
+                bidwinnr_nm,
+                bidwinnr_bizno,
+                sucsf_bid_amt,
+                sucsf_bid_rate,
+                prtcpt_cnum,
+                rgst_dt::date,
+                bid_type
+            FROM bid_results
+            WHERE {where_clause}
+            ORDER BY rgst_dt DESC, bid_ntce_no DESC
+        """, params)
+        
+        # 첫 배치를 가져온 뒤 헤더 전송 (쿼리 오류는 일반 에러 응답으로 처리)
+        batch = export_cursor.fetchmany(EXPORT_BATCH_SIZE)
+        
+        self.protocol_version = "HTTP/1.1"
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", EXPORT_FORMATS[export_format])
+            self.send_header("Content-Disposition", f'attachment; filename="bid_search.{export_format}"')
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            # 첫 배치까지의 쿼리 시간 (이후 배치는 스트리밍 중이라 헤더에 실을 수 없음)
+            self.send_header("Server-Timing", _timing.server_timing(_timing.take()))
+            self.send_header("Timing-Allow-Origin", "*")
+            self.end_headers()
+        except OSError:
+            # 클라이언트 연결 끊김 (응답을 더 쓸 수 없음)
+            self.close_connection = True
+            export_cursor.close()
+            return
+        
+        # 헤더 전송 후에는 상태 코드를 바꿀 수 없고 _send_error 로 넘겨서도 안 된다
+        # 실패하면 종료 청크 없이 연결을 끊어 클라이언트가 불완전한 전송으로 인식하게 한다
+        error = None
+        try:
+            if export_format == "csv":
+                # Excel 에서 한글이 깨지지 않도록 BOM 포함
+                self._write_chunk(("\ufeff" + self._csv_lines([EXPORT_COLUMNS])).encode())
             
-            search_stats = {
-                "avg_rate": float(stats[0]) if stats[0] else 0,
-                "avg_amount": int(stats[1]) if stats[1] else 0,
-                "total_amount": int(stats[2]) if stats[2] else 0,
-                "avg_participants": float(stats[3]) if stats[3] else 0
-            }
-        else:
-            search_stats = None
+            while batch:
+                results = self._format_rows(batch)
+                if export_format == "csv":
+                    data = self._csv_lines([[result[column] for column in EXPORT_COLUMNS] for result in results])
+                else:
+                    data = "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+                self._write_chunk(data.encode())
+                batch = export_cursor.fetchmany(EXPORT_BATCH_SIZE)
+        except Exception as e:
+            error = e
+        finally:
+            try:
+                export_cursor.close()
+            except psycopg2.Error:
+                pass
         
-        return {
-            "success": True,
-            "total_count": total_count,
-            "limit": limit,
-            "offset": offset,
-            "has_more": (offset + limit) < total_count,
-            "statistics": search_stats,
-            "results": results
-        }
+        try:
+            if error is None:
+                self._write_chunk(b"")
+                return
+            
+            self.close_connection = True
+            print(f"[search-export] 내보내기 중단: {error}", file=sys.stderr)
+            if export_format == "ndjson" and not isinstance(error, OSError):
+                # NDJSON 은 마지막 줄에 오류 기록 (CSV 는 잘린 전송으로만 알림)
+                error_line = json.dumps({"success": False, "error": str(error)}, ensure_ascii=False) + "\n"
+                self._write_chunk(error_line.encode())
+        except OSError:
+            # 클라이언트 연결 끊김
+            self.close_connection = True
+    
+    def _csv_lines(self, rows):
+        """행 목록 → CSV 문자열"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    
+    def _write_chunk(self, data):
+        """chunked transfer encoding 청크 1개 전송 (빈 데이터는 종료 청크)"""
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
     
     def _send_response(self, status_code, data):
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+        send_json(self, status_code, data)
     
     def _send_error(self, status_code, message):
         self._send_response(status_code, {"success": False, "error": message})
@@ -1,67 +1,133 @@
 from http.server import BaseHTTPRequestHandler
-import json
-import os
-import psycopg2
+from urllib.parse import parse_qs, urlparse
+
+from psycopg2 import sql
+
+from api._db import get_connection
+from api._response import send_json, track_request
+
+
+# 조회 대상 스키마 (public 테이블은 이름 그대로, 나머지는 "스키마.테이블")
+SCHEMAS = ("public", "pps_bid")
+
 
 class handler(BaseHTTPRequestHandler):
+    @track_request("tables")
     def do_GET(self):
-        """DB 테이블 구조 확인 API"""
+        """
+        DB 테이블 구조 / 용량 확인 API
+
+        카탈로그 쿼리 한 번으로 컬럼, 인덱스, 추정 행 수(reltuples), 테이블/인덱스 크기,
+        마지막 ANALYZE/VACUUM 시각을 조회한다.
+        정확한 행 수는 ?count=bid_results,pps_bid.rate_cube 처럼 지정한 테이블만 COUNT(*)
+        """
         try:
-            conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-            cursor = conn.cursor()
-            
-            # 테이블 목록 조회
-            cursor.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public'
-                ORDER BY table_name
-            """)
-            tables = [row[0] for row in cursor.fetchall()]
-            
-            # 각 테이블의 컬럼 정보
-            table_info = {}
-            for table in tables:
-                cursor.execute("""
-                    SELECT column_name, data_type, is_nullable
-                    FROM information_schema.columns
-                    WHERE table_name = %s
-                    ORDER BY ordinal_position
-                """, [table])
-                columns = []
-                for row in cursor.fetchall():
-                    columns.append({
-                        "name": row[0],
-                        "type": row[1],
-                        "nullable": row[2]
-                    })
-                
-                # 레코드 수
-                cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                count = cursor.fetchone()[0]
-                
-                table_info[table] = {
-                    "columns": columns,
-                    "record_count": count
-                }
-            
-            conn.close()
-            
+            query = parse_qs(urlparse(self.path).query)
+            count_targets = {
+                name.strip()
+                for value in query.get("count", [])
+                for name in value.split(",")
+                if name.strip()
+            }
+
+            with get_connection("tables") as conn:
+                cursor = conn.cursor()
+
+                table_info = self._load_catalog(cursor)
+
+                unknown = sorted(count_targets - set(table_info))
+                if unknown:
+                    self._send_error(400, f"알 수 없는 테이블: {', '.join(unknown)}")
+                    return
+
+                for name in sorted(count_targets):
+                    info = table_info[name]
+                    cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(
+                        sql.Identifier(info["schema"], info["table"])
+                    ))
+                    info["record_count"] = cursor.fetchone()[0]
+                    info["record_count_exact"] = True
+
             self._send_response(200, {
                 "success": True,
-                "tables": tables,
+                "tables": list(table_info),
                 "table_info": table_info
             })
-            
+
         except Exception as e:
             self._send_error(500, str(e))
-    
+
+    def _load_catalog(self, cursor):
+        """스키마 내 모든 테이블 정보 (카탈로그 한 번 조회)"""
+        cursor.execute("""
+            SELECT
+                n.nspname,
+                c.relname,
+                c.relkind,
+                c.reltuples::bigint,
+                pg_table_size(c.oid),
+                pg_indexes_size(c.oid),
+                pg_total_relation_size(c.oid),
+                s.n_live_tup,
+                s.n_dead_tup,
+                GREATEST(s.last_analyze, s.last_autoanalyze),
+                GREATEST(s.last_vacuum, s.last_autovacuum),
+                (
+                    SELECT json_agg(json_build_object(
+                        'name', a.attname,
+                        'type', format_type(a.atttypid, a.atttypmod),
+                        'nullable', CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END
+                    ) ORDER BY a.attnum)
+                    FROM pg_attribute a
+                    WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+                ) as columns,
+                (
+                    SELECT json_agg(json_build_object(
+                        'name', i.relname,
+                        'definition', pg_get_indexdef(x.indexrelid),
+                        'unique', x.indisunique,
+                        'primary', x.indisprimary,
+                        'valid', x.indisvalid,
+                        'size_bytes', pg_relation_size(x.indexrelid)
+                    ) ORDER BY i.relname)
+                    FROM pg_index x
+                    JOIN pg_class i ON i.oid = x.indexrelid
+                    WHERE x.indrelid = c.oid
+                ) as indexes
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+            WHERE n.nspname = ANY(%s)
+                AND c.relkind IN ('r', 'p', 'm')
+                AND NOT c.relispartition
+            ORDER BY array_position(%s, n.nspname::text), c.relname
+        """, [list(SCHEMAS), list(SCHEMAS)])
+
+        table_info = {}
+        for row in cursor.fetchall():
+            schema, table = row[0], row[1]
+            name = table if schema == "public" else f"{schema}.{table}"
+            table_info[name] = {
+                "schema": schema,
+                "table": table,
+                "kind": {"r": "table", "p": "partitioned", "m": "materialized_view"}[row[2]],
+                # ANALYZE 전이면 reltuples = -1
+                "record_count": row[3] if row[3] >= 0 else None,
+                "record_count_exact": False,
+                "table_bytes": row[4],
+                "index_bytes": row[5],
+                "total_bytes": row[6],
+                "live_tuples": row[7],
+                "dead_tuples": row[8],
+                "last_analyzed": row[9].isoformat() if row[9] else None,
+                "last_vacuumed": row[10].isoformat() if row[10] else None,
+                "columns": row[11] or [],
+                "indexes": row[12] or []
+            }
+        return table_info
+
     def _send_response(self, status_code, data):
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
-    
+        send_json(self, status_code, data)
+
     def _send_error(self, status_code, message):
         self._send_response(status_code, {"success": False, "error": message})
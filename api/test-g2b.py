@@ -4,8 +4,11 @@ import os
 import urllib.request
 import urllib.parse
 
+from api._response import send_json, track_request
+
 
 class handler(BaseHTTPRequestHandler):
+    @track_request("test-g2b")
     def do_GET(self):
         """낙찰정보서비스 API 테스트"""
         try:
@@ -114,8 +117,4 @@ class handler(BaseHTTPRequestHandler):
             })
 
     def _send_response(self, status_code, data):
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+        send_json(self, status_code, data)
@@ -0,0 +1,59 @@
+"""벤치마크 공용 도우미 (핸들러 로드, 분위수, 결과 기록)"""
+from datetime import datetime, timezone
+import importlib.util
+import json
+import os
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+
+
+def load_handler(filename):
+    """api/<filename> 핸들러 인스턴스 (요청 없이 메서드만 사용)"""
+    name = os.path.splitext(filename)[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", os.path.join(ROOT, "api", filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler.__new__(module.handler)
+
+
+def percentiles(values, quantiles=(0.50, 0.90, 0.99)):
+    """초 단위 값 목록 → 최근접 순위 분위수 (ms)"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(q):
+        return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))] * 1000
+
+    summary = {"count": len(ordered)}
+    for q in quantiles:
+        summary[f"p{round(q * 100):d}_ms"] = round(rank(q), 1)
+    summary["mean_ms"] = round(sum(ordered) / len(ordered) * 1000, 1)
+    summary["max_ms"] = round(ordered[-1] * 1000, 1)
+    return summary
+
+
+def git_revision():
+    """현재 커밋 (git 이 없으면 None)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_result(name, report, path=None):
+    """bench/results/<name>-<UTC 시각>.json 에 저장하고 경로 반환"""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return path
@@ -0,0 +1,336 @@
+"""
+분석 API 벤치마크
+
+search / predict / probability / dashboard / institution / competitors 핸들러의 조회 메서드를
+대표 파라미터 조합으로 반복 호출해 지연 분위수(p50/p95/p99)와 조회 행 수를 측정한다.
+결과는 bench/results/analytics-<UTC 시각>.json 에 저장해 실행 간 비교한다.
+
+    DATABASE_URL=postgresql://localhost/pps_bench python bench/analytics_benchmark.py
+    python bench/analytics_benchmark.py --only search,predict --iterations 50
+    python bench/analytics_benchmark.py --compare bench/results/analytics-20250101T000000Z.json
+
+- 호출마다 풀(api/_db.py)에서 엔드포인트 커넥션을 빌리므로 statement_timeout 도 운영과 같다
+- 시나리오마다 --warmup 회는 측정하지 않는다 (프로세스 캐시, 공유 버퍼 적재)
+- 조회 행 수: 변형마다 한 번 실행한 SQL 을 EXPLAIN (ANALYZE, BUFFERS) 로 다시 돌려
+  테이블 스캔 노드가 읽은 행(반환 + 필터 제거)과 공유 버퍼 블록을 합산 (--no-explain 으로 생략)
+
+데이터는 bench/synthetic_data.py 로 채운 로컬 DB 를 기준으로 한다.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import sys
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import git_revision, load_handler, percentiles, write_result  # noqa: E402
+from api._db import get_connection  # noqa: E402
+from api._institutions import PROFILE_CACHE  # noqa: E402
+
+
+QUANTILES = (0.50, 0.95, 0.99)
+KEYWORDS = ["공사", "구매", "유지보수", "도로포장", "CCTV"]
+BID_TYPES = ["goods", "service", "construction"]
+ESTIMATED_PRICES = [5_000_000, 50_000_000, 500_000_000, 5_000_000_000]
+
+
+class RecordingCursor(psycopg2.extensions.cursor):
+    """실행한 SQL 을 바인딩된 문장으로 기록"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = []
+
+    def execute(self, query, vars=None):
+        self.statements.append(self.mogrify(query, vars))
+        return super().execute(query, vars)
+
+
+def sample_parameters(cursor):
+    """DB 에서 대표 파라미터 추출 (건수 상위/중간/하위 기관·업체, 최근 등록일)"""
+
+    def ranked(column):
+        cursor.execute(f"""
+            SELECT {column}, COUNT(*)
+            FROM bid_results TABLESAMPLE SYSTEM (1)
+            WHERE {column} IS NOT NULL
+            GROUP BY {column}
+            ORDER BY COUNT(*) DESC
+        """)
+        names = [row[0] for row in cursor.fetchall()]
+        if not names:
+            cursor.execute(f"SELECT {column} FROM bid_results WHERE {column} IS NOT NULL LIMIT 1")
+            names = [row[0] for row in cursor.fetchall()]
+        if not names:
+            return []
+        return list(dict.fromkeys([names[0], names[len(names) // 10], names[len(names) // 2]]))
+
+    cursor.execute("SELECT MAX(rgst_dt) FROM bid_results")
+    latest = cursor.fetchone()[0] or datetime.now()
+    cursor.connection.rollback()
+
+    return {
+        "institutions": ranked("dminstt_nm"),
+        "companies": ranked("bidwinnr_nm"),
+        "latest": latest.date().isoformat(),
+        "recent_start": (latest.date() - timedelta(days=90)).isoformat(),
+    }
+
+
+def scenarios(handlers, samples):
+    """(엔드포인트, 이름, 변형 목록, 호출) - 반복마다 변형을 순환"""
+    institutions = samples["institutions"] or [None]
+    companies = samples["companies"] or [None]
+    search, predict, probability = handlers["search"], handlers["predict"], handlers["probability"]
+    dashboard, institution, competitors = handlers["dashboard"], handlers["institution"], handlers["competitors"]
+
+    def search_call(**overrides):
+        def call(cursor, variant):
+            kwargs = dict(
+                keyword=None, institution=None, company=None, min_amount=None, max_amount=None,
+                min_rate=None, max_rate=None, start_date=None, end_date=None, limit=50, offset=0,
+            )
+            kwargs.update(overrides)
+            kwargs.update(variant)
+            return search._search_bids(cursor, **kwargs)
+        return call
+
+    return [
+        ("search", "search.keyword", [{"keyword": k} for k in KEYWORDS], search_call()),
+        ("search", "search.institution", [{"institution": i} for i in institutions], search_call()),
+        ("search", "search.company", [{"company": c} for c in companies], search_call()),
+        ("search", "search.filters", [
+            {"min_amount": "10000000", "max_amount": "1000000000", "min_rate": "85", "max_rate": "90",
+             "start_date": samples["recent_start"], "end_date": samples["latest"]},
+            {"min_amount": "100000000", "start_date": samples["recent_start"]},
+        ], search_call()),
+        ("search", "search.relevance", [{"keyword": k} for k in KEYWORDS[:3]], search_call(sort="relevance")),
+        ("search", "search.cursor", [{}, {"keyword": KEYWORDS[0]}], search_call(paging="cursor")),
+        ("search", "search.approximate", [{}], search_call(count_mode="approximate")),
+        ("search", "search.deep_offset", [{"offset": 5000}], search_call()),
+
+        ("predict", "predict.cube", [
+            {"estimated_price": price, "bid_type": None, "participants": None} for price in ESTIMATED_PRICES
+        ] + [
+            {"estimated_price": price, "bid_type": bid_type, "participants": 10}
+            for price, bid_type in zip(ESTIMATED_PRICES, BID_TYPES + BID_TYPES[:1])
+        ], lambda cursor, v: predict._predict_bid_rate(
+            cursor, v["estimated_price"], None, v["bid_type"], v["participants"])),
+        ("predict", "predict.institution", [
+            {"estimated_price": price, "institution": name}
+            for price in ESTIMATED_PRICES[1:3] for name in institutions
+        ], lambda cursor, v: predict._predict_bid_rate(cursor, v["estimated_price"], v["institution"], None, None)),
+
+        ("probability", "probability.point", [
+            {"my_rate": rate, "estimated_price": price}
+            for rate in (86.5, 87.745, 88.5) for price in (None, ESTIMATED_PRICES[1])
+        ], lambda cursor, v: probability._calculate_probability(
+            cursor, v["my_rate"], v["estimated_price"], None, None, None)),
+        ("probability", "probability.institution", [
+            {"my_rate": 87.745, "institution": name} for name in institutions
+        ], lambda cursor, v: probability._calculate_probability(
+            cursor, v["my_rate"], None, v["institution"], None, None)),
+        ("probability", "probability.curve", [
+            {"bid_type": bid_type} for bid_type in [None] + BID_TYPES
+        ], lambda cursor, v: probability._calculate_curve(
+            cursor, [85 + i * 0.25 for i in range(21)], None, None, v["bid_type"], None)),
+
+        ("dashboard", "dashboard.snapshot", [{}], lambda cursor, v: dashboard._get_dashboard_stats(cursor)),
+        ("dashboard", "dashboard.live", [{}], lambda cursor, v: dashboard._get_live_dashboard_stats(cursor)),
+
+        ("institution", "institution.list", [{"limit": 20}, {"limit": 100}],
+         lambda cursor, v: institution._get_institution_list(cursor, v["limit"])),
+        ("institution", "institution.detail", [{"name": name} for name in institutions],
+         lambda cursor, v: (PROFILE_CACHE.clear(), institution._analyze_institution(cursor, v["name"]))[1]),
+        ("institution", "institution.detail.cached", [{"name": name} for name in institutions],
+         lambda cursor, v: institution._analyze_institution(cursor, v["name"])),
+
+        ("competitors", "competitors.all", [{}], lambda cursor, v: competitors._analyze_competitors(
+            cursor, None, None, 10)),
+        ("competitors", "competitors.institution", [{"institution": name} for name in institutions],
+         lambda cursor, v: competitors._analyze_competitors(cursor, v["institution"], None, 10)),
+        ("competitors", "competitors.bid_type", [{"bid_type": bid_type} for bid_type in BID_TYPES],
+         lambda cursor, v: competitors._analyze_competitors(cursor, None, v["bid_type"], 10)),
+    ]
+
+
+def _scan_totals(node, totals):
+    """계획 노드 트리에서 테이블 스캔 행 수 합산 (Actual Rows 등은 loop 당 평균)"""
+    loops = node.get("Actual Loops") or 1
+    if "Relation Name" in node:
+        scanned = (
+            node.get("Actual Rows", 0)
+            + node.get("Rows Removed by Filter", 0)
+            + node.get("Rows Removed by Index Recheck", 0)
+        )
+        totals["rows_scanned"] += int(scanned * loops)
+    for child in node.get("Plans", []):
+        _scan_totals(child, totals)
+
+
+def explain(endpoint, call, variant):
+    """한 번 실행해 SQL 을 기록한 뒤 각 문장을 EXPLAIN ANALYZE 로 다시 실행해 합산"""
+    totals = {"statements": 0, "rows_scanned": 0, "shared_hit_blocks": 0, "shared_read_blocks": 0,
+              "execution_ms": 0.0}
+    with get_connection(endpoint) as conn:
+        cursor = conn.cursor(cursor_factory=RecordingCursor)
+        call(cursor, variant)
+        statements = cursor.statements
+        conn.rollback()
+
+        plain = conn.cursor()
+        for statement in statements:
+            words = statement.split(None, 1)
+            if not words or words[0].upper() not in (b"SELECT", b"WITH"):
+                continue
+            try:
+                plain.execute(b"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement)
+            except psycopg2.Error:
+                conn.rollback()
+                continue
+            plan = plain.fetchone()[0][0]
+            conn.rollback()
+            totals["statements"] += 1
+            totals["execution_ms"] += plan.get("Execution Time", 0.0)
+            root = plan["Plan"]
+            totals["shared_hit_blocks"] += root.get("Shared Hit Blocks", 0)
+            totals["shared_read_blocks"] += root.get("Shared Read Blocks", 0)
+            _scan_totals(root, totals)
+    totals["execution_ms"] = round(totals["execution_ms"], 1)
+    return totals
+
+
+def run_scenario(endpoint, call, variants, iterations, warmup):
+    """반환: (지연 목록(초), 오류 수, 첫 오류)"""
+    latencies = []
+    errors = 0
+    first_error = None
+    for i in range(warmup + iterations):
+        variant = variants[i % len(variants)]
+        with get_connection(endpoint) as conn:
+            cursor = conn.cursor()
+            started = time.perf_counter()
+            try:
+                call(cursor, variant)
+            except Exception as e:
+                errors += 1
+                first_error = first_error or f"{type(e).__name__}: {str(e)[:200]}"
+                conn.rollback()
+                continue
+            elapsed = time.perf_counter() - started
+            conn.rollback()
+        if i >= warmup:
+            latencies.append(elapsed)
+    return latencies, errors, first_error
+
+
+def database_info():
+    with get_connection("tables") as conn:
+        cursor = conn.cursor()
+        cursor.execute("SHOW server_version")
+        version = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid)
+            FROM pg_class c
+            WHERE c.relkind = 'r' AND c.relname IN ('bid_results', 'bid_participants')
+        """)
+        tables = {name: {"rows_estimate": rows, "total_bytes": size} for name, rows, size in cursor.fetchall()}
+        conn.rollback()
+    return {"server_version": version, "tables": tables}
+
+
+def compare(previous, current):
+    """이전 결과 대비 p50/p95 변화 출력"""
+    print(f"\n{'scenario':<26}{'p50 ms (이전→현재)':>24}{'p95 ms (이전→현재)':>24}{'변화(p95)':>11}")
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before or not before.get("latency") or not result.get("latency"):
+            continue
+        old, new = before["latency"], result["latency"]
+        change = (new["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0
+        print(f"{name:<26}{old['p50_ms']:>11} → {new['p50_ms']:<10}{old['p95_ms']:>11} → {new['p95_ms']:<10}"
+              f"{change:>+10.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분석 API 벤치마크")
+    parser.add_argument("--iterations", type=int, default=20, help="시나리오별 측정 횟수")
+    parser.add_argument("--warmup", type=int, default=2, help="시나리오별 측정 전 실행 횟수")
+    parser.add_argument("--only", help="쉼표로 구분한 엔드포인트 또는 시나리오 이름 (예: search,predict.cube)")
+    parser.add_argument("--no-explain", action="store_true", help="EXPLAIN ANALYZE 조회 행 수 생략")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본 bench/results/analytics-<시각>.json)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--label", help="결과에 남길 설명 (예: 10m rows, after rate cube)")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        sys.exit("DATABASE_URL 환경변수가 필요합니다 (bench/synthetic_data.py 로 채운 로컬 DB)")
+
+    handlers = {
+        name: load_handler(f"{name}.py")
+        for name in ("search", "predict", "probability", "dashboard", "institution", "competitors")
+    }
+    with get_connection("tables") as conn:
+        samples = sample_parameters(conn.cursor())
+
+    selected = set(args.only.split(",")) if args.only else None
+    report = {
+        "run_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "label": args.label,
+        "git": git_revision(),
+        "database": database_info(),
+        "config": {"iterations": args.iterations, "warmup": args.warmup},
+        "samples": samples,
+        "scenarios": {},
+    }
+
+    for endpoint, name, variants, call in scenarios(handlers, samples):
+        if selected and endpoint not in selected and name not in selected:
+            continue
+        latencies, errors, first_error = run_scenario(endpoint, call, variants, args.iterations, args.warmup)
+        result = {
+            "endpoint": endpoint,
+            "variants": len(variants),
+            "latency": percentiles(latencies, QUANTILES),
+            "errors": errors,
+        }
+        if first_error:
+            result["first_error"] = first_error
+
+        if not args.no_explain:
+            # 변형별 EXPLAIN 결과의 평균 (변형은 최대 3개)
+            explained = []
+            for variant in variants[:3]:
+                try:
+                    explained.append(explain(endpoint, call, variant))
+                except Exception as e:
+                    result["explain_error"] = f"{type(e).__name__}: {str(e)[:200]}"
+            if explained:
+                result["explain"] = {
+                    key: round(sum(item[key] for item in explained) / len(explained), 1)
+                    for key in explained[0]
+                }
+
+        report["scenarios"][name] = result
+        latency = result["latency"]
+        scanned = result.get("explain", {}).get("rows_scanned", "-")
+        print(f"{name:<26} p50={latency.get('p50_ms', '-'):>8}  p95={latency.get('p95_ms', '-'):>8}  "
+              f"p99={latency.get('p99_ms', '-'):>8}  rows_scanned={scanned}  errors={errors}", flush=True)
+
+    path = write_result("analytics", report, args.output)
+    print(f"\n결과: {os.path.relpath(path, ROOT)}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+참가업체 수집기 벤치마크 (모의 서버 bench/g2b_mock_server.py 기준)
+
+api/collect-participants.py 의 조회/파싱 경로를 모의 서버에 대고 돌려
+입찰건/초, 행/초, 페이지·입찰건 지연 분위수(p50/p90/p99/평균/max)를 보고한다.
+
+    python bench/collector_benchmark.py --bids 500 --concurrency 8 --latency-ms 80 --jitter-ms 40
+    python bench/collector_benchmark.py --mock-url http://127.0.0.1:8765/1230000/as/ScsbidInfoService
+    DATABASE_URL=... python bench/collector_benchmark.py --db      # 저장까지 (_collect_bids, COPY 병합)
+
+--db 없이는 DB 를 쓰지 않는다: 작업 스레드에서 _fetch_participants → _participant_rows 까지만 수행.
+--db 는 실제 _collect_bids 로 bid_participants 에 저장하므로 개발 DB 에서만 사용한다
+(모의 입찰번호 2025xxxxxxx 행은 --cleanup 으로 삭제).
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _common import load_handler, percentiles  # noqa: E402
+from g2b_mock_server import add_config_arguments, bid_ntce_no, config_from_args, start_server  # noqa: E402
+
+
+def instrument(g2b, collector):
+    """페이지 조회(fetch_page)와 입찰건 조회(_fetch_participants) 소요 시간 기록"""
+    page_times = []
+    bid_times = []
+    fetch_page = g2b.fetch_page
+    fetch_participants = collector._fetch_participants
+
+    def timed_page(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fetch_page(*args, **kwargs)
+        finally:
+            page_times.append(time.perf_counter() - started)
+
+    def timed_bid(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fetch_participants(*args, **kwargs)
+        finally:
+            bid_times.append(time.perf_counter() - started)
+
+    g2b.fetch_page = timed_page
+    collector._fetch_participants = timed_bid
+    return page_times, bid_times
+
+
+def run_fetch_only(collector, api_key, bids, concurrency, mode):
+    """DB 없이 조회 + 행 변환, 반환: (입찰건별 debug_info, 변환 행 수)"""
+    rows = [0]
+    lock = threading.Lock()
+
+    def fetch(bid):
+        def on_page(start, items, debug_info):
+            converted = collector._participant_rows(items, debug_info, bid[0], bid[1], bid[2], start)
+            with lock:
+                rows[0] += len(converted)
+        return collector._fetch_participants(api_key, bid[0], bid[1], on_page, mode)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, bids))
+    return results, rows[0]
+
+
+def run_with_db(collector, api_key, bids, concurrency, mode):
+    """실제 수집 경로 (_collect_bids: 동시 조회 → 단일 저장 스레드 COPY 병합)"""
+    from api._db import get_connection
+
+    with get_connection("collect-participants") as conn:
+        results, total_collected = collector._collect_bids(conn.cursor(), api_key, bids, concurrency, mode)
+    return [result.get("debug") or {"error": result.get("error")} for result in results], total_collected
+
+
+def cleanup(bids):
+    from api._db import get_connection
+
+    with get_connection("collect-participants") as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM bid_participants WHERE bid_ntce_no = ANY(%s)", [[bid[0] for bid in bids]])
+        deleted = cursor.rowcount
+        conn.commit()
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="참가업체 수집기 벤치마크")
+    parser.add_argument("--mock-url", help="실행 중인 모의 서버 주소 (없으면 프로세스 안에서 시작)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 입찰건 조회 수")
+    parser.add_argument("--page-size", type=int, default=100, help="numOfRows (G2B_PAGE_SIZE)")
+    parser.add_argument("--rate", type=float, default=1000.0, help="초당 호출 수 (G2B_RATE_PER_SEC)")
+    parser.add_argument("--burst", type=float, help="순간 최대 호출 수 (G2B_RATE_BURST, 기본 --rate)")
+    parser.add_argument("--mode", choices=("auto", "live", "replay"), default="live",
+                        help="원본 보관소 사용 방식 (G2B_ARCHIVE_DIR 가 있을 때)")
+    parser.add_argument("--db", action="store_true", help="DATABASE_URL 에 저장까지 수행")
+    parser.add_argument("--cleanup", action="store_true", help="--db 실행 후 모의 입찰건 행 삭제")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 한 줄로 출력")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = mock = None
+    base_url = args.mock_url
+    if not base_url:
+        server, mock, base_url = start_server(config_from_args(args))
+
+    # api._g2b 는 import 시점에 환경변수를 읽는다
+    os.environ["G2B_BASE_URL"] = base_url
+    os.environ["G2B_RATE_PER_SEC"] = str(args.rate)
+    os.environ["G2B_RATE_BURST"] = str(args.burst or args.rate)
+    os.environ["G2B_PAGE_SIZE"] = str(args.page_size)
+    api_key = os.getenv("G2B_API_KEY", "mock")
+
+    from api import _g2b
+    from api._g2b import clamp_concurrency
+
+    collector = load_handler("collect-participants.py")
+    page_times, bid_times = instrument(_g2b, collector)
+    concurrency = clamp_concurrency(args.concurrency)
+    bids = [(bid_ntce_no(i), "00", "0", None, None) for i in range(args.bids)]
+
+    started = time.perf_counter()
+    if args.db:
+        debug_infos, saved = run_with_db(collector, api_key, bids, concurrency, args.mode)
+    else:
+        debug_infos, saved = run_fetch_only(collector, api_key, bids, concurrency, args.mode)
+    elapsed = time.perf_counter() - started
+
+    items = sum(info.get("items_count", 0) for info in debug_infos)
+    failed = [info.get("error") for info in debug_infos if info.get("error")]
+    report = {
+        "bids": len(bids),
+        "failed_bids": len(failed),
+        "items": items,
+        "rows_saved" if args.db else "rows": saved,
+        "pages": len(page_times),
+        "elapsed_s": round(elapsed, 3),
+        "bids_per_sec": round(len(bids) / elapsed, 1) if elapsed else None,
+        "rows_per_sec": round(items / elapsed, 1) if elapsed else None,
+        "page_latency": percentiles(page_times),
+        "bid_latency": percentiles(bid_times),
+        "concurrency": concurrency,
+        "page_size": args.page_size,
+        "rate_per_sec": args.rate,
+        "errors": sorted({str(error)[:80] for error in failed})[:5],
+    }
+    if mock is not None:
+        report["server"] = mock.snapshot()
+    if args.db and args.cleanup:
+        report["cleanup_deleted"] = cleanup(bids)
+
+    if server is not None:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+        return
+
+    for key, value in report.items():
+        if isinstance(value, dict):
+            value = " ".join(f"{k}={v}" for k, v in value.items())
+        elif isinstance(value, list):
+            value = "; ".join(value) or "-"
+        print(f"{key:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+나라장터 ScsbidInfoService 로컬 모의 서버
+
+data.go.kr 일일 한도를 쓰지 않고 수집기(api/collect-participants.py)를 시험/벤치마크하기 위한 서버.
+시드로 생성한 고정 데이터를 실제 API 와 같은 JSON 골격으로 돌려준다.
+
+    python bench/g2b_mock_server.py --port 8765 --latency-ms 80 --error-rate 0.01 --quota 10000
+    G2B_BASE_URL=http://127.0.0.1:8765/1230000/as/ScsbidInfoService G2B_API_KEY=mock ...
+
+오퍼레이션
+- getOpengResultListInfoOpengCompt: bidNtceNo/bidNtceOrd 별 개찰 참가업체 (numOfRows/pageNo 페이지)
+- getScsbidListSttusThng: 낙찰 목록 (inqryBgnDt~inqryEndDt, rgstDt 기준)
+
+장애 재현
+- --latency-ms / --jitter-ms: 요청마다 지연 (정규분포, 0 미만은 0)
+- --error-rate: 이 확률로 HTTP 503
+- --quota: serviceKey 별 요청 수가 넘으면 data.go.kr 과 같은 XML 한도 초과 응답 (returnReasonCode 22)
+
+페이지 수는 입찰건별 참가업체 수(--participants MIN-MAX)와 클라이언트 numOfRows 로 정해진다.
+GET /_stats 는 서버 집계(요청/오류/한도 초과/응답 행 수)를 돌려준다.
+"""
+import argparse
+from datetime import datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+
+SERVICE_PATH = "/1230000/as/ScsbidInfoService"
+OPERATIONS = ("getOpengResultListInfoOpengCompt", "getScsbidListSttusThng")
+
+# 모의 낙찰건 등록 시각 기준 (rgstDt 는 이 시각부터 과거로 분포)
+BASE_TIME = datetime(2025, 1, 31, 18, 0)
+
+_XML_ERROR = (
+    "<OpenAPI_ServiceResponse><cmmMsgHeader>"
+    "<errMsg>SERVICE ERROR</errMsg>"
+    "<returnAuthMsg>{auth_msg}</returnAuthMsg>"
+    "<returnReasonCode>{code}</returnReasonCode>"
+    "</cmmMsgHeader></OpenAPI_ServiceResponse>"
+)
+
+
+def bid_ntce_no(index):
+    """index 번째 모의 입찰공고번호"""
+    return f"2025{index:07d}"
+
+
+class MockConfig:
+    def __init__(self, bids=1000, participants=(2, 300), empty_rate=0.02, latency_ms=0.0,
+                 jitter_ms=0.0, error_rate=0.0, quota=0, items_format="array", seed=0):
+        self.bids = bids
+        self.participants = participants
+        self.empty_rate = empty_rate
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.quota = quota
+        self.items_format = items_format
+        self.seed = seed
+
+
+class MockG2B:
+    """모의 데이터와 요청 집계 (서버 스레드 공유)"""
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self._random = random.Random(config.seed)
+        self._key_requests = {}
+        self.stats = {"requests": 0, "errors": 0, "quota_exceeded": 0, "items": 0, "bytes": 0}
+        self.participants = lru_cache(maxsize=4096)(self._participants)
+        self._awards = None
+
+    # --- 고정 데이터 ---
+
+    def _participants(self, bid_no, bid_ord):
+        """입찰건 참가업체 (같은 번호면 항상 같은 목록, 투찰 금액 오름차순 = 개찰 순위)"""
+        rng = random.Random(f"{self.config.seed}:{bid_no}:{bid_ord}")
+        if rng.random() < self.config.empty_rate:
+            return []
+
+        low, high = self.config.participants
+        # 대부분은 소수, 일부 입찰건만 수백 개 (여러 페이지)
+        count = min(high, low + int(rng.expovariate(1.0 / max(1, (high - low) / 4))))
+        base_amount = rng.choice([5_000_000, 30_000_000, 120_000_000, 800_000_000])
+        opened = BASE_TIME - timedelta(days=rng.randint(0, 60), minutes=rng.randint(0, 600))
+
+        rates = sorted(rng.gauss(87.9, 1.2) for _ in range(count))
+        items = []
+        for rank, rate in enumerate(rates, start=1):
+            company = rng.randint(1, 50000)
+            items.append({
+                "bidNtceNo": bid_no,
+                "bidNtceOrd": bid_ord,
+                "bidClsfcNo": "0",
+                "rbidNo": "0",
+                "opengRnk": str(rank),
+                "bznsrgnNo": f"{company:010d}",
+                "corpNm": f"모의업체{company}",
+                "ceoNm": f"대표{company % 997}",
+                "bidprcAmt": str(int(base_amount * rate / 100)),
+                "bidprcRt": f"{rate:.3f}",
+                "opengDt": opened.strftime("%Y-%m-%d %H:%M:%S"),
+                "rmrk": "",
+            })
+        return items
+
+    def awards(self):
+        """낙찰 목록 (rgstDt 내림차순)"""
+        if self._awards is None:
+            awards = []
+            for index in range(self.config.bids):
+                no = bid_ntce_no(index)
+                rng = random.Random(f"{self.config.seed}:award:{no}")
+                participants = self.participants(no, "00")
+                winner = participants[0] if participants else {}
+                awards.append({
+                    "bidNtceNo": no,
+                    "bidNtceOrd": "00",
+                    "bidClsfcNo": "0",
+                    "bidNtceNm": f"모의 물품 구매 {index}",
+                    "dminsttCd": f"{rng.randint(1000000, 9999999)}",
+                    "dminsttNm": f"모의기관{rng.randint(1, 400)}",
+                    "prtcptCnum": str(len(participants)),
+                    "bidwinnrNm": winner.get("corpNm", ""),
+                    "bidwinnrBizno": winner.get("bznsrgnNo", ""),
+                    "sucsfbidAmt": winner.get("bidprcAmt", ""),
+                    "sucsfbidRate": winner.get("bidprcRt", ""),
+                    "rlOpengDt": winner.get("opengDt", ""),
+                    "rgstDt": (BASE_TIME - timedelta(minutes=index * 7)).strftime("%Y-%m-%d %H:%M:%S"),
+                })
+            self._awards = awards
+        return self._awards
+
+    def award_range(self, begin, end):
+        def parse(value, default):
+            try:
+                return datetime.strptime(value, "%Y%m%d%H%M")
+            except (TypeError, ValueError):
+                return default
+        begin = parse(begin, datetime.min)
+        end = parse(end, datetime.max)
+        return [
+            item for item in self.awards()
+            if begin <= datetime.strptime(item["rgstDt"], "%Y-%m-%d %H:%M:%S") <= end
+        ]
+
+    # --- 요청 처리 ---
+
+    def admit(self, service_key):
+        """
+        장애 재현 판정 (지연 포함)
+
+        반환: None(정상) / ("http", status) / ("xml", code, auth_msg)
+        """
+        config = self.config
+        with self._lock:
+            self.stats["requests"] += 1
+            used = self._key_requests.get(service_key, 0) + 1
+            self._key_requests[service_key] = used
+            roll = self._random.random()
+            delay = max(0.0, self._random.gauss(config.latency_ms, config.jitter_ms)) if config.latency_ms else 0.0
+
+        if delay:
+            time.sleep(delay / 1000)
+
+        if not service_key:
+            return ("xml", "30", "SERVICE_KEY_IS_NOT_REGISTERED_ERROR")
+        if config.quota and used > config.quota:
+            with self._lock:
+                self.stats["quota_exceeded"] += 1
+            return ("xml", "22", "LIMITED_NUMBER_OF_SERVICE_REQUESTS_EXCEEDS_ERROR")
+        if roll < config.error_rate:
+            with self._lock:
+                self.stats["errors"] += 1
+            return ("http", 503)
+        return None
+
+    def page(self, items, num_of_rows, page_no):
+        start = (page_no - 1) * num_of_rows
+        page_items = items[start:start + num_of_rows]
+        with self._lock:
+            self.stats["items"] += len(page_items)
+
+        if not page_items:
+            body_items = ""
+        elif self.config.items_format == "item":
+            body_items = {"item": page_items}
+        else:
+            body_items = page_items
+
+        return {
+            "response": {
+                "header": {"resultCode": "00", "resultMsg": "정상"},
+                "body": {
+                    "items": body_items,
+                    "numOfRows": num_of_rows,
+                    "pageNo": page_no,
+                    "totalCount": len(items),
+                },
+            }
+        }
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 기본 대기열(5)이 차면 SYN 재전송으로 1초씩 지연되어 꼬리 지연이 왜곡된다
+    request_queue_size = 1024
+
+
+def make_handler(mock):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/_stats":
+                self._send(200, "application/json", json.dumps(mock.snapshot()).encode())
+                return
+
+            operation = url.path.rstrip("/").rsplit("/", 1)[-1]
+            if operation not in OPERATIONS or not url.path.startswith(SERVICE_PATH):
+                self._send(404, "text/plain", b"API not found")
+                return
+
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            failure = mock.admit(query.get("serviceKey"))
+            if failure is not None:
+                if failure[0] == "http":
+                    self._send(failure[1], "text/plain", b"Service Unavailable")
+                else:
+                    body = _XML_ERROR.format(code=failure[1], auth_msg=failure[2]).encode()
+                    self._send(200, "text/xml;charset=UTF-8", body)
+                return
+
+            try:
+                num_of_rows = max(1, int(query.get("numOfRows", "10")))
+                page_no = max(1, int(query.get("pageNo", "1")))
+            except ValueError:
+                self._send(200, "application/json", json.dumps({
+                    "response": {"header": {"resultCode": "10", "resultMsg": "잘못된 요청 파라메터 에러"}}
+                }).encode())
+                return
+
+            if operation == "getOpengResultListInfoOpengCompt":
+                items = mock.participants(query.get("bidNtceNo", ""), query.get("bidNtceOrd", "00"))
+            else:
+                items = mock.award_range(query.get("inqryBgnDt"), query.get("inqryEndDt"))
+
+            body = json.dumps(mock.page(items, num_of_rows, page_no), ensure_ascii=False).encode()
+            with mock._lock:
+                mock.stats["bytes"] += len(body)
+            self._send(200, "application/json;charset=UTF-8", body)
+
+        def _send(self, status_code, content_type, body):
+            self.send_response(status_code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockHandler
+
+
+def start_server(config, host="127.0.0.1", port=0):
+    """
+    백그라운드 스레드로 서버 시작 (port=0 이면 빈 포트)
+
+    반환: (server, mock, base_url) - 종료는 server.shutdown()
+    """
+    mock = MockG2B(config)
+    server = MockServer((host, port), make_handler(mock))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}{SERVICE_PATH}"
+    return server, mock, base_url
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--bids", type=int, default=1000, help="낙찰 목록 입찰건 수")
+    parser.add_argument("--participants", default="2-300", help="입찰건별 참가업체 수 범위 MIN-MAX")
+    parser.add_argument("--empty-rate", type=float, default=0.02, help="참가업체가 없는 입찰건 비율")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="평균 응답 지연 (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="응답 지연 표준편차 (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 503 비율")
+    parser.add_argument("--quota", type=int, default=0, help="serviceKey 별 요청 한도 (0 이면 무제한)")
+    parser.add_argument("--items-format", choices=("array", "item"), default="array",
+                        help='items 형식: [..] 또는 {"item": [..]}')
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args):
+    low, _, high = args.participants.partition("-")
+    return MockConfig(
+        bids=args.bids,
+        participants=(int(low), int(high or low)),
+        empty_rate=args.empty_rate,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        quota=args.quota,
+        items_format=args.items_format,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="나라장터 ScsbidInfoService 모의 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    mock = MockG2B(config_from_args(args))
+    server = MockServer((args.host, args.port), make_handler(mock))
+    print(f"G2B_BASE_URL=http://{args.host}:{args.port}{SERVICE_PATH}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
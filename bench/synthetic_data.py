@@ -0,0 +1,451 @@
+"""
+분석 API 벤치마크용 합성 데이터 생성기
+
+로컬 Postgres 의 bid_results / bid_participants 를 실제와 비슷한 분포의 합성 행으로 채운다.
+- 발주기관/낙찰업체: Zipf 분포 (소수 기관·업체에 건수 집중)
+- 낙찰금액: 입찰유형별 로그정규 분포
+- 참가업체수: 입찰유형별 음이항 분포 (공사가 가장 많음), 일부 단독 입찰
+- 낙찰률: 입찰유형별 기준값 + 기관별 편차 + 잡음 (일부는 넓은 꼬리)
+- 등록일: 최근 --years 년, 평일·업무시간 편중
+
+    createdb pps_bench
+    DATABASE_URL=postgresql://localhost/pps_bench python bench/synthetic_data.py --scale 1m --init-schema --apply-sql
+
+--scale 은 bid_results 행 수 (100k, 1m, 10m 또는 정수).
+bid_participants 는 무작위로 고른 입찰건마다 최대 MAX_PARTICIPANTS_PER_BID 개씩 --participant-rows 행
+(기본 --scale 과 같음)까지 채운다. 합성 입찰번호는 'S' 로 시작하므로 --reset 은 합성 행만 지운다.
+
+--init-schema 는 테이블이 없는 빈 DB 에 벤치마크용 최소 스키마를 만든다 (운영 스키마가 아님).
+--apply-sql 은 sql/*.sql 을 psql 로 적용한 뒤 스냅샷/큐브를 전체 재구축한다.
+"""
+import argparse
+import csv
+from datetime import datetime
+import io
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import psycopg2
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCALES = {"100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+CHUNK_ROWS = 200_000
+MAX_PARTICIPANTS_PER_BID = 300
+BID_NO_PREFIX = "S"
+END_TIME = datetime(2025, 12, 31, 18, 0)
+
+BID_TYPES = ("goods", "service", "construction")
+BID_TYPE_WEIGHTS = (0.45, 0.30, 0.25)
+# (log 금액 평균, log 금액 표준편차, 참가업체수 평균, 낙찰률 기준값)
+BID_TYPE_PROFILES = {
+    "goods": (np.log(3e7), 1.2, 12, 87.9),
+    "service": (np.log(8e7), 1.1, 9, 87.75),
+    "construction": (np.log(3e8), 1.3, 120, 86.8),
+}
+
+NATIONAL_INSTITUTIONS = [
+    "조달청", "한국도로공사", "한국토지주택공사", "국방부", "한국전력공사", "한국철도공사",
+    "한국수자원공사", "국가철도공단", "한국농어촌공사", "인천국제공항공사",
+]
+REGIONS = [
+    "서울특별시", "부산광역시", "대구광역시", "인천광역시", "광주광역시", "대전광역시", "울산광역시",
+    "세종특별자치시", "경기도", "강원특별자치도", "충청북도", "충청남도", "전북특별자치도", "전라남도",
+    "경상북도", "경상남도", "제주특별자치도",
+]
+REGIONAL_BODIES = [
+    "교육청", "청", "소방본부", "경찰청", "도시공사", "상수도사업본부", "도로관리사업소",
+    "보건환경연구원", "농업기술원", "시설관리공단",
+]
+COMPANY_STEMS = [
+    "한빛", "대한", "동방", "세종", "미래", "신성", "태양", "우리", "삼일", "국제",
+    "청솔", "금강", "한결", "새한", "동일", "남부", "서해", "중앙", "정우", "성원",
+]
+COMPANY_INDUSTRIES = {
+    "goods": ["산업", "상사", "테크", "전자"],
+    "service": ["서비스", "시스템", "엔지니어링", "정보통신"],
+    "construction": ["건설", "종합건설", "토건", "개발"],
+}
+BID_OBJECTS = {
+    "goods": ["노트북", "복합기", "냉난방기", "LED 조명", "사무용 가구", "소방장비", "의약품", "급식 식자재",
+              "CCTV", "태양광 발전설비"],
+    "service": ["시설물 유지보수", "청소 용역", "정보시스템 운영", "경비 용역", "학술 연구", "홍보물 제작",
+                "전산장비 유지관리", "폐기물 처리"],
+    "construction": ["도로포장공사", "하수관로 정비공사", "교사 증축공사", "배수로 정비공사", "옹벽 보수공사",
+                     "전기설비 개선공사", "체육관 신축공사", "상수관로 교체공사"],
+}
+BID_ACTIONS = {"goods": ["구매", "구입", "제조 구매"], "service": ["용역", "위탁 용역"], "construction": [""]}
+BID_PLACES = ["본청", "청사", "초등학교", "중학교", "고등학교", "주민센터", "도서관", "보건소", "공원", "종합운동장"]
+
+RESULT_COLUMNS = [
+    "bid_ntce_no", "bid_ntce_ord", "bid_clsfc_no", "bid_ntce_nm", "bid_type", "dminstt_nm",
+    "prtcpt_cnum", "bidwinnr_nm", "bidwinnr_bizno", "sucsf_bid_amt", "sucsf_bid_rate", "rgst_dt",
+]
+PARTICIPANT_COLUMNS = [
+    "bid_ntce_no", "bid_ntce_ord", "bid_clsfc_no",
+    "prtcpt_nm", "prtcpt_bizno", "prtcpt_ceo_nm",
+    "bid_amt", "bid_rate", "rank", "is_winner", "openg_dt",
+]
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS bid_results (
+    id              bigserial PRIMARY KEY,
+    bid_ntce_no     text NOT NULL,
+    bid_ntce_ord    text,
+    bid_clsfc_no    text,
+    bid_ntce_nm     text,
+    bid_type        text,
+    dminstt_nm      text,
+    prtcpt_cnum     integer,
+    bidwinnr_nm     text,
+    bidwinnr_bizno  text,
+    sucsf_bid_amt   bigint,
+    sucsf_bid_rate  numeric(8, 3),
+    rgst_dt         timestamp
+);
+CREATE INDEX IF NOT EXISTS idx_bid_results_bid_ntce_no ON bid_results (bid_ntce_no);
+
+CREATE TABLE IF NOT EXISTS bid_participants (
+    id              bigserial PRIMARY KEY,
+    bid_ntce_no     text NOT NULL,
+    bid_ntce_ord    text NOT NULL DEFAULT '00',
+    bid_clsfc_no    text,
+    prtcpt_nm       text,
+    prtcpt_bizno    text NOT NULL,
+    prtcpt_ceo_nm   text,
+    bid_amt         bigint,
+    bid_rate        numeric(8, 3),
+    rank            integer,
+    is_winner       boolean,
+    openg_dt        timestamp,
+    UNIQUE (bid_ntce_no, bid_ntce_ord, prtcpt_bizno)
+);
+
+CREATE SCHEMA IF NOT EXISTS pps_bid;
+CREATE TABLE IF NOT EXISTS pps_bid.etl_checkpoint (
+    job_name        text PRIMARY KEY,
+    last_run_at     timestamptz,
+    last_status     text,
+    last_message    text
+);
+"""
+
+# --apply-sql 후 전체 재구축 (sql/*.sql 의 '최초' 안내와 같음)
+REFRESH_SQL = [
+    "SELECT * FROM pps_bid.refresh_dashboard_snapshot(NULL)",
+    "SELECT * FROM pps_bid.refresh_rate_cube(NULL)",
+    "SELECT * FROM pps_bid.refresh_institutions(2147483647)",
+    "SELECT * FROM pps_bid.refresh_institution_rollup(NULL)",
+    "SELECT * FROM pps_bid.enqueue_participant_collection(true)",
+]
+
+
+def parse_scale(value):
+    value = value.lower().replace("_", "")
+    if value in SCALES:
+        return SCALES[value]
+    return int(value)
+
+
+def zipf_weights(n, exponent):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def institution_names(n):
+    """순위 순 기관명 (전국 기관이 상위)"""
+    names = list(NATIONAL_INSTITUTIONS[:n])
+    combos = len(REGIONS) * len(REGIONAL_BODIES)
+    i = 0
+    while len(names) < n:
+        region = REGIONS[i % len(REGIONS)]
+        body = REGIONAL_BODIES[(i // len(REGIONS)) % len(REGIONAL_BODIES)]
+        branch = i // combos
+        names.append(f"{region}{body}" + (f" 제{branch + 1}사업소" if branch else ""))
+        i += 1
+    return np.array(names, dtype=object)
+
+
+class Universe:
+    """기관/업체 목록과 선택 분포 (청크 사이에 공유)"""
+
+    def __init__(self, rows, rng):
+        self.rng = rng
+        n_institutions = max(200, rows // 400)
+        self.institutions = institution_names(n_institutions)
+        self.institution_weights = zipf_weights(n_institutions, 1.05)
+        self.institution_offset = rng.normal(0, 0.6, n_institutions)
+
+        # 업체는 입찰유형별 풀 (업체 i 의 업종 = i % 3)
+        self.companies_per_type = max(500, rows // 60)
+        self.company_weights = zipf_weights(self.companies_per_type, 1.15)
+        n_companies = self.companies_per_type * len(BID_TYPES)
+        index = np.arange(n_companies)
+        self.company_bizno = np.array([f"{1000000000 + i}" for i in index], dtype=object)
+        self.company_names = np.array([
+            "(주)" + COMPANY_STEMS[(i // 3) % len(COMPANY_STEMS)]
+            + COMPANY_INDUSTRIES[BID_TYPES[i % 3]][(i // 60) % 4]
+            + (str(i // 240) if i >= 240 else "")
+            for i in index
+        ], dtype=object)
+        self.company_ceos = np.array([f"대표{i % 9973}" for i in index], dtype=object)
+
+    def pick_companies(self, type_codes):
+        return self.rng.choice(self.companies_per_type, size=len(type_codes), p=self.company_weights) * 3 + type_codes
+
+
+def generate_results(universe, start, count, years):
+    """bid_results 청크 (열 이름 → 배열)"""
+    rng = universe.rng
+    type_codes = rng.choice(len(BID_TYPES), size=count, p=BID_TYPE_WEIGHTS)
+
+    log_mean = np.array([BID_TYPE_PROFILES[t][0] for t in BID_TYPES])[type_codes]
+    log_sigma = np.array([BID_TYPE_PROFILES[t][1] for t in BID_TYPES])[type_codes]
+    amount = np.clip(np.exp(rng.normal(log_mean, log_sigma)), 1e5, 1e11).astype(np.int64)
+
+    # 음이항 (분산 > 평균), 5% 단독 입찰
+    mean_participants = np.array([BID_TYPE_PROFILES[t][2] for t in BID_TYPES])[type_codes]
+    dispersion = 1.5
+    participants = rng.negative_binomial(dispersion, dispersion / (dispersion + mean_participants)) + 2
+    participants = np.where(rng.random(count) < 0.05, 1, np.minimum(participants, 3000))
+
+    institution = rng.choice(len(universe.institutions), size=count, p=universe.institution_weights)
+    base_rate = np.array([BID_TYPE_PROFILES[t][3] for t in BID_TYPES])[type_codes]
+    wide = rng.random(count) < 0.15
+    noise = np.where(wide, rng.normal(-3, 3, count), rng.normal(0, 0.9, count))
+    rate = np.round(np.clip(base_rate + universe.institution_offset[institution] + noise, 50, 100), 3)
+
+    # 평일/업무시간 편중 (주말은 80% 금요일로 이동)
+    days = rng.integers(0, int(years * 365), count)
+    registered = np.datetime64(END_TIME.date()) - days.astype("timedelta64[D]")
+    weekday = (registered.astype("datetime64[D]").view("int64") + 3) % 7   # 0 = 월요일
+    shift = np.where((weekday >= 5) & (rng.random(count) < 0.8), weekday - 4, 0)
+    registered = registered - shift.astype("timedelta64[D]")
+    minutes = np.clip(rng.normal(14 * 60, 150, count), 0, 24 * 60 - 1).astype(np.int64)
+    registered = registered.astype("datetime64[m]") + minutes.astype("timedelta64[m]")
+
+    winner = universe.pick_companies(type_codes)
+
+    # 1% 는 낙찰금액/낙찰률 결측 (유찰·수의계약 등)
+    missing = rng.random(count) < 0.01
+    objects = [rng.integers(0, len(BID_OBJECTS[t]), count) for t in BID_TYPES]
+    actions = [rng.integers(0, len(BID_ACTIONS[t]), count) for t in BID_TYPES]
+    places = rng.integers(0, len(BID_PLACES), count)
+
+    names = []
+    for i in range(count):
+        bid_type = BID_TYPES[type_codes[i]]
+        action = BID_ACTIONS[bid_type][actions[type_codes[i]][i]]
+        names.append(
+            f"{str(registered[i])[:4]}년 {BID_PLACES[places[i]]} "
+            f"{BID_OBJECTS[bid_type][objects[type_codes[i]][i]]}" + (f" {action}" if action else "")
+        )
+
+    return {
+        "bid_ntce_no": np.array([f"{BID_NO_PREFIX}{start + i:011d}" for i in range(count)], dtype=object),
+        "bid_ntce_ord": np.full(count, "00", dtype=object),
+        "bid_clsfc_no": np.full(count, "0", dtype=object),
+        "bid_ntce_nm": np.array(names, dtype=object),
+        "bid_type": np.array(BID_TYPES, dtype=object)[type_codes],
+        "dminstt_nm": universe.institutions[institution],
+        "prtcpt_cnum": participants,
+        "bidwinnr_nm": universe.company_names[winner],
+        "bidwinnr_bizno": universe.company_bizno[winner],
+        "sucsf_bid_amt": np.where(missing, -1, amount),
+        "sucsf_bid_rate": np.where(missing, np.nan, rate),
+        "rgst_dt": registered,
+        "_type_code": type_codes,
+        "_winner": winner,
+    }
+
+
+def generate_participants(universe, results, selected):
+    """
+    선택된 입찰건의 참가업체 (1순위 = 낙찰업체, 나머지는 낙찰률보다 높은 투찰률)
+
+    낙찰금액/낙찰률이 없는 입찰건(약 1%)은 투찰금액을 계산할 수 없으므로 제외한다.
+    """
+    rng = universe.rng
+    selected = selected[(results["sucsf_bid_amt"][selected] > 0) & ~np.isnan(results["sucsf_bid_rate"][selected])]
+    counts = np.minimum(results["prtcpt_cnum"][selected], MAX_PARTICIPANTS_PER_BID)
+    total = int(counts.sum())
+    if not total:
+        return None
+
+    bid = np.repeat(selected, counts)
+    position = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    is_first = position == 0
+
+    bid_rate = results["sucsf_bid_rate"][bid]
+    bid_amount = results["sucsf_bid_amt"][bid]
+    company = np.where(is_first, results["_winner"][bid], universe.pick_companies(results["_type_code"][bid]))
+    rate = np.where(is_first, bid_rate, np.minimum(bid_rate + np.abs(rng.normal(0, 1.2, total)) + 0.001, 100.0))
+    rate = np.round(rate, 3)
+
+    # 같은 입찰건의 중복 업체 제거 (낙찰업체 행 우선)
+    key = bid.astype(np.int64) * len(universe.company_bizno) + company
+    _, keep = np.unique(key, return_index=True)
+    keep.sort()
+    bid, company, rate, bid_rate, bid_amount = bid[keep], company[keep], rate[keep], bid_rate[keep], bid_amount[keep]
+
+    order = np.lexsort((rate, bid))
+    bid, company, rate, bid_rate, bid_amount = bid[order], company[order], rate[order], bid_rate[order], bid_amount[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(bid)) + 1]
+    group_sizes = np.diff(np.r_[group_start, len(bid)])
+    rank = np.arange(len(bid)) - np.repeat(group_start, group_sizes) + 1
+
+    opened = results["rgst_dt"][bid] - rng.integers(60, 72 * 60, len(bid)).astype("timedelta64[m]")
+
+    return {
+        "bid_ntce_no": results["bid_ntce_no"][bid],
+        "bid_ntce_ord": results["bid_ntce_ord"][bid],
+        "bid_clsfc_no": results["bid_clsfc_no"][bid],
+        "prtcpt_nm": universe.company_names[company],
+        "prtcpt_bizno": universe.company_bizno[company],
+        "prtcpt_ceo_nm": universe.company_ceos[company],
+        "bid_amt": (bid_amount * rate / bid_rate).astype(np.int64),
+        "bid_rate": rate,
+        "rank": rank,
+        "is_winner": rank == 1,
+        "openg_dt": opened,
+    }
+
+
+def _column_text(values):
+    """열 배열 → CSV 문자열 목록 (NaN/음수/NaT 는 빈 값 = NULL)"""
+    kind = values.dtype.kind
+    if kind == "f":
+        text = np.char.mod("%.3f", values).astype(object)
+        text[np.isnan(values)] = ""
+    elif kind in "iu":
+        text = values.astype(str).astype(object)
+        text[values < 0] = ""
+    elif kind == "M":
+        text = np.char.replace(np.datetime_as_string(values, unit="s"), "T", " ").astype(object)
+    elif kind == "b":
+        text = np.where(values, "t", "f")
+    else:
+        text = values
+    return text.tolist()
+
+
+def copy_rows(cursor, table, columns, data):
+    """열 배열 → CSV → COPY"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(zip(*(_column_text(data[column]) for column in columns)))
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def next_start(cursor):
+    """기존 합성 입찰번호 다음 번호 (이어서 채우기)"""
+    cursor.execute(
+        "SELECT MAX(substr(bid_ntce_no, 2)::bigint) FROM bid_results WHERE bid_ntce_no LIKE %s",
+        [BID_NO_PREFIX + "%"]
+    )
+    current = cursor.fetchone()[0]
+    return 0 if current is None else current + 1
+
+
+def apply_sql(dsn):
+    """sql/*.sql 적용 (CREATE INDEX CONCURRENTLY 가 있어 psql 로 실행)"""
+    files = sorted(
+        os.path.join(ROOT, "sql", name) for name in os.listdir(os.path.join(ROOT, "sql")) if name.endswith(".sql")
+    )
+    for path in files:
+        print(f"psql -f {os.path.relpath(path, ROOT)}", flush=True)
+        subprocess.run(["psql", dsn, "-q", "-v", "ON_ERROR_STOP=1", "-f", path], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분석 API 벤치마크용 합성 데이터 생성")
+    parser.add_argument("--scale", default="100k", help="bid_results 행 수 (100k, 1m, 10m 또는 정수)")
+    parser.add_argument("--participant-rows", help="bid_participants 행 수 (기본 --scale)")
+    parser.add_argument("--years", type=float, default=3.0, help="등록일 범위 (년)")
+    parser.add_argument("--seed", type=int, default=20250101)
+    parser.add_argument("--init-schema", action="store_true", help="빈 DB 에 벤치마크용 최소 테이블 생성")
+    parser.add_argument("--reset", action="store_true", help="기존 합성 행('S' 입찰번호) 삭제 후 생성")
+    parser.add_argument("--apply-sql", action="store_true", help="sql/*.sql 적용 후 스냅샷/큐브 재구축")
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        sys.exit("DATABASE_URL 환경변수가 필요합니다 (로컬 벤치마크 DB)")
+
+    rows = parse_scale(args.scale)
+    participant_rows = parse_scale(args.participant_rows) if args.participant_rows else rows
+    rng = np.random.default_rng(args.seed)
+    universe = Universe(rows, rng)
+
+    conn = psycopg2.connect(dsn)
+    cursor = conn.cursor()
+    if args.init_schema:
+        cursor.execute(SCHEMA_SQL)
+        conn.commit()
+    if args.reset:
+        for table in ("bid_participants", "bid_results"):
+            cursor.execute(f"DELETE FROM {table} WHERE bid_ntce_no LIKE %s", [BID_NO_PREFIX + "%"])
+            print(f"{table}: {cursor.rowcount} 행 삭제", flush=True)
+        conn.commit()
+
+    start = next_start(cursor)
+    started = time.perf_counter()
+    written = participants_written = 0
+    participant_fraction = None
+
+    while written < rows:
+        count = min(CHUNK_ROWS, rows - written)
+        results = generate_results(universe, start + written, count, args.years)
+        copy_rows(cursor, "bid_results", RESULT_COLUMNS, results)
+
+        remaining = participant_rows - participants_written
+        if remaining > 0:
+            eligible = np.flatnonzero(
+                (results["prtcpt_cnum"] > 1)
+                & (results["sucsf_bid_amt"] > 0)
+                & ~np.isnan(results["sucsf_bid_rate"])
+            )
+            if participant_fraction is None:
+                # 첫 청크의 입찰건당 평균 참가업체 수로 전체 비율 추정
+                per_bid = np.minimum(results["prtcpt_cnum"][eligible], MAX_PARTICIPANTS_PER_BID).mean()
+                participant_fraction = min(1.0, participant_rows / (per_bid * rows * len(eligible) / count))
+            selected = eligible[rng.random(len(eligible)) < participant_fraction]
+            capped = np.minimum(results["prtcpt_cnum"][selected], MAX_PARTICIPANTS_PER_BID)
+            selected = selected[np.cumsum(capped) <= remaining]
+            participants = generate_participants(universe, results, selected)
+            if participants is not None:
+                copy_rows(cursor, "bid_participants", PARTICIPANT_COLUMNS, participants)
+                participants_written += len(participants["rank"])
+
+        conn.commit()
+        written += count
+        elapsed = time.perf_counter() - started
+        print(f"bid_results {written:,}/{rows:,}  bid_participants {participants_written:,}  "
+              f"({written / elapsed:,.0f} 행/초)", flush=True)
+
+    conn.autocommit = True
+    cursor.execute("ANALYZE bid_results")
+    cursor.execute("ANALYZE bid_participants")
+
+    if args.apply_sql:
+        conn.close()
+        apply_sql(dsn)
+        conn = psycopg2.connect(dsn)
+        conn.autocommit = True
+        cursor = conn.cursor()
+        for statement in REFRESH_SQL:
+            print(statement, flush=True)
+            cursor.execute(statement)
+            print(f"  → {cursor.fetchall()}", flush=True)
+
+    conn.close()
+    print(f"완료: bid_results {written:,} 행, bid_participants {participants_written:,} 행, "
+          f"{time.perf_counter() - started:.1f}초")
+
+
+if __name__ == "__main__":
+    main()
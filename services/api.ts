@@ -48,6 +48,21 @@ export interface ProbabilityRequest {
   institution?: string;
   bid_type?: string;
   participants?: number;
+  trials?: number;
+  seed?: number;
+}
+
+export interface ProbabilitySimulation {
+  win_probability: number;
+  expected_rank: number;
+  rank_distribution: Array<{
+    rank: number;
+    probability: number;
+  }>;
+  trials: number;
+  seed: number;
+  history_bids: number;
+  history_participants: number;
 }
 
 export interface ProbabilityResponse {
@@ -55,6 +70,7 @@ export interface ProbabilityResponse {
   my_rate: number;
   my_amount: number | null;
   win_probability: number;
+  win_probability_method: 'simulation' | 'heuristic';
   percentile: number;
   estimated_rank: number;
   total_participants: number | string;
@@ -72,6 +88,44 @@ export interface ProbabilityResponse {
     q1: number;
     q3: number;
   };
+  simulation: ProbabilitySimulation | null;
+}
+
+export interface ProbabilityCurveRequest {
+  rates?: number[];
+  rate_from?: number;
+  rate_to?: number;
+  rate_step?: number;
+  estimated_price?: number;
+  institution?: string;
+  bid_type?: string;
+  participants?: number;
+}
+
+export interface ProbabilityCurveResponse {
+  success: boolean;
+  message?: string;
+  total_participants: number | string;
+  sample_count: number;
+  distribution: {
+    mean: number;
+    std: number;
+    median: number;
+    q1: number;
+    q3: number;
+  };
+  points: Array<{
+    rate: number;
+    amount: number | null;
+    win_probability: number;
+    percentile: number;
+    estimated_rank: number;
+    z_score: number;
+    risk: {
+      level: string;
+      color: string;
+    };
+  }>;
 }
 
 // API 함수들
@@ -102,6 +156,24 @@ export const api = {
     if (params.institution) query.set('institution', params.institution);
     if (params.bid_type) query.set('bid_type', params.bid_type);
     if (params.participants) query.set('participants', params.participants.toString());
+    if (params.trials) query.set('trials', params.trials.toString());
+    if (params.seed !== undefined) query.set('seed', params.seed.toString());
+    
+    const res = await fetch(`${API_BASE}/probability?${query}`);
+    return res.json();
+  },
+
+  // 낙찰 확률 곡선 (여러 투찰률 일괄 계산)
+  async probabilityCurve(params: ProbabilityCurveRequest): Promise<ProbabilityCurveResponse> {
+    const query = new URLSearchParams();
+    if (params.rates) query.set('rates', params.rates.join(','));
+    if (params.rate_from !== undefined) query.set('rate_from', params.rate_from.toString());
+    if (params.rate_to !== undefined) query.set('rate_to', params.rate_to.toString());
+    if (params.rate_step) query.set('rate_step', params.rate_step.toString());
+    if (params.estimated_price) query.set('estimated_price', params.estimated_price.toString());
+    if (params.institution) query.set('institution', params.institution);
+    if (params.bid_type) query.set('bid_type', params.bid_type);
+    if (params.participants) query.set('participants', params.participants.toString());
     
     const res = await fetch(`${API_BASE}/probability?${query}`);
     return res.json();
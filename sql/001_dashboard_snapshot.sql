@@ -0,0 +1,271 @@
+-- 대시보드 스냅샷
+--
+-- /api/dashboard 가 매 요청마다 bid_results 전체를 8번 집계하던 것을
+-- 일 단위 롤업 테이블 + 단일 스냅샷 행(jsonb)으로 대체한다.
+--
+-- 적용:   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f sql/001_dashboard_snapshot.sql
+-- 최초:   SELECT * FROM pps_bid.refresh_dashboard_snapshot(NULL);   -- 전체 재구축
+-- 야간:   SELECT * FROM pps_bid.refresh_dashboard_snapshot((now() AT TIME ZONE 'Asia/Seoul')::date - 2);
+
+CREATE SCHEMA IF NOT EXISTS pps_bid;
+
+-- 일자 × 입찰유형 롤업 (rgst_dt 가 NULL 인 행은 '-infinity' 일자로 보관)
+CREATE TABLE IF NOT EXISTS pps_bid.dashboard_daily_stats (
+    date            date    NOT NULL,
+    bid_type        text    NOT NULL,
+    bid_count       bigint  NOT NULL,   -- 전체 건수
+    award_count     bigint  NOT NULL,   -- sucsf_bid_amt > 0
+    award_amt       numeric NOT NULL,
+    award_rate_sum  numeric NOT NULL,   -- sucsf_bid_amt > 0 AND sucsf_bid_rate IS NOT NULL
+    award_rate_cnt  bigint  NOT NULL,
+    prtcpt_sum      numeric NOT NULL,   -- sucsf_bid_amt > 0 AND prtcpt_cnum IS NOT NULL
+    prtcpt_cnt      bigint  NOT NULL,
+    rated_count     bigint  NOT NULL,   -- sucsf_bid_rate IS NOT NULL
+    rated_amt       numeric NOT NULL,
+    rated_rate_sum  numeric NOT NULL,
+    rate_lt_85      bigint  NOT NULL,
+    rate_85_88      bigint  NOT NULL,
+    rate_88_90      bigint  NOT NULL,
+    rate_90_95      bigint  NOT NULL,
+    rate_ge_95      bigint  NOT NULL,
+    PRIMARY KEY (date, bid_type)
+);
+
+-- 일자 × 발주기관 롤업 (sucsf_bid_amt > 0)
+CREATE TABLE IF NOT EXISTS pps_bid.dashboard_daily_institution (
+    date         date    NOT NULL,
+    dminstt_nm   text    NOT NULL,
+    award_count  bigint  NOT NULL,
+    award_amt    numeric NOT NULL,
+    PRIMARY KEY (date, dminstt_nm)
+);
+
+-- 일자 × 낙찰업체 롤업 (sucsf_bid_amt > 0, NULL 은 '' 로 보관)
+CREATE TABLE IF NOT EXISTS pps_bid.dashboard_daily_company (
+    date            date    NOT NULL,
+    bidwinnr_nm     text    NOT NULL,
+    bidwinnr_bizno  text    NOT NULL,
+    award_count     bigint  NOT NULL,
+    award_amt       numeric NOT NULL,
+    rate_sum        numeric NOT NULL,
+    rate_cnt        bigint  NOT NULL,
+    PRIMARY KEY (date, bidwinnr_nm, bidwinnr_bizno)
+);
+
+-- /api/dashboard 가 읽는 단일 행
+CREATE TABLE IF NOT EXISTS pps_bid.dashboard_snapshot (
+    id            smallint    PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    payload       jsonb       NOT NULL,
+    refreshed_at  timestamptz NOT NULL DEFAULT now()
+);
+
+
+CREATE OR REPLACE FUNCTION pps_bid.refresh_dashboard_snapshot(p_since date DEFAULT NULL)
+RETURNS TABLE (daily_rows bigint, institution_rows bigint, company_rows bigint, snapshot_at timestamptz)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_since   date := COALESCE(p_since, '-infinity'::date);
+    v_today   date := (now() AT TIME ZONE 'Asia/Seoul')::date;
+    v_daily   bigint;
+    v_inst    bigint;
+    v_comp    bigint;
+    v_payload jsonb;
+BEGIN
+    -- 1) 변경 구간 일 단위 롤업 재계산
+    DELETE FROM pps_bid.dashboard_daily_stats WHERE date >= v_since;
+    INSERT INTO pps_bid.dashboard_daily_stats
+    SELECT
+        COALESCE(rgst_dt::date, '-infinity'::date),
+        COALESCE(bid_type, 'unknown'),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE sucsf_bid_amt > 0),
+        COALESCE(SUM(sucsf_bid_amt) FILTER (WHERE sucsf_bid_amt > 0), 0),
+        COALESCE(SUM(sucsf_bid_rate) FILTER (WHERE sucsf_bid_amt > 0), 0),
+        COUNT(sucsf_bid_rate) FILTER (WHERE sucsf_bid_amt > 0),
+        COALESCE(SUM(prtcpt_cnum) FILTER (WHERE sucsf_bid_amt > 0), 0),
+        COUNT(prtcpt_cnum) FILTER (WHERE sucsf_bid_amt > 0),
+        COUNT(sucsf_bid_rate),
+        COALESCE(SUM(sucsf_bid_amt) FILTER (WHERE sucsf_bid_rate IS NOT NULL), 0),
+        COALESCE(SUM(sucsf_bid_rate), 0),
+        COUNT(*) FILTER (WHERE sucsf_bid_rate < 85),
+        COUNT(*) FILTER (WHERE sucsf_bid_rate >= 85 AND sucsf_bid_rate < 88),
+        COUNT(*) FILTER (WHERE sucsf_bid_rate >= 88 AND sucsf_bid_rate < 90),
+        COUNT(*) FILTER (WHERE sucsf_bid_rate >= 90 AND sucsf_bid_rate < 95),
+        COUNT(*) FILTER (WHERE sucsf_bid_rate >= 95)
+    FROM bid_results
+    WHERE p_since IS NULL OR rgst_dt >= v_since
+    GROUP BY 1, 2;
+    GET DIAGNOSTICS v_daily = ROW_COUNT;
+
+    DELETE FROM pps_bid.dashboard_daily_institution WHERE date >= v_since;
+    INSERT INTO pps_bid.dashboard_daily_institution
+    SELECT
+        COALESCE(rgst_dt::date, '-infinity'::date),
+        dminstt_nm,
+        COUNT(*),
+        SUM(sucsf_bid_amt)
+    FROM bid_results
+    WHERE (p_since IS NULL OR rgst_dt >= v_since)
+        AND dminstt_nm IS NOT NULL
+        AND sucsf_bid_amt > 0
+    GROUP BY 1, 2;
+    GET DIAGNOSTICS v_inst = ROW_COUNT;
+
+    DELETE FROM pps_bid.dashboard_daily_company WHERE date >= v_since;
+    INSERT INTO pps_bid.dashboard_daily_company
+    SELECT
+        COALESCE(rgst_dt::date, '-infinity'::date),
+        COALESCE(bidwinnr_nm, ''),
+        COALESCE(bidwinnr_bizno, ''),
+        COUNT(*),
+        SUM(sucsf_bid_amt),
+        COALESCE(SUM(sucsf_bid_rate), 0),
+        COUNT(sucsf_bid_rate)
+    FROM bid_results
+    WHERE (p_since IS NULL OR rgst_dt >= v_since)
+        AND sucsf_bid_amt > 0
+    GROUP BY 1, 2, 3;
+    GET DIAGNOSTICS v_comp = ROW_COUNT;
+
+    -- 2) 롤업에서 스냅샷 조립 (bid_results 는 최근 5건만 인덱스로 조회)
+    SELECT jsonb_build_object(
+        'summary', (
+            SELECT jsonb_build_object(
+                'total_bids', COALESCE(SUM(award_count), 0),
+                'total_companies', (
+                    SELECT COUNT(DISTINCT bidwinnr_bizno)
+                    FROM pps_bid.dashboard_daily_company
+                    WHERE bidwinnr_bizno <> ''
+                ),
+                'total_institutions', (
+                    SELECT COUNT(DISTINCT dminstt_nm) FROM pps_bid.dashboard_daily_institution
+                ),
+                'total_amount', COALESCE(SUM(award_amt), 0),
+                'avg_rate', ROUND(SUM(award_rate_sum) / NULLIF(SUM(award_rate_cnt), 0), 2),
+                'avg_participants', ROUND(SUM(prtcpt_sum) / NULLIF(SUM(prtcpt_cnt), 0), 1)
+            )
+            FROM pps_bid.dashboard_daily_stats
+        ),
+        'recent_30days', (
+            SELECT jsonb_build_object(
+                'bids', COALESCE(SUM(award_count) FILTER (WHERE date >= v_today - 30), 0),
+                'amount', COALESCE(SUM(award_amt) FILTER (WHERE date >= v_today - 30), 0),
+                'avg_rate', ROUND(
+                    SUM(award_rate_sum) FILTER (WHERE date >= v_today - 30)
+                    / NULLIF(SUM(award_rate_cnt) FILTER (WHERE date >= v_today - 30), 0), 2),
+                'prev_count', COALESCE(SUM(bid_count) FILTER (WHERE date < v_today - 30), 0)
+            )
+            FROM pps_bid.dashboard_daily_stats
+            WHERE date >= v_today - 60
+        ),
+        'monthly_trend', (
+            SELECT COALESCE(jsonb_agg(m ORDER BY m.month), '[]'::jsonb)
+            FROM (
+                SELECT
+                    TO_CHAR(date, 'YYYY-MM') as month,
+                    SUM(rated_count) as count,
+                    SUM(rated_amt) as amount,
+                    ROUND(SUM(rated_rate_sum) / NULLIF(SUM(rated_count), 0), 2) as avg_rate
+                FROM pps_bid.dashboard_daily_stats
+                WHERE date >= (v_today - INTERVAL '6 months')::date
+                    AND rated_count > 0
+                GROUP BY TO_CHAR(date, 'YYYY-MM')
+            ) m
+        ),
+        'by_type', (
+            SELECT COALESCE(jsonb_agg(t ORDER BY t.count DESC), '[]'::jsonb)
+            FROM (
+                SELECT
+                    bid_type as type,
+                    SUM(award_count) as count,
+                    SUM(award_amt) as amount,
+                    ROUND(SUM(award_rate_sum) / NULLIF(SUM(award_rate_cnt), 0), 2) as avg_rate
+                FROM pps_bid.dashboard_daily_stats
+                GROUP BY bid_type
+                HAVING SUM(award_count) > 0
+            ) t
+        ),
+        'top_institutions', (
+            SELECT COALESCE(jsonb_agg(i ORDER BY i.count DESC), '[]'::jsonb)
+            FROM (
+                SELECT dminstt_nm as name, SUM(award_count) as count, SUM(award_amt) as amount
+                FROM pps_bid.dashboard_daily_institution
+                WHERE dminstt_nm NOT LIKE '%수요기관%'
+                    AND dminstt_nm NOT LIKE '%각 %'
+                    AND LENGTH(dminstt_nm) > 2
+                GROUP BY dminstt_nm
+                ORDER BY count DESC
+                LIMIT 5
+            ) i
+        ),
+        'top_companies', (
+            SELECT COALESCE(jsonb_agg(c ORDER BY c.count DESC), '[]'::jsonb)
+            FROM (
+                SELECT
+                    bidwinnr_nm as name,
+                    SUM(award_count) as count,
+                    SUM(award_amt) as amount,
+                    ROUND(SUM(rate_sum) / NULLIF(SUM(rate_cnt), 0), 2) as avg_rate
+                FROM pps_bid.dashboard_daily_company
+                WHERE bidwinnr_nm <> ''
+                GROUP BY bidwinnr_nm
+                ORDER BY count DESC
+                LIMIT 5
+            ) c
+        ),
+        'recent_bids', (
+            SELECT COALESCE(jsonb_agg(r ORDER BY r.rgst_dt DESC), '[]'::jsonb)
+            FROM (
+                SELECT
+                    bid_ntce_nm as bid_name,
+                    dminstt_nm as institution,
+                    bidwinnr_nm as winner,
+                    sucsf_bid_amt as amount,
+                    sucsf_bid_rate as rate,
+                    rgst_dt::date as date,
+                    rgst_dt
+                FROM bid_results
+                WHERE rgst_dt IS NOT NULL
+                ORDER BY rgst_dt DESC
+                LIMIT 5
+            ) r
+        ),
+        'rate_distribution', (
+            SELECT COALESCE(jsonb_agg(d ORDER BY d.ord), '[]'::jsonb)
+            FROM (
+                SELECT b.ord, b.range, b.count
+                FROM (
+                    SELECT
+                        SUM(rate_lt_85) as lt_85, SUM(rate_85_88) as r85_88, SUM(rate_88_90) as r88_90,
+                        SUM(rate_90_95) as r90_95, SUM(rate_ge_95) as ge_95
+                    FROM pps_bid.dashboard_daily_stats
+                ) s
+                CROSS JOIN LATERAL (VALUES
+                    (1, '85% 미만', s.lt_85),
+                    (2, '85-88%', s.r85_88),
+                    (3, '88-90%', s.r88_90),
+                    (4, '90-95%', s.r90_95),
+                    (5, '95% 이상', s.ge_95)
+                ) b(ord, range, count)
+                WHERE b.count > 0
+            ) d
+        )
+    ) INTO v_payload;
+
+    INSERT INTO pps_bid.dashboard_snapshot (id, payload, refreshed_at)
+    VALUES (1, v_payload, now())
+    ON CONFLICT (id) DO UPDATE
+        SET payload = EXCLUDED.payload, refreshed_at = EXCLUDED.refreshed_at;
+
+    INSERT INTO pps_bid.etl_checkpoint (job_name, last_run_at, last_status, last_message)
+    VALUES ('refresh_dashboard_snapshot', now(), 'success',
+            format('since=%s daily=%s institution=%s company=%s', p_since, v_daily, v_inst, v_comp))
+    ON CONFLICT (job_name) DO UPDATE
+        SET last_run_at = EXCLUDED.last_run_at,
+            last_status = EXCLUDED.last_status,
+            last_message = EXCLUDED.last_message;
+
+    RETURN QUERY SELECT v_daily, v_inst, v_comp, now();
+END;
+$$;
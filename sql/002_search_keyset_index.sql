@@ -0,0 +1,10 @@
+-- /api/search 커서 페이지네이션용 인덱스
+--
+-- ORDER BY rgst_dt DESC, bid_ntce_no DESC + (rgst_dt, bid_ntce_no) < (cursor) 조건을
+-- 인덱스 범위 스캔으로 처리해 깊은 페이지도 일정한 비용으로 조회한다.
+--
+-- 적용:   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f sql/002_search_keyset_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bid_results_rgst_dt_bid_no
+    ON bid_results (rgst_dt DESC, bid_ntce_no DESC)
+    WHERE rgst_dt IS NOT NULL;
@@ -0,0 +1,41 @@
+-- 공고명/발주기관/낙찰업체 부분 문자열 검색 인덱스
+--
+-- LIKE '%term%' 가 순차 스캔을 하던 것을 GIN 인덱스 스캔으로 바꾼다. (api/_text_search.py 참고)
+-- - bid_ntce_nm: 한글 2-gram tsvector (2글자 검색어도 인덱스 사용)
+-- - bid_ntce_nm, dminstt_nm, bidwinnr_nm: pg_trgm (LIKE 및 similarity() 정렬)
+--
+-- 적용:   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f sql/003_text_search.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE SCHEMA IF NOT EXISTS pps_bid;
+
+-- 한글 인식 2-gram 토크나이저
+-- 소문자화 후 영숫자/한글 연속 구간마다 인접 두 글자를 lexeme 으로 만든다.
+-- 한 글자 구간은 그대로 보관한다. (api/_text_search.tokenize 와 같은 규칙)
+CREATE OR REPLACE FUNCTION pps_bid.ko_bigram_tsvector(p_text text)
+RETURNS tsvector
+LANGUAGE sql
+IMMUTABLE STRICT PARALLEL SAFE
+AS $$
+    SELECT COALESCE(array_to_tsvector(array_agg(DISTINCT tok)), ''::tsvector)
+    FROM (
+        SELECT
+            CASE WHEN char_length(w) = 1 THEN w ELSE substr(w, i, 2) END AS tok
+        FROM regexp_split_to_table(lower(p_text), '[^0-9a-z가-힣]+') AS w,
+             generate_series(1, GREATEST(char_length(w) - 1, 1)) AS i
+        WHERE w <> ''
+    ) t
+$$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bid_results_bid_ntce_nm_bigram
+    ON bid_results USING gin (pps_bid.ko_bigram_tsvector(bid_ntce_nm));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bid_results_bid_ntce_nm_trgm
+    ON bid_results USING gin (bid_ntce_nm gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bid_results_dminstt_nm_trgm
+    ON bid_results USING gin (dminstt_nm gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bid_results_bidwinnr_nm_trgm
+    ON bid_results USING gin (bidwinnr_nm gin_trgm_ops);
@@ -0,0 +1,98 @@
+-- 낙찰률 분포 큐브 (/api/predict)
+--
+-- 입찰유형 × log 금액 구간 × 참가업체수 셀마다 낙찰률 고정 폭 히스토그램을 보관한다.
+-- 히스토그램 칸(rate_bin)별 건수/합/제곱합/최소/최대는 단순 합산으로 병합되므로
+-- 예측 시 원본 행 대신 몇 개 셀의 칸만 합쳐 평균/표준편차/분위수를 계산한다. (api/_rate_cube.py)
+--
+-- 셀은 등록월(rgst_dt) 단위로 나눠 보관하고, 야간 갱신은 지정일이 속한 월부터 다시 계산한다.
+-- 적재가 늦게 들어온 행이나 적재 후 수정된 행도 해당 월을 재계산할 때 반영된다.
+-- 조회 시에는 월 구분 없이 같은 칸을 합산한다. (rgst_dt 가 NULL 인 행은 제외)
+--
+-- 구간 정의 (api/_rate_cube.py 와 동일해야 함)
+--   amount_bucket      = floor(log10(sucsf_bid_amt) * 20)        -- 구간 폭 약 12%
+--   participant_bucket = LEAST(prtcpt_cnum, 100), NULL 은 -1
+--   rate_bin           = floor(sucsf_bid_rate / 0.05)             -- 0.05%p 칸
+--
+-- 적용:   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f sql/004_rate_cube.sql
+-- 최초:   SELECT * FROM pps_bid.refresh_rate_cube(NULL);   -- 전체 재구축
+-- 야간:   SELECT * FROM pps_bid.refresh_rate_cube((now() AT TIME ZONE 'Asia/Seoul')::date - 2);
+
+CREATE SCHEMA IF NOT EXISTS pps_bid;
+
+-- 이전 버전(월 구분 없는 누적 + 워터마크)에서 올리는 경우: 누적분을 월로 나눌 수 없으므로 버리고 전체 재구축
+DO $$
+BEGIN
+    IF to_regclass('pps_bid.rate_cube') IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'pps_bid' AND table_name = 'rate_cube' AND column_name = 'month'
+    ) THEN
+        DROP TABLE pps_bid.rate_cube;
+    END IF;
+END;
+$$;
+DROP TABLE IF EXISTS pps_bid.rate_cube_state;
+DROP FUNCTION IF EXISTS pps_bid.refresh_rate_cube(boolean);
+
+CREATE TABLE IF NOT EXISTS pps_bid.rate_cube (
+    bid_type            text     NOT NULL,   -- NULL 은 '' 로 보관
+    amount_bucket       integer  NOT NULL,
+    participant_bucket  integer  NOT NULL,
+    rate_bin            integer  NOT NULL,
+    month               date     NOT NULL,   -- 등록월 첫날
+    cnt                 bigint   NOT NULL,
+    rate_sum            numeric  NOT NULL,
+    rate_sumsq          numeric  NOT NULL,
+    rate_min            numeric  NOT NULL,
+    rate_max            numeric  NOT NULL,
+    PRIMARY KEY (bid_type, amount_bucket, participant_bucket, rate_bin, month)
+);
+
+-- 재계산 구간 삭제용
+CREATE INDEX IF NOT EXISTS idx_rate_cube_month ON pps_bid.rate_cube (month);
+
+
+CREATE OR REPLACE FUNCTION pps_bid.refresh_rate_cube(p_since date DEFAULT NULL)
+RETURNS TABLE (recomputed_cells bigint, cube_rows bigint, since_month date)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    -- 지정일이 속한 월 전체를 다시 계산 (NULL 이면 전체)
+    v_month     date := date_trunc('month', COALESCE(p_since, '-infinity'::date))::date;
+    v_processed bigint := 0;
+    v_cube      bigint;
+BEGIN
+    DELETE FROM pps_bid.rate_cube WHERE month >= v_month;
+
+    INSERT INTO pps_bid.rate_cube
+    SELECT
+        COALESCE(bid_type, ''),
+        floor(log(sucsf_bid_amt::numeric) * 20)::integer,
+        COALESCE(LEAST(prtcpt_cnum, 100), -1),
+        floor(sucsf_bid_rate / 0.05)::integer,
+        date_trunc('month', rgst_dt)::date,
+        COUNT(*),
+        SUM(sucsf_bid_rate),
+        SUM(sucsf_bid_rate * sucsf_bid_rate),
+        MIN(sucsf_bid_rate),
+        MAX(sucsf_bid_rate)
+    FROM bid_results
+    WHERE (p_since IS NULL OR rgst_dt >= v_month)
+        AND rgst_dt IS NOT NULL
+        AND sucsf_bid_rate IS NOT NULL
+        AND sucsf_bid_amt > 0
+    GROUP BY 1, 2, 3, 4, 5;
+    GET DIAGNOSTICS v_processed = ROW_COUNT;
+
+    SELECT COUNT(*) INTO v_cube FROM pps_bid.rate_cube;
+
+    INSERT INTO pps_bid.etl_checkpoint (job_name, last_run_at, last_status, last_message)
+    VALUES ('refresh_rate_cube', now(), 'success',
+            format('since=%s month=%s cells=%s', p_since, v_month, v_processed))
+    ON CONFLICT (job_name) DO UPDATE
+        SET last_run_at = EXCLUDED.last_run_at,
+            last_status = EXCLUDED.last_status,
+            last_message = EXCLUDED.last_message;
+
+    RETURN QUERY SELECT v_processed, v_cube, v_month;
+END;
+$$;
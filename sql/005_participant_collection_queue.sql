@@ -0,0 +1,94 @@
+-- 참가업체 수집 작업 큐
+--
+-- /api/collect-participants 가 매번 bid_results ⟕ bid_participants 안티 조인으로
+-- 미수집 입찰건을 찾던 것을 상태 테이블로 대체한다. (api/_collection_queue.py)
+--
+--   pending  수집 대기
+--   done     참가업체 저장 완료
+--   empty    API 가 정상 응답했지만 참가업체 없음 (다시 조회하지 않음)
+--   failed   실패, next_retry_at 이후 재시도 (최대 시도 초과 시 next_retry_at = 'infinity')
+--
+-- 작업자는 FOR UPDATE SKIP LOCKED 로 배치를 가져가며 next_retry_at 을 임대 만료 시각으로 미룬다.
+-- 작업자가 중단되면 임대가 끝난 뒤 다른 작업자가 다시 가져간다.
+--
+-- 신규 등록은 최근 p_days 일(등록일 기준) 낙찰건을 매번 다시 훑는다. 이미 등록된 건은 무시되므로
+-- 등록일이 지난 뒤 늦게 적재된 행도 구간 안이면 등록된다.
+--
+-- 적용:   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f sql/005_participant_collection_queue.sql
+-- 최초:   SELECT * FROM pps_bid.enqueue_participant_collection(true);       -- 전체 등록 (수집된 건은 done)
+-- 야간:   SELECT * FROM pps_bid.enqueue_participant_collection(false, 30);  -- 최근 30일 중 미등록 낙찰건
+
+CREATE SCHEMA IF NOT EXISTS pps_bid;
+
+CREATE TABLE IF NOT EXISTS pps_bid.participant_collection_queue (
+    bid_ntce_no      text        NOT NULL,
+    bid_ntce_ord     text        NOT NULL,   -- NULL 은 '00'
+    bid_clsfc_no     text        NOT NULL,   -- NULL 은 '00'
+    rgst_dt          timestamp,
+    status           text        NOT NULL DEFAULT 'pending'
+                                 CHECK (status IN ('pending', 'done', 'empty', 'failed')),
+    attempts         integer     NOT NULL DEFAULT 0,
+    next_retry_at    timestamptz NOT NULL DEFAULT now(),
+    collected_count  integer,
+    last_error       text,
+    updated_at       timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (bid_ntce_no, bid_ntce_ord)
+);
+
+-- 다음 배치 선택 (최근 낙찰건 우선)
+CREATE INDEX IF NOT EXISTS idx_participant_collection_queue_claim
+    ON pps_bid.participant_collection_queue (rgst_dt DESC NULLS LAST)
+    WHERE status IN ('pending', 'failed');
+
+-- 이전 버전(큐의 최대 등록일 이후만 등록)의 워터마크 인덱스와 함수
+DROP INDEX IF EXISTS pps_bid.idx_participant_collection_queue_rgst_dt;
+DROP FUNCTION IF EXISTS pps_bid.enqueue_participant_collection(boolean);
+
+
+CREATE OR REPLACE FUNCTION pps_bid.enqueue_participant_collection(p_full boolean DEFAULT false,
+                                                                  p_days integer DEFAULT 2)
+RETURNS TABLE (enqueued bigint, since timestamp)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_from     timestamp := CASE
+                                WHEN p_full THEN '-infinity'::timestamp
+                                ELSE ((now() AT TIME ZONE 'Asia/Seoul')::date - p_days)::timestamp
+                            END;
+    v_enqueued bigint;
+BEGIN
+
+    INSERT INTO pps_bid.participant_collection_queue AS q
+        (bid_ntce_no, bid_ntce_ord, bid_clsfc_no, rgst_dt, status)
+    SELECT DISTINCT ON (b.bid_ntce_no, COALESCE(b.bid_ntce_ord, '00'))
+        b.bid_ntce_no,
+        COALESCE(b.bid_ntce_ord, '00'),
+        COALESCE(b.bid_clsfc_no, '00'),
+        b.rgst_dt,
+        CASE
+            WHEN p_full AND EXISTS (
+                SELECT 1 FROM bid_participants p
+                WHERE p.bid_ntce_no = b.bid_ntce_no
+                    AND p.bid_ntce_ord = COALESCE(b.bid_ntce_ord, '00')
+            ) THEN 'done'
+            ELSE 'pending'
+        END
+    FROM bid_results b
+    WHERE b.prtcpt_cnum > 1
+        AND b.bid_ntce_no IS NOT NULL
+        AND (p_full OR b.rgst_dt >= v_from)   -- 이미 등록된 건은 ON CONFLICT 로 무시
+    ORDER BY b.bid_ntce_no, COALESCE(b.bid_ntce_ord, '00'), b.rgst_dt DESC
+    ON CONFLICT (bid_ntce_no, bid_ntce_ord) DO NOTHING;
+    GET DIAGNOSTICS v_enqueued = ROW_COUNT;
+
+    INSERT INTO pps_bid.etl_checkpoint (job_name, last_run_at, last_status, last_message)
+    VALUES ('enqueue_participant_collection', now(), 'success',
+            format('full=%s from=%s enqueued=%s', p_full, v_from, v_enqueued))
+    ON CONFLICT (job_name) DO UPDATE
+        SET last_run_at = EXCLUDED.last_run_at,
+            last_status = EXCLUDED.last_status,
+            last_message = EXCLUDED.last_message;
+
+    RETURN QUERY SELECT v_enqueued, v_from;
+END;
+$$;
@@ -0,0 +1,188 @@
+-- 발주기관 차원 테이블 (/api/institution)
+--
+-- dminstt_nm 원문 표기(alias)를 정규화 이름 단위의 기관 ID 로 묶고, bid_results.institution_id 에
+-- 기록해 기관 분석이 LIKE '%name%' 대신 정수 인덱스를 타도록 한다. (api/_institutions.py)
+--
+-- 정규화 규칙: 소문자화 후 영숫자/한글 외 문자 제거 ('서울특별시 강남구' = '서울특별시강남구')
+--             api/_institutions.normalize_name 과 같아야 함
+-- 잡음 기관(is_noise): '수요기관' 포함, '각 ' 포함, 2글자 이하 (기관 목록에서 제외)
+--
+-- 적재(INSERT) 시와 dminstt_nm 변경 시 트리거가 이미 등록된 표기/정규화 이름이면 바로 기관 ID 를 지정한다.
+-- 처음 보는 이름만 NULL 로 남고 refresh_institutions 가 기관을 등록하며 지정한다.
+--
+-- 적용:   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f sql/006_institution_dim.sql
+-- 최초:   has_more 가 false 가 될 때까지 반복
+--         SELECT * FROM pps_bid.refresh_institutions(1000000);
+-- 야간:   SELECT * FROM pps_bid.refresh_institutions();   -- 미지정 행만 처리 (has_more 면 반복)
+
+CREATE SCHEMA IF NOT EXISTS pps_bid;
+
+CREATE OR REPLACE FUNCTION pps_bid.normalize_institution_name(p_name text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE STRICT PARALLEL SAFE
+AS $$
+    SELECT regexp_replace(lower(p_name), '[^0-9a-z가-힣]+', '', 'g')
+$$;
+
+CREATE TABLE IF NOT EXISTS pps_bid.institution (
+    institution_id   integer     GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    canonical_name   text        NOT NULL,   -- 처음 등록될 때 가장 많이 쓰인 표기
+    normalized_name  text        NOT NULL UNIQUE,
+    is_noise         boolean     NOT NULL DEFAULT false,
+    bid_count        bigint      NOT NULL DEFAULT 0,   -- 지정된 행 수 (해석기 정렬용, 근사치)
+    first_seen       timestamp,
+    last_seen        timestamp,
+    created_at       timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_institution_normalized_name_trgm
+    ON pps_bid.institution USING gin (normalized_name gin_trgm_ops);
+
+-- dminstt_nm 원문 표기 → 기관
+CREATE TABLE IF NOT EXISTS pps_bid.institution_alias (
+    alias            text     PRIMARY KEY,
+    institution_id   integer  NOT NULL REFERENCES pps_bid.institution (institution_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_institution_alias_institution_id
+    ON pps_bid.institution_alias (institution_id);
+
+-- 컬럼 추가는 카탈로그만 변경 (기존 행은 NULL, refresh_institutions 가 채움)
+ALTER TABLE bid_results ADD COLUMN IF NOT EXISTS institution_id integer;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bid_results_institution_id
+    ON bid_results (institution_id, rgst_dt DESC)
+    WHERE institution_id IS NOT NULL;
+
+-- 아직 기관이 지정되지 않은 행 (증분 처리 대상)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bid_results_institution_pending
+    ON bid_results (dminstt_nm)
+    WHERE institution_id IS NULL AND dminstt_nm IS NOT NULL;
+
+-- 적재 시 / dminstt_nm 변경 시 알려진 기관이면 바로 지정 (처음 보는 이름은 NULL, refresh_institutions 가 처리)
+CREATE OR REPLACE FUNCTION pps_bid.assign_institution_id()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.institution_id IS NOT NULL THEN
+        RETURN NEW;
+    END IF;
+    IF TG_OP = 'UPDATE' AND OLD.dminstt_nm IS NOT DISTINCT FROM NEW.dminstt_nm THEN
+        RETURN NEW;
+    END IF;
+
+    NEW.institution_id := NULL;
+    IF NEW.dminstt_nm IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    SELECT a.institution_id INTO NEW.institution_id
+    FROM pps_bid.institution_alias a
+    WHERE a.alias = NEW.dminstt_nm;
+
+    IF NEW.institution_id IS NULL THEN
+        SELECT i.institution_id INTO NEW.institution_id
+        FROM pps_bid.institution i
+        WHERE i.normalized_name = pps_bid.normalize_institution_name(NEW.dminstt_nm);
+    END IF;
+
+    IF NEW.institution_id IS NOT NULL THEN
+        UPDATE pps_bid.institution
+        SET bid_count = bid_count + 1,
+            first_seen = LEAST(first_seen, NEW.rgst_dt),
+            last_seen = GREATEST(last_seen, NEW.rgst_dt)
+        WHERE institution_id = NEW.institution_id;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+-- 이전 버전: dminstt_nm 변경 시 비우기만 하던 트리거
+DROP TRIGGER IF EXISTS trg_bid_results_reset_institution_id ON bid_results;
+DROP FUNCTION IF EXISTS pps_bid.reset_institution_id();
+
+DROP TRIGGER IF EXISTS trg_bid_results_assign_institution_id ON bid_results;
+CREATE TRIGGER trg_bid_results_assign_institution_id
+    BEFORE INSERT OR UPDATE OF dminstt_nm ON bid_results
+    FOR EACH ROW
+    EXECUTE FUNCTION pps_bid.assign_institution_id();
+
+
+CREATE OR REPLACE FUNCTION pps_bid.refresh_institutions(p_limit integer DEFAULT 200000)
+RETURNS TABLE (new_institutions bigint, new_aliases bigint, assigned_rows bigint, has_more boolean)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_institutions bigint := 0;
+    v_aliases      bigint := 0;
+    v_assigned     bigint := 0;
+BEGIN
+    CREATE TEMP TABLE IF NOT EXISTS institution_pending (
+        row_id       tid,
+        dminstt_nm   text
+    ) ON COMMIT DROP;
+    TRUNCATE institution_pending;
+
+    INSERT INTO institution_pending
+    SELECT ctid, dminstt_nm
+    FROM bid_results
+    WHERE institution_id IS NULL AND dminstt_nm IS NOT NULL
+    LIMIT p_limit;
+
+    -- 새 정규화 이름 → 기관 등록 (대표 표기는 이번 배치에서 가장 많이 쓰인 표기)
+    INSERT INTO pps_bid.institution (canonical_name, normalized_name, is_noise)
+    SELECT DISTINCT ON (normalized_name)
+        dminstt_nm,
+        normalized_name,
+        dminstt_nm LIKE '%수요기관%' OR dminstt_nm LIKE '%각 %' OR char_length(dminstt_nm) <= 2
+    FROM (
+        SELECT dminstt_nm, pps_bid.normalize_institution_name(dminstt_nm) AS normalized_name, COUNT(*) AS cnt
+        FROM institution_pending
+        GROUP BY dminstt_nm
+    ) t
+    ORDER BY normalized_name, cnt DESC, dminstt_nm
+    ON CONFLICT (normalized_name) DO NOTHING;
+    GET DIAGNOSTICS v_institutions = ROW_COUNT;
+
+    INSERT INTO pps_bid.institution_alias (alias, institution_id)
+    SELECT DISTINCT p.dminstt_nm, i.institution_id
+    FROM institution_pending p
+    JOIN pps_bid.institution i ON i.normalized_name = pps_bid.normalize_institution_name(p.dminstt_nm)
+    ON CONFLICT (alias) DO NOTHING;
+    GET DIAGNOSTICS v_aliases = ROW_COUNT;
+
+    WITH assigned AS (
+        UPDATE bid_results b
+        SET institution_id = a.institution_id
+        FROM institution_pending p
+        JOIN pps_bid.institution_alias a ON a.alias = p.dminstt_nm
+        WHERE b.ctid = p.row_id
+            AND b.institution_id IS NULL
+        RETURNING b.institution_id, b.rgst_dt
+    ), per_institution AS (
+        SELECT institution_id, COUNT(*) AS cnt, MIN(rgst_dt) AS first_seen, MAX(rgst_dt) AS last_seen
+        FROM assigned
+        GROUP BY institution_id
+    )
+    UPDATE pps_bid.institution i
+    SET bid_count = i.bid_count + s.cnt,
+        first_seen = LEAST(i.first_seen, s.first_seen),
+        last_seen = GREATEST(i.last_seen, s.last_seen)
+    FROM per_institution s
+    WHERE i.institution_id = s.institution_id;
+
+    SELECT COUNT(*) INTO v_assigned FROM institution_pending;
+
+    INSERT INTO pps_bid.etl_checkpoint (job_name, last_run_at, last_status, last_message)
+    VALUES ('refresh_institutions', now(), 'success',
+            format('institutions=%s aliases=%s rows=%s', v_institutions, v_aliases, v_assigned))
+    ON CONFLICT (job_name) DO UPDATE
+        SET last_run_at = EXCLUDED.last_run_at,
+            last_status = EXCLUDED.last_status,
+            last_message = EXCLUDED.last_message;
+
+    RETURN QUERY SELECT v_institutions, v_aliases, v_assigned, v_assigned >= p_limit;
+END;
+$$;
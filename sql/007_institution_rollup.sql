@@ -0,0 +1,167 @@
+-- 발주기관 × 월 롤업 (/api/institution 목록, 기관 분석 통계/월별 추이/상위 낙찰업체)
+--
+-- bid_results.institution_id (sql/006_institution_dim.sql) 가 지정된 행을 기관·월 단위로 집계한다.
+-- 목록/분석 비용이 낙찰 건수가 아니라 기관(× 월) 수에 비례하도록 한다.
+--
+-- - institution_monthly: 건수, 금액 합, 낙찰률 합/제곱합/최소/최대, 참가업체수 합
+-- - institution_monthly_rate_bins: 낙찰률 0.05%p 칸 히스토그램 (병합 가능한 분위수 스케치,
+--   pps_bid.rate_cube 와 같은 칸 정의 - api/_rate_cube.summarize_histogram 으로 분위수 계산)
+-- - institution_winner: 기관 × 월 × 낙찰업체 (상위 낙찰업체, 낙찰업체 수 - 조회 시 월을 합산)
+--
+-- 집계 대상: rgst_dt IS NOT NULL AND sucsf_bid_amt > 0 AND sucsf_bid_rate IS NOT NULL (낙찰업체는 금액/낙찰률 조건 없음)
+-- 야간 갱신은 지정일이 속한 월부터 세 테이블을 지우고 다시 계산하므로 (refresh_dashboard_snapshot 과 같은 방식)
+-- 늦게 적재된 행, 수정된 행, 새로 기관 ID 가 지정된 행도 그 월이 재계산 구간에 들면 반영된다.
+-- 재계산 구간보다 오래된 월이 바뀌었으면 (기관명 정정 후 재지정 등) 전체 재구축.
+--
+-- 적용:   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f sql/007_institution_rollup.sql
+-- 최초:   SELECT * FROM pps_bid.refresh_institution_rollup(NULL);   -- 전체 재구축
+-- 야간:   SELECT * FROM pps_bid.refresh_institution_rollup((now() AT TIME ZONE 'Asia/Seoul')::date - 2);
+
+CREATE SCHEMA IF NOT EXISTS pps_bid;
+
+-- 이전 버전(워터마크 이후 누적, 낙찰업체 월 구분 없음)에서 올리는 경우: 낙찰업체 누적분은 월로 나눌 수 없으므로
+-- 버리고 전체 재구축
+DO $$
+BEGIN
+    IF to_regclass('pps_bid.institution_winner') IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'pps_bid' AND table_name = 'institution_winner' AND column_name = 'month'
+    ) THEN
+        DROP TABLE pps_bid.institution_winner;
+    END IF;
+END;
+$$;
+DROP TABLE IF EXISTS pps_bid.institution_rollup_state;
+DROP FUNCTION IF EXISTS pps_bid.refresh_institution_rollup(boolean);
+
+CREATE TABLE IF NOT EXISTS pps_bid.institution_monthly (
+    institution_id      integer  NOT NULL,
+    month               date     NOT NULL,   -- 월 첫날
+    bid_count           bigint   NOT NULL,
+    amount_sum          numeric  NOT NULL,
+    rate_sum            numeric  NOT NULL,
+    rate_sumsq          numeric  NOT NULL,
+    rate_min            numeric  NOT NULL,
+    rate_max            numeric  NOT NULL,
+    participants_sum    bigint   NOT NULL,
+    participants_count  bigint   NOT NULL,   -- prtcpt_cnum 이 있는 행 수
+    PRIMARY KEY (institution_id, month)
+);
+
+CREATE TABLE IF NOT EXISTS pps_bid.institution_monthly_rate_bins (
+    institution_id  integer  NOT NULL,
+    month           date     NOT NULL,
+    rate_bin        integer  NOT NULL,   -- floor(sucsf_bid_rate / 0.05)
+    cnt             bigint   NOT NULL,
+    rate_sum        numeric  NOT NULL,
+    rate_sumsq      numeric  NOT NULL,
+    rate_min        numeric  NOT NULL,
+    rate_max        numeric  NOT NULL,
+    PRIMARY KEY (institution_id, month, rate_bin)
+);
+
+-- 낙찰업체 이름/사업자번호가 NULL 이면 '' 로 보관
+CREATE TABLE IF NOT EXISTS pps_bid.institution_winner (
+    institution_id   integer  NOT NULL,
+    month            date     NOT NULL,
+    bidwinnr_bizno   text     NOT NULL,
+    bidwinnr_nm      text     NOT NULL,
+    win_count        bigint   NOT NULL,
+    amount_sum       numeric  NOT NULL,
+    rate_sum         numeric  NOT NULL,
+    rate_count       bigint   NOT NULL,   -- 낙찰률이 있는 행 수
+    rated_count      bigint   NOT NULL,   -- 월 롤업 집계 대상 행 수 (낙찰업체 수 계산용)
+    PRIMARY KEY (institution_id, month, bidwinnr_bizno, bidwinnr_nm)
+);
+
+-- 재계산 구간 삭제용
+CREATE INDEX IF NOT EXISTS idx_institution_monthly_month ON pps_bid.institution_monthly (month);
+CREATE INDEX IF NOT EXISTS idx_institution_monthly_rate_bins_month ON pps_bid.institution_monthly_rate_bins (month);
+CREATE INDEX IF NOT EXISTS idx_institution_winner_month ON pps_bid.institution_winner (month);
+
+
+CREATE OR REPLACE FUNCTION pps_bid.refresh_institution_rollup(p_since date DEFAULT NULL)
+RETURNS TABLE (recomputed_months bigint, recomputed_bins bigint, recomputed_winners bigint, since_month date)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    -- 지정일이 속한 월 전체를 다시 계산 (NULL 이면 전체)
+    v_month    date := date_trunc('month', COALESCE(p_since, '-infinity'::date))::date;
+    v_months   bigint := 0;
+    v_bins     bigint := 0;
+    v_winners  bigint := 0;
+BEGIN
+    DELETE FROM pps_bid.institution_monthly WHERE month >= v_month;
+    INSERT INTO pps_bid.institution_monthly
+    SELECT
+        institution_id,
+        date_trunc('month', rgst_dt)::date,
+        COUNT(*),
+        SUM(sucsf_bid_amt),
+        SUM(sucsf_bid_rate),
+        SUM(sucsf_bid_rate * sucsf_bid_rate),
+        MIN(sucsf_bid_rate),
+        MAX(sucsf_bid_rate),
+        COALESCE(SUM(prtcpt_cnum), 0),
+        COUNT(prtcpt_cnum)
+    FROM bid_results
+    WHERE (p_since IS NULL OR rgst_dt >= v_month)
+        AND rgst_dt IS NOT NULL
+        AND institution_id IS NOT NULL
+        AND sucsf_bid_amt > 0
+        AND sucsf_bid_rate IS NOT NULL
+    GROUP BY 1, 2;
+    GET DIAGNOSTICS v_months = ROW_COUNT;
+
+    DELETE FROM pps_bid.institution_monthly_rate_bins WHERE month >= v_month;
+    INSERT INTO pps_bid.institution_monthly_rate_bins
+    SELECT
+        institution_id,
+        date_trunc('month', rgst_dt)::date,
+        floor(sucsf_bid_rate / 0.05)::integer,
+        COUNT(*),
+        SUM(sucsf_bid_rate),
+        SUM(sucsf_bid_rate * sucsf_bid_rate),
+        MIN(sucsf_bid_rate),
+        MAX(sucsf_bid_rate)
+    FROM bid_results
+    WHERE (p_since IS NULL OR rgst_dt >= v_month)
+        AND rgst_dt IS NOT NULL
+        AND institution_id IS NOT NULL
+        AND sucsf_bid_amt > 0
+        AND sucsf_bid_rate IS NOT NULL
+    GROUP BY 1, 2, 3;
+    GET DIAGNOSTICS v_bins = ROW_COUNT;
+
+    DELETE FROM pps_bid.institution_winner WHERE month >= v_month;
+    INSERT INTO pps_bid.institution_winner
+    SELECT
+        institution_id,
+        date_trunc('month', rgst_dt)::date,
+        COALESCE(bidwinnr_bizno, ''),
+        COALESCE(bidwinnr_nm, ''),
+        COUNT(*),
+        COALESCE(SUM(sucsf_bid_amt), 0),
+        COALESCE(SUM(sucsf_bid_rate), 0),
+        COUNT(sucsf_bid_rate),
+        COUNT(*) FILTER (WHERE sucsf_bid_amt > 0 AND sucsf_bid_rate IS NOT NULL)
+    FROM bid_results
+    WHERE (p_since IS NULL OR rgst_dt >= v_month)
+        AND rgst_dt IS NOT NULL
+        AND institution_id IS NOT NULL
+        AND (bidwinnr_nm IS NOT NULL OR bidwinnr_bizno IS NOT NULL)
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS v_winners = ROW_COUNT;
+
+    INSERT INTO pps_bid.etl_checkpoint (job_name, last_run_at, last_status, last_message)
+    VALUES ('refresh_institution_rollup', now(), 'success',
+            format('since=%s month=%s months=%s bins=%s winners=%s',
+                   p_since, v_month, v_months, v_bins, v_winners))
+    ON CONFLICT (job_name) DO UPDATE
+        SET last_run_at = EXCLUDED.last_run_at,
+            last_status = EXCLUDED.last_status,
+            last_message = EXCLUDED.last_message;
+
+    RETURN QUERY SELECT v_months, v_bins, v_winners, v_month;
+END;
+$$;